@@ -0,0 +1,186 @@
+"""Benchmark for the regexes in the classification and formatting of queries.
+
+Run as
+
+    python benchmarks/adversarial.py
+
+to time :func:`getbibtex.query.classify_query`,
+:func:`getbibtex.bibtex.protect_strings`, and
+:func:`getbibtex.extract.scan_identifiers` for pathological inputs of
+growing length, e.g. URLs with many tracking parameters, or pasted abstracts.
+For regexes with nested or lazy quantifiers, such inputs can take quadratic
+time (or worse). The script exits with a non-zero status if the time for any
+input grows by more than `MAX_GROWTH` times the growth of its length between
+the smallest and the largest size, or if the largest input takes longer than
+`BUDGET` seconds.
+"""
+
+import argparse
+import io
+import json
+import sys
+import timeit
+
+from getbibtex.bibtex import detect_title_case, protect_strings
+from getbibtex.extract import scan_identifiers
+from getbibtex.query import classify_query
+
+# Approximate number of characters in each input
+SIZES = [10000, 40000, 160000]
+
+# Maximum allowed ratio of the time per character for the largest and
+# smallest input
+MAX_GROWTH = 2.0
+
+# Maximum allowed time (in seconds) for the largest input
+BUDGET = 0.5
+
+ABSTRACT = (
+    "We present a Python implementation of Krotov's method for Quantum "
+    "Optimal Control (see arXiv:1902.11284, https://doi.org/10.21468/"
+    "SciPostPhys.7.6.080). The GRAPE and CRAB methods are compared for "
+    "Rydberg atoms: a NMR-like setup. Bose-Einstein condensates follow. "
+)
+
+
+def _repeat(unit, size, prefix='', suffix=''):
+    return prefix + unit * max(size // len(unit), 1) + suffix
+
+
+# Each case is a tuple (name, func, make_input), where `make_input(size)`
+# returns the argument for `func`
+CASES = [
+    (
+        'classify: arxiv',
+        classify_query,
+        lambda size: _repeat('arxiv', size),
+    ),
+    (
+        'classify: tracking URL',
+        classify_query,
+        lambda size: _repeat(
+            '&utm_source=arxiv1234', size, prefix='https://arxiv.org/abs/?q'
+        ),
+    ),
+    (
+        'classify: arxiv 1234.',
+        classify_query,
+        lambda size: _repeat('arxiv 1234.', size),
+    ),
+    (
+        'classify: 10.',
+        classify_query,
+        lambda size: _repeat('10.', size, prefix='x'),
+    ),
+    (
+        'classify: 10.1234',
+        classify_query,
+        lambda size: _repeat('10.1234', size, prefix='x'),
+    ),
+    (
+        'classify: long DOI',
+        classify_query,
+        lambda size: _repeat('a', size, prefix='https://doi.org/10.1234/'),
+    ),
+    (
+        'classify: cond-mat/123456',
+        classify_query,
+        lambda size: _repeat('cond-mat/123456', size),
+    ),
+    (
+        'classify: abstract',
+        classify_query,
+        lambda size: _repeat(ABSTRACT, size),
+    ),
+    (
+        'protect: aB}',
+        lambda s: protect_strings(s, auto_protect=True),
+        lambda size: _repeat('aB', size, prefix='x ', suffix='}'),
+    ),
+    (
+        'protect: A}',
+        lambda s: protect_strings(s, auto_protect=True),
+        lambda size: _repeat('A', size, prefix='x ', suffix='}'),
+    ),
+    (
+        'protect: abstract',
+        lambda s: protect_strings(s, auto_protect=None),
+        lambda size: _repeat(ABSTRACT, size),
+    ),
+    (
+        'title case: abstract',
+        detect_title_case,
+        lambda size: _repeat(ABSTRACT, size),
+    ),
+    (
+        'extract: abstract',
+        lambda s: list(scan_identifiers(io.StringIO(s))),
+        lambda size: _repeat(ABSTRACT, size),
+    ),
+    (
+        'extract: arxiv',
+        lambda s: list(scan_identifiers(io.StringIO(s))),
+        lambda size: _repeat('arxiv 1234.', size),
+    ),
+]
+
+
+def _time(func, arg, repeat):
+    timer = timeit.Timer(lambda: func(arg))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--json', action='store_true', help="Write results as JSON"
+    )
+    args = parser.parse_args(argv)
+    results = {}
+    failed = False
+    for name, func, make_input in CASES:
+        timings = {}
+        lengths = {}
+        for size in SIZES:
+            arg = make_input(size)
+            lengths[size] = len(arg)
+            timings[size] = _time(func, arg, args.repeat)
+        smallest, largest = SIZES[0], SIZES[-1]
+        growth = (timings[largest] / lengths[largest]) / (
+            timings[smallest] / lengths[smallest]
+        )
+        ok = growth <= MAX_GROWTH and timings[largest] <= BUDGET
+        failed = failed or not ok
+        results[name] = {
+            'ms': {size: 1000 * timings[size] for size in SIZES},
+            'growth': growth,
+            'ok': ok,
+        }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            "%-26s %s %8s"
+            % ('input', ' '.join('%10s' % size for size in SIZES), 'growth')
+        )
+        for name, result in results.items():
+            print(
+                "%-26s %s %8.2f  %s"
+                % (
+                    name,
+                    ' '.join('%8.3fms' % ms for ms in result['ms'].values()),
+                    result['growth'],
+                    'ok' if result['ok'] else 'FAILED',
+                )
+            )
+        print(
+            "max growth %.1f, budget %.1fs for %d characters"
+            % (MAX_GROWTH, BUDGET, SIZES[-1])
+        )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Benchmark for rendering entries with huge author lists.
+
+Run as
+
+    python benchmarks/authors.py
+
+to time :func:`getbibtex.backends.crossref.get_bibtex` and
+:func:`getbibtex.backends.arxiv.get_bibtex` for records with a growing number
+of authors (up to 5000, like papers by large collaborations in high-energy
+physics or astronomy), with all authors listed, and with the number of authors
+capped by :func:`getbibtex.bibtex.set_max_authors`. The script exits with a
+non-zero status if the time for a capped record grows by more than
+`MAX_GROWTH` between the smallest and the largest number of authors, or if
+rendering the largest record with all authors takes longer than `BUDGET`
+seconds.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import timeit
+
+from corpus import FAMILY_NAMES, GIVEN_NAMES, crossref_article
+
+from getbibtex.backends import arxiv, crossref
+from getbibtex.bibtex import set_max_authors
+
+SIZES = [50, 500, 5000]
+
+# Maximum number of authors for the capped entries
+MAX_AUTHORS = 10
+
+# Maximum allowed ratio of timings of capped entries for the largest and
+# smallest number of authors
+MAX_GROWTH = 3.0
+
+# Maximum allowed time (in seconds) for an entry with all authors
+BUDGET = 0.05
+
+
+def make_records(n_authors, seed=0):
+    """Return a Crossref and an arXiv record with `n_authors` authors."""
+    rng = random.Random(seed)
+    crossref_record = crossref_article(rng, n_authors=n_authors)
+    arxiv_record = {
+        'authors': [
+            "%s %s" % (rng.choice(GIVEN_NAMES), rng.choice(FAMILY_NAMES))
+            for _ in range(n_authors)
+        ],
+        'title': crossref_record['title'][0],
+        'year': '2024',
+    }
+    return crossref_record, arxiv_record
+
+
+def _time(func, repeat):
+    timer = timeit.Timer(func)
+    # Suppress the warnings for journals without a macro
+    with contextlib.redirect_stderr(io.StringIO()):
+        number, _ = timer.autorange()
+        return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def measure(n_authors, max_authors, repeat=3):
+    """Return the time (in seconds) for rendering entries for both backends.
+
+    Return a dict that maps the name of each backend to the time per entry.
+    """
+    crossref_record, arxiv_record = make_records(n_authors)
+    previous = set_max_authors(max_authors)
+    try:
+        return {
+            'crossref': _time(
+                lambda: crossref.get_bibtex(crossref_record), repeat
+            ),
+            'arxiv': _time(
+                lambda: arxiv.get_bibtex(arxiv_record, '2401.00001'), repeat
+            ),
+        }
+    finally:
+        set_max_authors(previous)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--json', action='store_true', help="Write results as JSON"
+    )
+    args = parser.parse_args(argv)
+    results = {}
+    for n_authors in SIZES:
+        results[n_authors] = {
+            'all': measure(n_authors, None, args.repeat),
+            'capped': measure(n_authors, MAX_AUTHORS, args.repeat),
+        }
+    failed = False
+    growth = {}
+    for backend in ('crossref', 'arxiv'):
+        growth[backend] = (
+            results[SIZES[-1]]['capped'][backend]
+            / results[SIZES[0]]['capped'][backend]
+        )
+        failed = failed or growth[backend] > MAX_GROWTH
+        failed = failed or results[SIZES[-1]]['all'][backend] > BUDGET
+    if args.json:
+        print(
+            json.dumps(
+                {'results': results, 'growth': growth, 'failed': failed},
+                indent=2,
+            )
+        )
+    else:
+        print(
+            "%8s %14s %14s %14s %14s"
+            % (
+                'authors',
+                'crossref [ms]',
+                'capped [ms]',
+                'arxiv [ms]',
+                'capped [ms]',
+            )
+        )
+        for n_authors, result in results.items():
+            print(
+                "%8d %14.3f %14.3f %14.3f %14.3f"
+                % (
+                    n_authors,
+                    1000 * result['all']['crossref'],
+                    1000 * result['capped']['crossref'],
+                    1000 * result['all']['arxiv'],
+                    1000 * result['capped']['arxiv'],
+                )
+            )
+        for backend, value in growth.items():
+            print(
+                "growth of capped %s time: %.2f (max %.1f)"
+                % (backend, value, MAX_GROWTH)
+            )
+        print(
+            "budget for %d authors: %.0f ms  %s"
+            % (SIZES[-1], 1000 * BUDGET, 'FAILED' if failed else 'ok')
+        )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
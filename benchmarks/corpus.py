@@ -0,0 +1,203 @@
+"""Synthetic corpus of backend records for offline benchmarks.
+
+The records mimic the ``message`` of a Crossref response and the records of
+the arXiv backend (see the record builders in ``tests/test_crossref.py``).
+They are generated from a fixed seed, so that every run of a benchmark sees
+the same corpus. The corpus covers journal articles (with and without a
+known journal macro), proceedings articles, book chapters, huge author lists,
+and long titles, in sentence case, title case, and all-uppercase.
+"""
+
+import random
+
+# Fraction of each kind of Crossref record in the corpus
+CROSSREF_MIX = {
+    'article': 0.6,
+    'proceedings': 0.15,
+    'book-chapter': 0.1,
+    'huge-author-list': 0.05,
+    'long-title': 0.1,
+}
+
+FAMILY_NAMES = [
+    'Goerz',
+    'Reich',
+    'Koch',
+    'Müller',
+    'Schrödinger',
+    'Calarco',
+    'Montangero',
+    'de Vivie-Riedle',
+    'van der Waals',
+    'Basilewitsch',
+    'Sørensen',
+    'Jäger',
+    'Whaley',
+    'Carrasco',
+    'Lee',
+]
+
+GIVEN_NAMES = [
+    'Michael H.',
+    'Daniel M.',
+    'Christiane P.',
+    'Matthias M.',
+    'Tommaso',
+    'Simone',
+    'Regina',
+    'Jan Hendrik',
+    'K. Birgitta',
+    'Sebastián C.',
+    'Alicia B.',
+]
+
+TITLE_WORDS = """
+quantum optimal control of a qubit with robust gates for Rydberg atoms in
+optical lattices using Krotov's method and GRAPE beyond the rotating wave
+approximation the Bose Einstein condensate Dirac equation NMR spectroscopy
+semi-automatic differentiation entangling two-qubit Schrödinger cat states
+""".split()
+
+JOURNALS = [
+    'Phys. Rev. Lett.',
+    'Phys. Rev. A',
+    'Phys Rev A',
+    'New J. Phys.',
+    'SciPost Phys.',
+    'Quantum',
+    'J. Chem. Phys.',
+    'The Journal of Chemical Physics',
+    'Journal of Unknown Things',
+]
+
+CONFERENCES = [
+    'Proceedings of the Big Conference',
+    '2019 IEEE Conference on Decision and Control (CDC)',
+]
+
+
+def _names(rng, n):
+    return [
+        {'family': rng.choice(FAMILY_NAMES), 'given': rng.choice(GIVEN_NAMES)}
+        for _ in range(n)
+    ]
+
+
+def _title(rng, n_words):
+    words = [rng.choice(TITLE_WORDS) for _ in range(n_words)]
+    style = rng.random()
+    if style < 0.2:
+        words = [word.capitalize() for word in words]
+    elif style < 0.25:
+        words = [word.upper() for word in words]
+    title = " ".join(words)
+    return title[0].upper() + title[1:]
+
+
+def _doi(rng):
+    return '10.%d/synthetic.%d' % (
+        rng.randint(1000, 9999),
+        rng.getrandbits(32),
+    )
+
+
+def _common(rng, n_authors, n_title_words):
+    return {
+        'author': _names(rng, n_authors),
+        'title': [_title(rng, n_title_words)],
+        'issued': {'date-parts': [[rng.randint(1990, 2024)]]},
+        'DOI': _doi(rng),
+    }
+
+
+def crossref_article(rng, n_authors=None, n_title_words=None):
+    """A ``journal-article`` Crossref record."""
+    if n_authors is None:
+        n_authors = rng.randint(1, 8)
+    if n_title_words is None:
+        n_title_words = rng.randint(5, 15)
+    record = _common(rng, n_authors, n_title_words)
+    record.update(
+        {
+            'type': 'journal-article',
+            'container-title': [rng.choice(JOURNALS)],
+            'page': str(rng.randint(1, 99999)),
+            'volume': str(rng.randint(1, 130)),
+            'issue': str(rng.randint(1, 24)),
+        }
+    )
+    return record
+
+
+def crossref_proceedings(rng):
+    """A ``proceedings-article`` Crossref record."""
+    record = _common(rng, rng.randint(1, 6), rng.randint(5, 15))
+    record.update(
+        {
+            'editor': _names(rng, rng.randint(1, 3)),
+            'type': 'proceedings-article',
+            'container-title': [rng.choice(CONFERENCES)],
+            'page': '%d-%d' % (rng.randint(1, 500), rng.randint(501, 1000)),
+            'event': {'location': 'Berlin, Germany'},
+        }
+    )
+    return record
+
+
+def crossref_book_chapter(rng):
+    """A ``book-chapter`` Crossref record."""
+    record = _common(rng, rng.randint(1, 4), rng.randint(3, 10))
+    record.update(
+        {
+            'editor': _names(rng, rng.randint(1, 3)),
+            'type': 'book-chapter',
+            'container-title': ['Handbook of Things'],
+            'page': '%d-%d' % (rng.randint(1, 500), rng.randint(501, 1000)),
+            'publisher': 'Springer',
+            'volume': str(rng.randint(1, 10)),
+        }
+    )
+    return record
+
+
+def crossref_records(n=1000, seed=0, n_huge_authors=1000):
+    """Return a list of `n` synthetic Crossref records.
+
+    The kinds of records are mixed according to `CROSSREF_MIX`. Records with
+    a huge author list have `n_huge_authors` authors.
+    """
+    rng = random.Random(seed)
+    kinds = list(CROSSREF_MIX)
+    weights = [CROSSREF_MIX[kind] for kind in kinds]
+    records = []
+    for kind in rng.choices(kinds, weights, k=n):
+        if kind == 'proceedings':
+            records.append(crossref_proceedings(rng))
+        elif kind == 'book-chapter':
+            records.append(crossref_book_chapter(rng))
+        elif kind == 'huge-author-list':
+            records.append(crossref_article(rng, n_authors=n_huge_authors))
+        elif kind == 'long-title':
+            records.append(crossref_article(rng, n_title_words=200))
+        else:
+            records.append(crossref_article(rng))
+    return records
+
+
+def arxiv_records(n=1000, seed=0):
+    """Return a list of `n` tuples ``(arxiv_id, arxiv_record)``."""
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        n_authors = rng.randint(1, 8)
+        authors = [
+            "%s %s" % (rng.choice(GIVEN_NAMES), rng.choice(FAMILY_NAMES))
+            for _ in range(n_authors)
+        ]
+        record = {
+            'authors': authors,
+            'title': _title(rng, rng.randint(5, 15)),
+            'year': str(rng.randint(2007, 2024)),
+        }
+        records.append(('%04d.%05d' % (rng.randint(1001, 2412), i), record))
+    return records
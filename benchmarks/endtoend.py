@@ -0,0 +1,239 @@
+"""End-to-end load test of the `getbibtex` command against a local stand-in.
+
+Run as
+
+    python benchmarks/endtoend.py
+
+to measure the throughput and latency of the `getbibtex` command, without
+any requests to the real Crossref and arXiv APIs. The script serves the
+synthetic corpus from ``benchmarks/corpus.py`` with
+:class:`getbibtex.standin.StandinServer`, injecting latency, server errors,
+and throttling, and runs
+
+* a batch of DOIs, arXiv IDs, and free-form queries, reporting the number of
+  entries per second and the percentiles of each phase (from ``--timings``),
+* a series of single lookups, reporting the percentiles of the wall-clock
+  time of each ``getbibtex`` call.
+
+The script exits with a non-zero status if any lookup fails.
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus import arxiv_records, crossref_records
+
+from getbibtex.standin import StandinServer
+
+
+def _percentile(sorted_values, percent):
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def make_fixtures(n_dois, n_arxiv, seed=0, n_references=50):
+    """Return Crossref and arXiv records for the stand-in server.
+
+    Like real Crossref records, each Crossref record includes a list of
+    `n_references` references, and other fields that getbibtex does not use.
+    """
+    cr_records = crossref_records(n_dois, seed=seed, n_huge_authors=200)
+    for record in cr_records:
+        record['reference'] = [
+            {
+                'key': '%s_ref%d' % (record['DOI'], i),
+                'doi-asserted-by': 'crossref',
+                'DOI': '10.1000/ref.%d' % i,
+                'unstructured': 'A. Author, J. Something 1, %d (2000)' % i,
+            }
+            for i in range(n_references)
+        ]
+        record['funder'] = [{'name': 'Agency', 'award': ['12345']}]
+        record['license'] = [{'URL': 'https://example.com/license'}]
+    ax_records = [
+        dict(id=arxiv_id, **record)
+        for (arxiv_id, record) in arxiv_records(n_arxiv, seed=seed)
+    ]
+    return cr_records, ax_records
+
+
+def parse_timings(stderr):
+    """Parse the table written by ``getbibtex --timings``.
+
+    Return a dict mapping each phase to a dict with 'count', 'total', 'p50',
+    'p95', and 'p99' (times in ms, except 'total' in seconds).
+    """
+    timings = {}
+    lines = stderr.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith('phase'):
+            for row in lines[i + 1 :]:
+                parts = row.split()
+                if len(parts) != 6:
+                    break
+                phase, count, total, p50, p95, p99 = parts
+                timings[phase] = {
+                    'count': int(count),
+                    'total': float(total),
+                    'p50': float(p50),
+                    'p95': float(p95),
+                    'p99': float(p99),
+                }
+    return timings
+
+
+def run_getbibtex(args, env):
+    """Run ``getbibtex`` with the given `args`.
+
+    Return the completed process and the wall-clock time in seconds.
+    """
+    cmd = [sys.executable, '-c', 'import getbibtex; getbibtex.main()']
+    start = time.perf_counter()
+    proc = subprocess.run(
+        cmd + list(args), env=env, capture_output=True, text=True
+    )
+    return proc, time.perf_counter() - start
+
+
+def run_batch(server, cr_records, ax_records, n_queries, jobs, env):
+    """Resolve all DOIs and arXiv IDs, plus `n_queries` free-form queries."""
+    lines = [record['DOI'] for record in cr_records]
+    lines += ['arXiv:' + record['id'] for record in ax_records]
+    lines += [record['title'][0] for record in cr_records[:n_queries]]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        infile = os.path.join(tmpdir, 'ids.txt')
+        with open(infile, 'w', encoding='utf-8') as out_fh:
+            out_fh.write("\n".join(lines) + "\n")
+        proc, seconds = run_getbibtex(
+            [
+                '--batch',
+                infile,
+                '--no-cache',
+                '--timings',
+                '--jobs',
+                str(jobs),
+            ],
+            env,
+        )
+    n_entries = proc.stdout.count('\n@')
+    if proc.stdout.startswith('@'):
+        n_entries += 1
+    return {
+        'queries': len(lines),
+        'entries': n_entries,
+        'seconds': seconds,
+        'entries_per_sec': n_entries / seconds,
+        'requests': server.n_requests,
+        'injected_errors': server.n_errors,
+        'timings': parse_timings(proc.stderr),
+        'ok': n_entries == len(lines),
+    }
+
+
+def run_single(cr_records, n_lookups, env):
+    """Look up the first `n_lookups` DOIs with one ``getbibtex`` call each."""
+    durations = []
+    ok = True
+    for record in cr_records[:n_lookups]:
+        proc, seconds = run_getbibtex([record['DOI'], '--no-cache'], env)
+        ok = ok and proc.stdout.startswith('@')
+        durations.append(1000 * seconds)
+    durations.sort()
+    return {
+        'lookups': n_lookups,
+        'p50_ms': _percentile(durations, 50),
+        'p95_ms': _percentile(durations, 95),
+        'p99_ms': _percentile(durations, 99),
+        'ok': ok,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--dois', type=int, default=1000)
+    parser.add_argument('--arxiv', type=int, default=100)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--single', type=int, default=10)
+    parser.add_argument('--jobs', type=int, default=4)
+    parser.add_argument(
+        '--latency', type=float, default=0.05, help="Latency per request [s]"
+    )
+    parser.add_argument(
+        '--jitter', type=float, default=0.05, help="Maximum extra latency [s]"
+    )
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--throttle-rate', type=float, default=0.02)
+    parser.add_argument(
+        '--json', action='store_true', help="Write results as JSON"
+    )
+    args = parser.parse_args(argv)
+    cr_records, ax_records = make_fixtures(args.dois, args.arxiv)
+    server = StandinServer(
+        cr_records,
+        ax_records,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=50,
+        seed=0,
+    )
+    with server:
+        env = dict(os.environ, **server.environ())
+        env.pop('GETBIBTEX_MAILTO', None)
+        batch = run_batch(
+            server, cr_records, ax_records, args.queries, args.jobs, env
+        )
+        single = run_single(cr_records, args.single, env)
+    results = {'batch': batch, 'single': single}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            "batch: %d/%d entries in %.2f s (%.1f entries/s), "
+            "%d requests, %d injected errors  %s"
+            % (
+                batch['entries'],
+                batch['queries'],
+                batch['seconds'],
+                batch['entries_per_sec'],
+                batch['requests'],
+                batch['injected_errors'],
+                'ok' if batch['ok'] else 'FAILED',
+            )
+        )
+        print(
+            "  %-20s %7s %10s %10s %10s"
+            % ('phase', 'count', 'p50 [ms]', 'p95 [ms]', 'p99 [ms]')
+        )
+        for phase, stats in batch['timings'].items():
+            print(
+                "  %-20s %7d %10.1f %10.1f %10.1f"
+                % (
+                    phase,
+                    stats['count'],
+                    stats['p50'],
+                    stats['p95'],
+                    stats['p99'],
+                )
+            )
+        print(
+            "single lookups: p50 %.0f ms, p95 %.0f ms, p99 %.0f ms  %s"
+            % (
+                single['p50_ms'],
+                single['p95_ms'],
+                single['p99_ms'],
+                'ok' if single['ok'] else 'FAILED',
+            )
+        )
+    return 0 if (batch['ok'] and single['ok']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
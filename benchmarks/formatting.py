@@ -0,0 +1,225 @@
+"""Benchmark for turning backend records into BibTeX entries.
+
+Run as
+
+    python benchmarks/formatting.py
+
+to measure the throughput of the pure-logic path that formats records, on the
+synthetic corpus in ``benchmarks/corpus.py``: the number of records per second
+for the Crossref and arXiv backends, and the time per call for the helper
+functions in `getbibtex.bibtex`. No network requests are made.
+
+The timings are compared to the baseline stored in
+``benchmarks/formatting_baseline.json``. The script exits with a non-zero
+status if any timing is slower than the baseline by more than a factor
+`--tolerance`. Run with `--save-baseline` to update the baseline after an
+intentional change (or on a different machine).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import timeit
+
+from corpus import arxiv_records, crossref_records
+
+from getbibtex.backends import arxiv, crossref
+from getbibtex.bibtex import (
+    bibtex_entry,
+    detect_title_case,
+    get_citekey,
+    normalize_name,
+    protect_strings,
+)
+
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'formatting_baseline.json'
+)
+
+# Default for the maximum allowed ratio of a timing to its baseline
+TOLERANCE = 2.0
+
+
+def make_benchmarks(n_records):
+    """Return a dict of benchmarks on a corpus of `n_records` records.
+
+    Each benchmark is a tuple ``(func, n_calls)``, where `func` runs all
+    `n_calls` calls of the function under test.
+    """
+    cr_records = crossref_records(n_records)
+    ax_records = arxiv_records(n_records)
+    titles = [record['title'][0] for record in cr_records]
+    names = [name for _, record in ax_records for name in record['authors']]
+    citekey_args = [
+        (
+            record['author'][0]['family'],
+            record['container-title'][0],
+            record['issued']['date-parts'][0][0],
+        )
+        for record in cr_records
+    ]
+    entry_kwargs = [
+        dict(
+            entrytype='article',
+            citekey='GoerzPRA%d' % i,
+            author=" and ".join(
+                "%s, %s" % (name['family'], name['given'])
+                for name in record['author']
+            ),
+            title=record['title'][0],
+            journal=record['container-title'][0],
+            year=record['issued']['date-parts'][0][0],
+            doi=record['DOI'],
+        )
+        for i, record in enumerate(cr_records)
+        if record['type'] == 'journal-article'
+    ]
+
+    def run_crossref_get_bibtex():
+        for record in cr_records:
+            crossref.get_bibtex(record)
+
+    def run_arxiv_get_bibtex():
+        for arxiv_id, record in ax_records:
+            arxiv.get_bibtex(record, arxiv_id)
+
+    def run_protect_strings():
+        for title in titles:
+            protect_strings(title)
+
+    def run_detect_title_case():
+        for title in titles:
+            detect_title_case(title)
+
+    def run_normalize_name():
+        for name in names:
+            normalize_name(name)
+
+    def run_get_citekey():
+        for args in citekey_args:
+            get_citekey(*args)
+
+    def run_bibtex_entry():
+        for kwargs in entry_kwargs:
+            bibtex_entry(**kwargs)
+
+    return {
+        'crossref.get_bibtex': (run_crossref_get_bibtex, len(cr_records)),
+        'arxiv.get_bibtex': (run_arxiv_get_bibtex, len(ax_records)),
+        'protect_strings': (run_protect_strings, len(titles)),
+        'detect_title_case': (run_detect_title_case, len(titles)),
+        'normalize_name': (run_normalize_name, len(names)),
+        'get_citekey': (run_get_citekey, len(citekey_args)),
+        'bibtex_entry': (run_bibtex_entry, len(entry_kwargs)),
+    }
+
+
+def measure(func, n_calls, repeat=3):
+    """Return the fastest time per call (in microseconds) of `func`."""
+    # Unknown journals print a warning for every record
+    with contextlib.redirect_stderr(io.StringIO()):
+        func()  # warm up
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+    return 1e6 * best / n_calls
+
+
+def load_baseline(n_records, filename=BASELINE_FILE):
+    """Return the stored baseline timings for a corpus of `n_records`.
+
+    Return an empty dict if there is no baseline for that corpus.
+    """
+    if not os.path.isfile(filename):
+        return {}
+    with open(filename, encoding='utf-8') as in_fh:
+        data = json.load(in_fh)
+    if data['n_records'] != n_records:
+        return {}
+    return data['us_per_call']
+
+
+def save_baseline(results, n_records, filename=BASELINE_FILE):
+    """Store the timings in `results` as the new baseline."""
+    data = {
+        'n_records': n_records,
+        'us_per_call': {
+            name: round(result['us_per_call'], 3)
+            for name, result in results.items()
+        },
+    }
+    with open(filename, 'w', encoding='utf-8') as out_fh:
+        json.dump(data, out_fh, indent=2)
+        out_fh.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument(
+        '--save-baseline',
+        action='store_true',
+        help="Store the timings as the new baseline",
+    )
+    parser.add_argument(
+        '--json', action='store_true', help="Write results as JSON"
+    )
+    args = parser.parse_args(argv)
+    baseline = {} if args.save_baseline else load_baseline(args.records)
+    results = {}
+    failed = False
+    for name, (func, n_calls) in make_benchmarks(args.records).items():
+        us_per_call = measure(func, n_calls, repeat=args.repeat)
+        ratio = None
+        if name in baseline:
+            ratio = us_per_call / baseline[name]
+        ok = ratio is None or ratio <= args.tolerance
+        failed = failed or not ok
+        results[name] = {
+            'calls': n_calls,
+            'us_per_call': us_per_call,
+            'per_sec': 1e6 / us_per_call,
+            'baseline_us_per_call': baseline.get(name),
+            'ratio': ratio,
+            'ok': ok,
+        }
+    if args.save_baseline:
+        save_baseline(results, args.records)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            "%-20s %8s %12s %12s %10s  %s"
+            % ('function', 'calls', 'time [us]', 'per second', 'baseline', '')
+        )
+        for name, result in results.items():
+            if result['ratio'] is None:
+                status = 'ok' if args.save_baseline else 'no baseline'
+            else:
+                status = "%.2fx %s" % (
+                    result['ratio'],
+                    'ok' if result['ok'] else 'REGRESSION',
+                )
+            print(
+                "%-20s %8d %12.2f %12.0f %10s  %s"
+                % (
+                    name,
+                    result['calls'],
+                    result['us_per_call'],
+                    result['per_sec'],
+                    (
+                        "%.2f" % result['baseline_us_per_call']
+                        if result['baseline_us_per_call'] is not None
+                        else '-'
+                    ),
+                    status,
+                )
+            )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
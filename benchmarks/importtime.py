@@ -0,0 +1,142 @@
+"""Import-time benchmark for getbibtex.
+
+Run as
+
+    python benchmarks/importtime.py
+
+to measure how long it takes to import the modules needed for typical
+invocations of `getbibtex`, based on the output of ``python -X importtime``.
+Each scenario runs in a fresh interpreter, several times, and the fastest run
+is reported. The script exits with a non-zero status if any scenario exceeds
+its budget, or if a scenario imports a module it must not depend on.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+# name => (statement, budget in ms, modules that must not be imported)
+SCENARIOS = {
+    'package': (
+        'import getbibtex',
+        10,
+        ['click', 'getbibtex.cli', 'getbibtex.backends'],
+    ),
+    'cli': (
+        'import getbibtex.cli',
+        150,
+        ['getbibtex.backends', 'http.client', 'sqlite3', 'bibtexparser'],
+    ),
+    'doi lookup': (
+        'import getbibtex.cli, getbibtex.query, getbibtex.backends.crossref',
+        250,
+        ['bibtexparser', 'getbibtex.backends.arxiv'],
+    ),
+    'client': (
+        'import getbibtex.client',
+        50,
+        ['click', 'getbibtex.cli', 'getbibtex.backends', 'sqlite3'],
+    ),
+    'arxiv lookup': (
+        'import getbibtex.cli, getbibtex.query, getbibtex.backends.arxiv',
+        350,
+        ['getbibtex.backends.crossref'],
+    ),
+}
+
+
+def parse_importtime(stderr, startup_modules=()):
+    """Parse the output of ``python -X importtime``.
+
+    Return a dict mapping each imported module to its cumulative import time
+    in microseconds, and the total time for all top-level imports, excluding
+    the `startup_modules` that the interpreter imports by itself.
+    """
+    cumulative = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        name = name[1:]  # strip the separating space, keep the indentation
+        cumulative[name.strip()] = int(cumulative_us)
+        if not name.startswith(' ') and name not in startup_modules:
+            total += int(cumulative_us)
+    return cumulative, total
+
+
+def _importtime(statement):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return proc.stderr
+
+
+def measure(statement, repeat=5):
+    """Return the fastest total import time (in ms), and the imported modules.
+
+    The `statement` is run `repeat` times, each in a fresh interpreter.
+    """
+    startup_modules, _ = parse_importtime(_importtime('pass'))
+    best = None
+    modules = None
+    for _ in range(repeat):
+        cumulative, total = parse_importtime(
+            _importtime(statement), startup_modules
+        )
+        if best is None or total < best:
+            best = total
+        modules = set(cumulative)
+    return best / 1000, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--json', action='store_true', help="Write results as JSON"
+    )
+    args = parser.parse_args(argv)
+    results = {}
+    failed = False
+    for name, (statement, budget, forbidden) in SCENARIOS.items():
+        time_ms, modules = measure(statement, repeat=args.repeat)
+        unwanted = sorted(
+            mod
+            for mod in modules
+            if any(mod == f or mod.startswith(f + '.') for f in forbidden)
+        )
+        ok = time_ms <= budget and not unwanted
+        failed = failed or not ok
+        results[name] = {
+            'statement': statement,
+            'time_ms': round(time_ms, 2),
+            'budget_ms': budget,
+            'unwanted_modules': unwanted,
+            'ok': ok,
+        }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("%-14s %10s %10s  %s" % ('scenario', 'time [ms]', 'budget', ''))
+        for name, result in results.items():
+            print(
+                "%-14s %10.1f %10d  %s"
+                % (
+                    name,
+                    result['time_ms'],
+                    result['budget_ms'],
+                    'ok' if result['ok'] else 'FAILED',
+                )
+            )
+            if result['unwanted_modules']:
+                print("    unwanted imports: %s" % result['unwanted_modules'])
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
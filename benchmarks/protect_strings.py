@@ -0,0 +1,145 @@
+"""Benchmark for protecting words in titles with large lists of words.
+
+Run as
+
+    python benchmarks/protect_strings.py
+
+to compare the time it takes to protect the words in a set of titles, for
+growing lists of protected words, between the single-pass
+:class:`getbibtex.bibtex.ProtectedWords` matcher and the reference
+implementation that applies one regex per word. Both must produce identical
+output. The script exits with a non-zero status if the output differs, or if
+the time for the single-pass matcher grows by more than `MAX_GROWTH` between
+the smallest and the largest list of words.
+"""
+
+import argparse
+import json
+import re
+import sys
+import timeit
+
+from getbibtex.bibtex import PROTECTED_WORDS, ProtectedWords
+
+SIZES = [10, 100, 1000, 10000]
+
+# Maximum allowed ratio of timings for the largest and smallest word list
+MAX_GROWTH = 3.0
+
+TITLES = [
+    "Atomic Schrödinger cat states",
+    "Quantum Optimal Control via Semi-Automatic Differentiation",
+    "Krotov: A Python implementation of Krotov's method for quantum control",
+    "Optimal control of Rydberg atoms with GRAPE and CRAB",
+    "Bose Einstein condensates and the Dirac equation in NMR",
+    "Word17 and Word1234 are protected, {Word5} already is",
+]
+
+
+def make_words(size):
+    """Return a list of `size` protected words."""
+    words = list(PROTECTED_WORDS)
+    i = 0
+    while len(words) < size:
+        words.append("Word%d" % i)
+        i += 1
+    return words[:size]
+
+
+def protect_reference(titles, words):
+    """Protect the `words` in `titles` with one regex per word."""
+    rxs = [
+        (
+            re.compile(r'(?<!^)(?<!\{)\b' + re.escape(word) + r'\b(?!\})'),
+            '{' + word + '}',
+        )
+        for word in words
+    ]
+    result = []
+    for s in titles:
+        for rx, repl in rxs:
+            s = rx.sub(repl, s)
+        result.append(s)
+    return result
+
+
+def protect_single_pass(titles, words):
+    """Protect the `words` in `titles` with :class:`ProtectedWords`."""
+    protected_words = ProtectedWords(words)
+    return [protected_words.protect(s) for s in titles]
+
+
+def _time(func, titles, words, repeat):
+    timer = timeit.Timer(lambda: func(titles, words))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--json', action='store_true', help="Write results as JSON"
+    )
+    args = parser.parse_args(argv)
+    results = {}
+    failed = False
+    for size in SIZES:
+        words = make_words(size)
+        same = protect_single_pass(TITLES, words) == protect_reference(
+            TITLES, words
+        )
+        failed = failed or not same
+        results[size] = {
+            'reference_ms': 1000
+            * _time(protect_reference, TITLES, words, args.repeat),
+            'single_pass_ms': 1000
+            * _time(protect_single_pass, TITLES, words, args.repeat),
+            'identical': same,
+        }
+    # Building the matcher is linear in the number of words; only the
+    # per-title cost must not grow
+    matchers = {size: ProtectedWords(make_words(size)) for size in SIZES}
+    for size, protected_words in matchers.items():
+        timer = timeit.Timer(
+            lambda: [protected_words.protect(s) for s in TITLES]
+        )
+        number, _ = timer.autorange()
+        results[size]['protect_us'] = (
+            1e6 * min(timer.repeat(repeat=args.repeat, number=number)) / number
+        )
+    growth = results[SIZES[-1]]['protect_us'] / results[SIZES[0]]['protect_us']
+    failed = failed or growth > MAX_GROWTH
+    if args.json:
+        print(json.dumps({'results': results, 'growth': growth}, indent=2))
+    else:
+        print(
+            "%8s %14s %16s %14s  %s"
+            % (
+                'words',
+                'reference [ms]',
+                'single-pass [ms]',
+                'protect [us]',
+                '',
+            )
+        )
+        for size, result in results.items():
+            print(
+                "%8d %14.3f %16.3f %14.1f  %s"
+                % (
+                    size,
+                    result['reference_ms'],
+                    result['single_pass_ms'],
+                    result['protect_us'],
+                    'ok' if result['identical'] else 'DIFFERENT OUTPUT',
+                )
+            )
+        print(
+            "growth of protect time: %.2f (max %.1f)  %s"
+            % (growth, MAX_GROWTH, 'ok' if growth <= MAX_GROWTH else 'FAILED')
+        )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""Fixtures shared by all tests and doctests."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the record cache of CLI runs out of the home directory."""
+    monkeypatch.setenv("GETBIBTEX_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg-cache"))
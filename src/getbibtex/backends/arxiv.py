@@ -1,38 +1,278 @@
-import arxiv2bib
+import io
+import os
+import re
+import threading
+from xml.etree import ElementTree
+
 from bibtexparser.customization import splitname
 
-from ..bibtex import bibtex_entry, get_citekey, normalize_name, protect_strings
+from ..bibtex import (
+    bibtex_entry,
+    cap_authors,
+    get_citekey,
+    normalize_name,
+    protect_strings,
+)
+from ..cache import arxiv_key, get_cache
+from ..http import RateLimiter, get_session
+from ..records import Record
+from ..snapshot import arxiv_snapshot_key, get_snapshot_index
+from ..timing import timed
 
-__all__ = ['get_bibtex_from_arxiv_id']
+__all__ = ['get_bibtex_from_arxiv_id', 'get_bibtex_from_arxiv_ids']
 
 
-def get_bibtex_from_arxiv_id(
+# Maximum number of IDs in a single request to the arXiv export API
+ARXIV_BATCH_SIZE = 100
+
+# Delay (in seconds) between consecutive requests, as required by
+# https://info.arxiv.org/help/api/tou.html
+ARXIV_REQUEST_DELAY = 3.0
+
+ARXIV_API_URL = 'http://export.arxiv.org/api/query'
+
+_ATOM = '{http://www.w3.org/2005/Atom}'
+
+_RX_VERSION = re.compile(r'v\d+$')
+
+# Requests to arXiv are sent one at a time, even across separate lookups
+# (e.g., in `getbibtex serve`)
+_REQUEST_LOCK = threading.Lock()
+
+# Every HTTP request to arXiv, including retries, is at least
+# `ARXIV_REQUEST_DELAY` after the previous one
+_RATE_LIMITER = RateLimiter(1 / ARXIV_REQUEST_DELAY, burst=1)
+
+
+def _arxiv_request(ids):
+    """Send a request for the given `ids` to the arXiv export API.
+
+    Return the body of the response, an Atom feed. The request goes through
+    the active :class:`~getbibtex.http.Session`, to the URL in the
+    environment variable ``GETBIBTEX_ARXIV_API_URL``, if set (see
+    :mod:`getbibtex.standin`), or to `ARXIV_API_URL` otherwise. Every attempt
+    of the request (including retries) waits for the `_RATE_LIMITER`, so that
+    it is sent at least `ARXIV_REQUEST_DELAY` seconds after the previous one.
+    """
+    url = os.environ.get('GETBIBTEX_ARXIV_API_URL') or ARXIV_API_URL
+    params = {'id_list': ",".join(ids), 'max_results': len(ids)}
+    with _REQUEST_LOCK:
+        with timed('arxiv'):
+            response = get_session().get(
+                url, params=params, rate_limiter=_RATE_LIMITER
+            )
+    return response.raise_for_status().content
+
+
+def _entry_text(entry, tag):
+    element = entry.find(_ATOM + tag)
+    if element is None or element.text is None:
+        return ""
+    return " ".join(element.text.split())
+
+
+def _discard(root, entry):
+    entry.clear()
+    if entry in root:
+        root.remove(entry)
+
+
+def parse_arxiv_feed(feed):
+    """Iterate over the records in an Atom `feed` from the arXiv export API.
+
+    The `feed` is the complete body of a response (for up to
+    `ARXIV_BATCH_SIZE` IDs), as read by the session. It is parsed with
+    :func:`~xml.etree.ElementTree.iterparse`, and every ``<entry>`` is
+    removed from the tree as soon as the fields needed for a BibTeX entry are
+    extracted, so that the tree holds at most one entry at a time.
+
+    Yield tuples ``(arxiv_id, arxiv_record)``, where `arxiv_record` is a dict
+    with the `authors`, `title`, and `year` of the preprint. Each record is
+    yielded for the versioned arXiv ID (e.g. '2205.15044v2') and again for
+    the ID without the version. For an error that arXiv reports for an ID,
+    `arxiv_record` is an `IOError`. Entries without authors or title are
+    skipped.
+
+    Raises:
+        IOError: if `feed` is not valid XML.
+    """
+    try:
+        root = None
+        events = ElementTree.iterparse(io.BytesIO(feed), ('start', 'end'))
+        for event, element in events:
+            if root is None:
+                root = element  # the <feed>
+            if event != 'end' or element.tag != _ATOM + 'entry':
+                continue
+            title = _entry_text(element, 'title')
+            if title == "Error":
+                summary = _entry_text(element, 'summary')
+                if summary:
+                    yield summary.split()[-1], IOError(
+                        "arXiv query returned error: %s" % summary
+                    )
+                _discard(root, element)
+                continue
+            url = _entry_text(element, 'id')
+            arxiv_id = url[url.find('/abs/') + 5 :] if '/abs/' in url else ""
+            authors = [
+                " ".join(name.text.split())
+                for name in element.iterfind(
+                    _ATOM + 'author/' + _ATOM + 'name'
+                )
+                if name.text
+            ]
+            arxiv_record = {
+                'authors': authors,
+                'title': title,
+                'year': _entry_text(element, 'published')[:4],
+            }
+            _discard(root, element)
+            if arxiv_id and authors and title:
+                yield arxiv_id, arxiv_record
+                bare_id = _RX_VERSION.sub('', arxiv_id)
+                if bare_id != arxiv_id:
+                    yield bare_id, arxiv_record
+    except ElementTree.ParseError as exc_info:
+        raise IOError("arXiv returned invalid XML: %s" % exc_info)
+
+
+def _fetch_chunk(arxiv_ids):
+    """Return a dict of the arXiv records found for `arxiv_ids`.
+
+    If arXiv rejects one of the IDs (which aborts the entire query), the
+    remaining IDs are requested again.
+    """
+    records = {}
+    arxiv_ids = list(arxiv_ids)
+    while arxiv_ids:
+        rejected = set()
+        for arxiv_id, arxiv_record in parse_arxiv_feed(
+            _arxiv_request(arxiv_ids)
+        ):
+            records[arxiv_id] = arxiv_record
+            if isinstance(arxiv_record, IOError):
+                rejected.add(arxiv_id)
+        if not rejected.intersection(arxiv_ids):
+            break
+        arxiv_ids = [i for i in arxiv_ids if i not in rejected]
+    return records
+
+
+def fetch_arxiv_records(arxiv_ids):
+    """Return the arXiv records for multiple arXiv IDs.
+
+    The IDs are looked up with as few requests to the arXiv API as possible,
+    with at most `ARXIV_BATCH_SIZE` IDs per request, see
+    :func:`parse_arxiv_feed`.
+
+    Return a dict that maps each arXiv ID to a dict with the `authors`,
+    `title`, and `year` of the arXiv record, or to the exception (usually an
+    `IOError`) if the ID could not be resolved. IDs found in the active
+    snapshot index (see :func:`getbibtex.snapshot.set_snapshot_index`) are
+    not looked up at all. Otherwise, the active cache (see
+    :func:`getbibtex.cache.set_cache`) is used if possible, and updated with
+    all newly obtained records.
+    """
+    records = {}
+    cache = get_cache()
+    index = get_snapshot_index()
+    missing = []
+    for arxiv_id in dict.fromkeys(arxiv_ids):  # unique, in original order
+        arxiv_record = None
+        try:
+            if index is not None:
+                arxiv_record = index.get(arxiv_snapshot_key(arxiv_id))
+            if arxiv_record is None and cache is not None:
+                arxiv_record = cache.get(arxiv_key(arxiv_id))
+        except Exception as exc_info:  # pylint: disable=broad-except
+            # e.g. a corrupted record in the cache or snapshot index
+            arxiv_record = exc_info
+        if arxiv_record is None:
+            missing.append(arxiv_id)
+        else:
+            records[arxiv_id] = arxiv_record
+    for i in range(0, len(missing), ARXIV_BATCH_SIZE):
+        chunk = missing[i : i + ARXIV_BATCH_SIZE]
+        try:
+            found = _fetch_chunk(chunk)
+        except IOError as exc_info:
+            for arxiv_id in chunk:
+                records[arxiv_id] = IOError(
+                    "arXiv query failed: %s" % exc_info
+                )
+            continue
+        for arxiv_id in chunk:
+            arxiv_record = found.get(arxiv_id)
+            if arxiv_record is None:
+                arxiv_record = IOError("arXiv query returned no result")
+            records[arxiv_id] = arxiv_record
+            if cache is not None and not isinstance(arxiv_record, IOError):
+                cache.set(arxiv_key(arxiv_id), arxiv_record)
+    return records
+
+
+def fetch_arxiv_record(arxiv_id):
+    """Return a dict with the `authors`, `title`, and `year` of an arXiv ID.
+
+    The record is taken from the active snapshot index or cache if possible,
+    see :func:`fetch_arxiv_records`.
+    """
+    arxiv_record = fetch_arxiv_records([arxiv_id])[arxiv_id]
+    if isinstance(arxiv_record, Exception):
+        raise arxiv_record
+    return arxiv_record
+
+
+def decode_record(arxiv_record, arxiv_id):
+    """Decode an arXiv record into a :class:`~getbibtex.records.Record`.
+
+    The `arxiv_record` must be a dict with the `authors`, `title`, and `year`
+    of the preprint with the given `arxiv_id`, as returned by
+    :func:`fetch_arxiv_record`. If it is already a
+    :class:`~getbibtex.records.Record`, it is returned unchanged.
+    """
+    if isinstance(arxiv_record, Record):
+        return arxiv_record
+    first_author = splitname(arxiv_record['authors'][0])
+    return Record(
+        type='arxiv',
+        eprint=arxiv_id,
+        title=arxiv_record['title'],
+        authors=tuple(
+            cap_authors(arxiv_record['authors'], normalize=normalize_name)
+        ),
+        first_author=(
+            "".join(first_author["von"]) + "".join(first_author["last"])
+        ),
+        year=arxiv_record['year'],
+    )
+
+
+def get_bibtex(
+    arxiv_record,
     arxiv_id,
-    debug_record=False,
     fix_uppercase=False,
     auto_protect=False,
     capitalize_field_names=True,
 ):
-    try:
-        arxiv_record = arxiv2bib.arxiv2bib_dict([arxiv_id])[arxiv_id]
-    except KeyError:
-        raise IOError("arXiv query returned no result")
-    first_author = splitname(arxiv_record.authors[0])
-    first_author_name = "".join(first_author["von"]) + "".join(
-        first_author["last"]
-    )
-    citekey = get_citekey(first_author_name, journal=None, year=None)
+    """Generate a BibTeX entry for the given arXiv record.
+
+    The `arxiv_record` must be a dict with the `authors`, `title`, and `year`
+    of the preprint with the given `arxiv_id`, as returned by
+    :func:`fetch_arxiv_record`, or the :class:`~getbibtex.records.Record`
+    obtained from it with :func:`decode_record`.
+    """
+    record = decode_record(arxiv_record, arxiv_id)
+    citekey = get_citekey(record.first_author, journal=None, year=None)
     citekey += arxiv_id.replace("/", ".")
-    author = " and ".join(
-        [normalize_name(name) for name in arxiv_record.authors]
-    )
-    title = arxiv_record.title
+    author = " and ".join(record.authors)
+    title = record.title
     if fix_uppercase:
         title = title.capitalize()  # sentence-case
     else:
         title = protect_strings(title, auto_protect=auto_protect)
     journal = f"arXiv:{arxiv_id}"
-    year = arxiv_record.year
     doi = f"10.48550/arXiv.{arxiv_id}"
     doi_url = f"https://doi.org/{doi}"
     return bibtex_entry(
@@ -42,6 +282,60 @@ def get_bibtex_from_arxiv_id(
         author=author,
         title=title,
         journal=journal,
-        year=year,
+        year=record.year,
         url=doi_url,
     )
+
+
+def get_bibtex_from_arxiv_id(
+    arxiv_id,
+    debug_record=False,
+    fix_uppercase=False,
+    auto_protect=False,
+    capitalize_field_names=True,
+):
+    """Generate a BibTeX entry for the given arXiv ID."""
+    arxiv_record = fetch_arxiv_record(arxiv_id)
+    with timed('format'):
+        return get_bibtex(
+            arxiv_record,
+            arxiv_id,
+            fix_uppercase=fix_uppercase,
+            auto_protect=auto_protect,
+            capitalize_field_names=capitalize_field_names,
+        )
+
+
+def get_bibtex_from_arxiv_ids(
+    arxiv_ids,
+    debug_record=False,
+    fix_uppercase=False,
+    auto_protect=False,
+    capitalize_field_names=True,
+):
+    """Generate BibTeX entries for multiple arXiv IDs.
+
+    The records for all `arxiv_ids` are obtained with as few requests to the
+    arXiv API as possible, see :func:`fetch_arxiv_records`.
+
+    Return a dict that maps each arXiv ID to its BibTeX entry, or to the
+    exception that prevented generating an entry.
+    """
+    entries = {}
+    for arxiv_id, arxiv_record in fetch_arxiv_records(arxiv_ids).items():
+        if isinstance(arxiv_record, Exception):
+            entries[arxiv_id] = arxiv_record
+            continue
+        try:
+            with timed('format'):
+                entries[arxiv_id] = get_bibtex(
+                    arxiv_record,
+                    arxiv_id,
+                    fix_uppercase=fix_uppercase,
+                    auto_protect=auto_protect,
+                    capitalize_field_names=capitalize_field_names,
+                )
+        except Exception as exc_info:  # pylint: disable=broad-except
+            # A single malformed record must not abort a batch
+            entries[arxiv_id] = exc_info
+    return entries
@@ -1,33 +1,233 @@
+import functools
+import os
 import pprint
 import re
 import sys
+from urllib.parse import quote
 
-import habanero
-from habanero import Crossref
+from ..bibtex import (
+    _Raw,
+    bibtex_entry,
+    cap_authors,
+    get_citekey,
+    protect_strings,
+)
+from ..cache import doi_key, get_cache, query_key
+from ..executor import map_ordered
+from ..http import get_session
+from ..records import Record
+from ..snapshot import get_snapshot_index
+from ..timing import timed
 
-from ..bibtex import _Raw, bibtex_entry, get_citekey, protect_strings
-from ..journalnames import JOURNAL_NAME_TO_MACRO
+__all__ = [
+    'get_bibtex_from_doi',
+    'get_bibtex_from_dois',
+    'get_bibtex_from_query',
+    'render_record',
+]
 
-__all__ = ['get_bibtex_from_doi', 'get_bibtex_from_query']
 
+CROSSREF_API_URL = 'https://api.crossref.org'
 
-def get_names(crossref_record, field, fix_uppercase=False):
-    """Extract (author/editor) names from the Crossref record."""
+DOI_URL = 'https://doi.org'
+
+# The fields of a Crossref record that are used by `get_bibtex`. Searches
+# request only these fields (``select=...``), and only these fields are
+# stored in the cache. Crossref records are otherwise dominated by fields like
+# 'reference', 'funder', or 'license' that are never used.
+CROSSREF_FIELDS = (
+    'DOI',
+    'type',
+    'title',
+    'author',
+    'editor',
+    'issued',
+    'container-title',
+    'short-container-title',
+    'article-number',
+    'page',
+    'volume',
+    'issue',
+    'publisher',
+    'event',
+)
+
+# Maximum number of DOIs in a single filtered request to Crossref's /works
+# endpoint. This is limited by the maximum length of the request URL.
+CROSSREF_BATCH_SIZE = 100
+
+
+class Crossref:
+    """Client for the Crossref REST API.
+
+    Args:
+        session (getbibtex.http.Session or None): The HTTP session for all
+            requests. Defaults to the active session, see
+            :func:`getbibtex.http.get_session`.
+        api_url (str or None): The base URL of the Crossref REST API.
+            Defaults to the value of the environment variable
+            ``GETBIBTEX_CROSSREF_API_URL``, or `CROSSREF_API_URL`.
+        doi_url (str or None): The base URL of the DOI resolver used for
+            content negotiation. Defaults to the value of the environment
+            variable ``GETBIBTEX_DOI_URL``, or `DOI_URL`.
+
+    The environment variables allow to point all requests at a local
+    stand-in server, see :mod:`getbibtex.standin`.
+    """
+
+    def __init__(self, session=None, api_url=None, doi_url=None):
+        if session is None:
+            session = get_session()
+        self.session = session
+        if api_url is None:
+            api_url = os.environ.get('GETBIBTEX_CROSSREF_API_URL')
+        if doi_url is None:
+            doi_url = os.environ.get('GETBIBTEX_DOI_URL')
+        self.api_url = (api_url or CROSSREF_API_URL).rstrip('/')
+        self.doi_url = (doi_url or DOI_URL).rstrip('/')
+
+    def works(
+        self,
+        ids=None,
+        query_bibliographic=None,
+        filter=None,  # pylint: disable=redefined-builtin
+        limit=None,
+        select=None,
+    ):
+        """Query the /works endpoint. Return the decoded JSON response.
+
+        Args:
+            ids (str or None): A DOI to look up (``/works/{doi}``)
+            query_bibliographic (str or None): A free-form bibliographic
+                search query
+            filter (dict or None): Filters for the search, mapping a filter
+                name to a value or a list of values, e.g.
+                ``{'doi': ['10.1000/a', '10.1000/b']}``
+            limit (int or None): The maximum number of search results
+            select (list[str] or None): The fields to include in each search
+                result. By default, all fields. Crossref ignores this for a
+                lookup of `ids`.
+
+        Raises:
+            IOError: If the request fails. This includes a DOI that is not
+                known to Crossref.
+        """
+        if ids is not None:
+            url = '%s/works/%s' % (self.api_url, quote(ids, safe='/'))
+            params = {}
+        else:
+            url = '%s/works' % self.api_url
+            params = {}
+            if query_bibliographic is not None:
+                params['query.bibliographic'] = query_bibliographic
+            if filter is not None:
+                params['filter'] = ",".join(
+                    "%s:%s" % (name.replace('_', '-'), val)
+                    for (name, vals) in filter.items()
+                    for val in (vals if isinstance(vals, list) else [vals])
+                )
+            if limit is not None:
+                params['rows'] = limit
+            if select is not None:
+                params['select'] = ",".join(select)
+        if self.session.mailto is not None:
+            params['mailto'] = self.session.mailto  # "polite" pool
+        with timed('crossref'):
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+        with timed('json'):
+            try:
+                return response.json()
+            except ValueError as exc_info:
+                raise IOError("Crossref returned invalid JSON: %s" % exc_info)
+
+    def content_negotiation(self, doi, fmt='application/x-bibtex'):
+        """Obtain a citation for `doi` in the given format (mime-type).
+
+        Return the citation as a string.
+        """
+        url = '%s/%s' % (self.doi_url, quote(doi, safe='/'))
+        with timed('content-negotiation'):
+            response = self.session.get(url, headers={'Accept': fmt})
+            return response.raise_for_status().text
+
+
+def decode_record(crossref_record):
+    """Decode a Crossref record into a :class:`~getbibtex.records.Record`.
+
+    The `crossref_record` is the ``message`` of a Crossref response for a DOI
+    (or an item of the response to a search), as a dict. If it is already a
+    :class:`~getbibtex.records.Record`, it is returned unchanged.
+    """
+    if isinstance(crossref_record, Record):
+        return crossref_record
+    authors = crossref_record.get('author')
     try:
-        name_records = crossref_record[field]
+        first_author = authors[0]['family']
+    except (TypeError, KeyError, IndexError):
+        first_author = None
+    try:
+        year = crossref_record['issued']['date-parts'][0][0]
+    except (KeyError, IndexError):
+        year = None
+    try:
+        location = crossref_record['event']['location']
     except KeyError:
+        location = None
+    return Record(
+        type=crossref_record.get('type'),
+        doi=crossref_record.get('DOI'),
+        title=crossref_record.get('title', [None])[0],
+        authors=_decode_names(authors, cap=True),
+        first_author=first_author,
+        editors=_decode_names(crossref_record.get('editor')),
+        container_titles=tuple(crossref_record.get('container-title', ())),
+        short_container_titles=tuple(
+            crossref_record.get('short-container-title', ())
+        ),
+        year=year,
+        volume=crossref_record.get('volume'),
+        issue=crossref_record.get('issue'),
+        page=crossref_record.get('page'),
+        article_number=crossref_record.get('article-number'),
+        publisher=crossref_record.get('publisher'),
+        location=location,
+    )
+
+
+def _decode_name(name_record):
+    # Crossref names are already split, so they never need to be parsed
+    if 'family' not in name_record:
+        return '{' + name_record['name'] + '}'  # e.g. a collaboration
+    if 'given' not in name_record:
+        return name_record['family']
+    return f"{name_record['family']}, {name_record['given']}"
+
+
+def _decode_names(name_records, cap=False):
+    if name_records is None:
+        return None
+    if cap:
+        return tuple(cap_authors(name_records, normalize=_decode_name))
+    return tuple([_decode_name(name_record) for name_record in name_records])
+
+
+def get_names(crossref_record, field, fix_uppercase=False):
+    """Extract (author/editor) names from the Crossref record.
+
+    The `crossref_record` may be a dict or a :class:`~getbibtex.records.Record`
+    (likewise for all other helpers in this module).
+    """
+    record = decode_record(crossref_record)
+    names = {'author': record.authors, 'editor': record.editors}[field]
+    if names is None:
         return None
     if fix_uppercase:
         return " and ".join(
-            [
-                f"{a['family'].title()}, {a['given'].title()}"
-                for a in name_records
-            ]
+            [name if name == 'others' else name.title() for name in names]
         )
     else:
-        return " and ".join(
-            [f"{a['family']}, {a['given']}" for a in name_records]
-        )
+        return " and ".join(names)
 
 
 def get_journal(crossref_record, use_journal_macros=True):
@@ -36,14 +236,17 @@ def get_journal(crossref_record, use_journal_macros=True):
     If `use_journal_macros` is True, return a macro name for the
     journal if possible.
     """
-    keys = ['short-container-title', 'container-title']
-    name_candidates = [
-        name for key in keys for name in crossref_record.get(key, [])
-    ]
+    record = decode_record(crossref_record)
+    name_candidates = list(
+        record.short_container_titles + record.container_titles
+    )
+    from ..journals import get_journal_index
+
+    journal_index = get_journal_index()
     if use_journal_macros:
-        for journal_name in name_candidates:
-            if journal_name in JOURNAL_NAME_TO_MACRO:
-                return _Raw(JOURNAL_NAME_TO_MACRO[journal_name])
+        macro = journal_index.get_macro(name_candidates)
+        if macro is not None:
+            return _Raw(macro)
         print(
             "WARNING: No macro name for %s"
             % ", ".join(
@@ -51,6 +254,13 @@ def get_journal(crossref_record, use_journal_macros=True):
             ),
             file=sys.stderr,
         )
+    if not record.short_container_titles:
+        # Prefer the abbreviation of the full name, if we know it
+        for journal_name in record.container_titles:
+            if journal_name is not None:
+                abbreviation = journal_index.get_abbreviation(journal_name)
+                if abbreviation is not None:
+                    return abbreviation
     for journal_name in name_candidates:
         if journal_name is not None:
             return journal_name
@@ -58,11 +268,8 @@ def get_journal(crossref_record, use_journal_macros=True):
 
 
 def get_container_title(crossref_record):
-    keys = ['short-container-title', 'container-title']
-    name_candidates = [
-        name for key in keys for name in crossref_record.get(key, [])
-    ]
-    for name in name_candidates:
+    record = decode_record(crossref_record)
+    for name in record.short_container_titles + record.container_titles:
         if name is not None:
             return name
     return None
@@ -70,10 +277,10 @@ def get_container_title(crossref_record):
 
 def get_page(crossref_record, allow_range=False):
     """Get page or article number from Crossref record."""
-    try:
-        page = crossref_record['article-number']
-    except KeyError:
-        page = crossref_record.get('page', None)
+    record = decode_record(crossref_record)
+    page = record.article_number
+    if page is None:
+        page = record.page
     if page is not None:
         range_match = re.match(r'(\w+)\s*(-|--|---|–|——)\s*(\w+)', page)
         if range_match:
@@ -86,10 +293,7 @@ def get_page(crossref_record, allow_range=False):
 
 
 def get_event_location(crossref_record):
-    try:
-        return crossref_record['event']['location']
-    except KeyError:
-        return None
+    return decode_record(crossref_record).location
 
 
 def get_bibtex(
@@ -102,7 +306,8 @@ def get_bibtex(
     """Generate a BibTeX entry for the given Crossref record.
 
     Args:
-        crossref_record (dict): Crossref record
+        crossref_record (dict or getbibtex.records.Record): Crossref record,
+            see :func:`decode_record`
         auto_protect (bool): If True, assume that titles in the Crossref record
             are in sentence case, not in title case. That is, things that look
             like proper nouns in titles should be protected (enclosed in
@@ -115,25 +320,20 @@ def get_bibtex(
         use_journal_macros (bool): If True, use macro names for journals if
             possible (see `JOURNAL_MACRO_TO_NAME`)
     """
-    try:
-        first_author = crossref_record['author'][0]['family'].capitalize()
-    except (KeyError, IndexError):
-        first_author = None
-    author = get_names(crossref_record, 'author', fix_uppercase=fix_uppercase)
+    record = decode_record(crossref_record)
+    first_author = record.first_author
+    if first_author is not None:
+        first_author = first_author.capitalize()
+    author = get_names(record, 'author', fix_uppercase=fix_uppercase)
     if fix_uppercase:
-        title = crossref_record.get('title', [None])[0]
+        title = record.title
         if title is not None:
             title = title.capitalize()  # sentence-case
     else:
-        title = protect_strings(
-            crossref_record.get('title', [None])[0], auto_protect=auto_protect
-        )
-    try:
-        year = crossref_record['issued']['date-parts'][0][0]
-    except (KeyError, IndexError):
-        year = None
-    doi = crossref_record.get('DOI', None)
-    crossreftype = crossref_record.get('type', None)
+        title = protect_strings(record.title, auto_protect=auto_protect)
+    year = record.year
+    doi = record.doi
+    crossreftype = record.type
     crossreftype_to_entrytype = {
         'journal-article': 'article',
         'proceedings-article': 'inproceedings',
@@ -141,13 +341,11 @@ def get_bibtex(
     }
     entrytype = crossreftype_to_entrytype.get(crossreftype, None)
     if entrytype == 'article':
-        journal = get_journal(
-            crossref_record, use_journal_macros=use_journal_macros
-        )
+        journal = get_journal(record, use_journal_macros=use_journal_macros)
         citekey = get_citekey(first_author, journal, year)
-        pages = get_page(crossref_record, allow_range=False)
-        volume = crossref_record.get('volume', None)
-        number = crossref_record.get('issue', None)
+        pages = get_page(record, allow_range=False)
+        volume = record.volume
+        number = record.issue
         return bibtex_entry(
             capitalize_field_names=capitalize_field_names,
             entrytype=entrytype,
@@ -162,13 +360,11 @@ def get_bibtex(
             number=number,
         )
     elif entrytype == 'inproceedings':
-        conference = get_container_title(crossref_record)
+        conference = get_container_title(record)
         citekey = get_citekey(first_author, conference, year)
-        pages = get_page(crossref_record, allow_range=True)
-        location = get_event_location(crossref_record)
-        editor = get_names(
-            crossref_record, 'editor', fix_uppercase=fix_uppercase
-        )
+        pages = get_page(record, allow_range=True)
+        location = get_event_location(record)
+        editor = get_names(record, 'editor', fix_uppercase=fix_uppercase)
         return bibtex_entry(
             capitalize_field_names=capitalize_field_names,
             entrytype=entrytype,
@@ -184,11 +380,11 @@ def get_bibtex(
         )
     elif entrytype == 'incollection':
         citekey = get_citekey(first_author, None, year)
-        pages = get_page(crossref_record, allow_range=True)
-        editor = get_names(crossref_record, 'editor')
-        booktitle = get_container_title(crossref_record)
-        publisher = crossref_record.get('publisher', None)
-        volume = crossref_record.get('volume', None)
+        pages = get_page(record, allow_range=True)
+        editor = get_names(record, 'editor')
+        booktitle = get_container_title(record)
+        publisher = record.publisher
+        volume = record.volume
         return bibtex_entry(
             entrytype=entrytype,
             citekey=citekey,
@@ -211,6 +407,9 @@ def get_bibtex(
 
 def debug_crossref_record(crossref_record):
     """Pretty-print the given JSON record to stderr."""
+    if isinstance(crossref_record, Record):
+        pprint.pprint(crossref_record, stream=sys.stderr)
+        return
     crossref_record = crossref_record.copy()
     try:
         # including all references makes the record very verbose
@@ -220,6 +419,19 @@ def debug_crossref_record(crossref_record):
     pprint.pprint(crossref_record, stream=sys.stderr)
 
 
+def strip_record(crossref_record):
+    """Return a copy of `crossref_record` with only the `CROSSREF_FIELDS`.
+
+    >>> strip_record({'DOI': '10.1000/a', 'reference': [], 'funder': []})
+    {'DOI': '10.1000/a'}
+    """
+    return {
+        key: crossref_record[key]
+        for key in CROSSREF_FIELDS
+        if key in crossref_record
+    }
+
+
 def _check_response(res):
     if isinstance(res, dict):
         if 'status' in res:
@@ -233,32 +445,242 @@ def _check_response(res):
         raise IOError("Crossref query returned %r" % res)
 
 
-def get_bibtex_from_doi(
-    doi,
+def _get_stored_record(key, cache):
+    """Return the record for `key` from the snapshot index or `cache`."""
+    index = get_snapshot_index()
+    if index is not None:
+        crossref_record = index.get(key)
+        if crossref_record is not None:
+            return crossref_record
+    if cache is not None:
+        return cache.get(key)
+    return None
+
+
+def fetch_doi_record(doi):
+    """Return the Crossref record for the given DOI.
+
+    If a snapshot index is active (see
+    :func:`getbibtex.snapshot.set_snapshot_index`), the record is taken from
+    the index if possible. Otherwise, if a cache is active (see
+    :func:`getbibtex.cache.set_cache`), the record is taken from the cache if
+    possible, and stored in the cache otherwise. Only the `CROSSREF_FIELDS`
+    of the record are stored, see :func:`strip_record`.
+    """
+    cache = get_cache()
+    crossref_record = _get_stored_record(doi_key(doi), cache)
+    if crossref_record is not None:
+        return crossref_record
+    cr = Crossref()
+    res = cr.works(ids=doi)
+    _check_response(res)
+    crossref_record = res['message']
+    if cache is not None:
+        cache.set(doi_key(doi), strip_record(crossref_record))
+    return crossref_record
+
+
+def fetch_doi_records(dois, workers=1):
+    """Return the Crossref records for multiple DOIs.
+
+    The DOIs are looked up with filtered queries to Crossref's /works
+    endpoint (``filter=doi:...,doi:...``), with at most `CROSSREF_BATCH_SIZE`
+    DOIs per request. Any DOI that is missing from the response of such a
+    filtered query is looked up individually with :func:`fetch_doi_record`.
+    Up to `workers` requests run concurrently.
+
+    Return a dict that maps each DOI to its Crossref record, or to the
+    exception (usually an `IOError`) that prevented obtaining it. The
+    filtered queries only request the `CROSSREF_FIELDS` of each record. The
+    active cache (see :func:`getbibtex.cache.set_cache`) is used if
+    possible, and updated with all newly obtained records. DOIs found in the
+    active snapshot index are not looked up at all.
+    """
+    records = {}
+    cache = get_cache()
+    missing = []
+    for doi in dict.fromkeys(dois):  # unique, in original order
+        try:
+            crossref_record = _get_stored_record(doi_key(doi), cache)
+        except Exception as exc_info:  # pylint: disable=broad-except
+            # e.g. a corrupted record in the cache or snapshot index
+            crossref_record = exc_info
+        if crossref_record is None:
+            missing.append(doi)
+        records[doi] = crossref_record
+    chunks = [
+        missing[i : i + CROSSREF_BATCH_SIZE]
+        for i in range(0, len(missing), CROSSREF_BATCH_SIZE)
+    ]
+    for chunk_records in map_ordered(_fetch_filtered, chunks, workers):
+        for doi, crossref_record in chunk_records.items():
+            records[doi] = crossref_record
+            if cache is not None:
+                cache.set(doi_key(doi), crossref_record)
+    missing = [doi for doi in missing if records[doi] is None]
+    for doi, crossref_record in zip(
+        missing, map_ordered(_fetch_doi_record_or_error, missing, workers)
+    ):
+        records[doi] = crossref_record
+    return records
+
+
+def _fetch_filtered(dois):
+    """Return a dict of Crossref records for the DOIs found by a filter query.
+
+    DOIs that Crossref does not return are missing from the dict.
+    """
+    cr = Crossref()
+    try:
+        res = cr.works(
+            filter={'doi': dois}, limit=len(dois), select=CROSSREF_FIELDS
+        )
+        _check_response(res)
+        items = {
+            doi_key(crossref_record['DOI']): strip_record(crossref_record)
+            for crossref_record in res['message']['items']
+        }
+    except (IOError, KeyError, TypeError):
+        return {}  # fall back to individual lookups for all `dois`
+    return {doi: items[doi_key(doi)] for doi in dois if doi_key(doi) in items}
+
+
+def _fetch_doi_record_or_error(doi):
+    try:
+        return fetch_doi_record(doi)
+    except Exception as exc_info:  # pylint: disable=broad-except
+        return exc_info
+
+
+def fetch_query_record(query):
+    """Return the best-matching Crossref record for a free-form `query`.
+
+    Like :func:`fetch_doi_record`, this uses the active cache, if any. Only
+    the `CROSSREF_FIELDS` of the record are requested from Crossref.
+    """
+    cache = get_cache()
+    if cache is not None:
+        crossref_record = cache.get(query_key(query))
+        if crossref_record is not None:
+            return crossref_record
+    cr = Crossref()
+    res = cr.works(query_bibliographic=query, limit=1, select=CROSSREF_FIELDS)
+    _check_response(res)
+    crossref_record = strip_record(res['message']['items'][0])
+    if cache is not None:
+        cache.set(query_key(query), crossref_record)
+        if 'DOI' in crossref_record:
+            cache.set(doi_key(crossref_record['DOI']), crossref_record)
+    return crossref_record
+
+
+def render_record(
+    crossref_record,
+    doi=None,
     debug_record=False,
     fix_uppercase=False,
     auto_protect=False,
     capitalize_field_names=True,
     use_journal_macros=True,
 ):
-    """Generate a BibTeX entry for the given DOI."""
-    cr = Crossref()
-    res = cr.works(ids=doi)
-    _check_response(res)
-    crossref_record = res['message']
+    """Generate a BibTeX entry for an already obtained Crossref record.
+
+    If :func:`get_bibtex` cannot handle the record (e.g., for an unsupported
+    type), fall back to content negotiation for the `doi` (by default, the
+    DOI of the record). This is the only network request this function makes.
+
+    Raises:
+        NotImplementedError: if :func:`get_bibtex` cannot handle the record,
+            and the record has no DOI.
+        IOError: if content negotiation fails.
+    """
     if debug_record:
         debug_crossref_record(crossref_record)
     try:
-        return get_bibtex(
-            crossref_record,
-            fix_uppercase=fix_uppercase,
-            auto_protect=auto_protect,
-            capitalize_field_names=capitalize_field_names,
-            use_journal_macros=use_journal_macros,
-        )
+        with timed('format'):
+            record = decode_record(crossref_record)
+            return get_bibtex(
+                record,
+                fix_uppercase=fix_uppercase,
+                auto_protect=auto_protect,
+                capitalize_field_names=capitalize_field_names,
+                use_journal_macros=use_journal_macros,
+            )
     except NotImplementedError as exc_info:
+        if doi is None:
+            doi = record.doi
+            if doi is None:
+                raise
         print("WARNING: %s" % exc_info, file=sys.stderr)
-        return habanero.cn.content_negotiation(ids=doi)
+        return Crossref().content_negotiation(doi)
+
+
+def get_bibtex_from_doi(
+    doi,
+    debug_record=False,
+    fix_uppercase=False,
+    auto_protect=False,
+    capitalize_field_names=True,
+    use_journal_macros=True,
+):
+    """Generate a BibTeX entry for the given DOI.
+
+    The Crossref record is obtained with :func:`fetch_doi_record`, and
+    rendered with :func:`render_record`.
+    """
+    return render_record(
+        fetch_doi_record(doi),
+        doi=doi,
+        debug_record=debug_record,
+        fix_uppercase=fix_uppercase,
+        auto_protect=auto_protect,
+        capitalize_field_names=capitalize_field_names,
+        use_journal_macros=use_journal_macros,
+    )
+
+
+def get_bibtex_from_dois(
+    dois,
+    debug_record=False,
+    fix_uppercase=False,
+    auto_protect=False,
+    capitalize_field_names=True,
+    use_journal_macros=True,
+    workers=1,
+):
+    """Generate BibTeX entries for multiple DOIs.
+
+    The Crossref records for all `dois` are obtained with as few requests as
+    possible, see :func:`fetch_doi_records`. Each record is then rendered like
+    in :func:`get_bibtex_from_doi`. Up to `workers` requests (including any
+    fallbacks to content negotiation) run concurrently.
+
+    Return a dict that maps each DOI to its BibTeX entry, or to the exception
+    that prevented generating an entry.
+    """
+    records = fetch_doi_records(dois, workers=workers)
+    render = functools.partial(
+        _render_doi_record,
+        debug_record=debug_record,
+        fix_uppercase=fix_uppercase,
+        auto_protect=auto_protect,
+        capitalize_field_names=capitalize_field_names,
+        use_journal_macros=use_journal_macros,
+    )
+    return dict(
+        zip(records, map_ordered(render, records.items(), workers=workers))
+    )
+
+
+def _render_doi_record(item, **kwargs):
+    doi, crossref_record = item
+    if isinstance(crossref_record, Exception):
+        return crossref_record
+    try:
+        return render_record(crossref_record, doi=doi, **kwargs)
+    except Exception as exc_info:  # pylint: disable=broad-except
+        # A single malformed record must not abort a batch
+        return exc_info
 
 
 def get_bibtex_from_query(
@@ -269,25 +691,16 @@ def get_bibtex_from_query(
     capitalize_field_names=True,
     use_journal_macros=True,
 ):
-    """Generate a BibTeX entry for the given Crossref search query."""
-    cr = Crossref()
-    res = cr.works(query_bibliographic=query, limit=1)
-    _check_response(res)
-    crossref_record = res['message']['items'][0]
-    if debug_record:
-        debug_crossref_record(crossref_record)
-    try:
-        return get_bibtex(
-            crossref_record,
-            fix_uppercase=fix_uppercase,
-            auto_protect=auto_protect,
-            capitalize_field_names=capitalize_field_names,
-            use_journal_macros=use_journal_macros,
-        )
-    except NotImplementedError:
-        # Note that we can't fall back to content negotiation directly, due to
-        # https://github.com/sckott/habanero/issues/83
-        if 'DOI' in crossref_record:
-            return get_bibtex_from_doi(crossref_record['DOI'])
-        else:
-            raise
+    """Generate a BibTeX entry for the given Crossref search query.
+
+    The best-matching Crossref record is obtained with
+    :func:`fetch_query_record`, and rendered with :func:`render_record`.
+    """
+    return render_record(
+        fetch_query_record(query),
+        debug_record=debug_record,
+        fix_uppercase=fix_uppercase,
+        auto_protect=auto_protect,
+        capitalize_field_names=capitalize_field_names,
+        use_journal_macros=use_journal_macros,
+    )
@@ -0,0 +1,178 @@
+"""Resolve many queries in a single run."""
+
+import functools
+import itertools
+import sys
+
+from .executor import map_ordered
+from .query import classify_query, resolve_query
+from .timing import timed
+
+__all__ = ['read_queries', 'resolve_batch', 'write_batch']
+
+
+# Number of queries that are classified together, so that all arXiv IDs and
+# DOIs among them can be resolved with a few bulk requests
+BATCH_CHUNK_SIZE = 500
+
+
+def read_queries(files):
+    """Iterate over the queries in the given `files`, one query per line.
+
+    Each element of `files` is a path, or '-' for stdin. Empty lines and lines
+    starting with '#' are skipped. Yield tuples ``(location, query)`` where
+    `location` is a string ``"<file>:<lineno>"`` for error messages.
+    """
+    for filename in files:
+        if filename == '-':
+            yield from _read_lines(sys.stdin, '<stdin>')
+        else:
+            with open(filename, encoding='utf-8') as in_fh:
+                yield from _read_lines(in_fh, filename)
+
+
+def _read_lines(in_fh, name):
+    for lineno, line in enumerate(in_fh, start=1):
+        query = line.strip()
+        if query and not query.startswith('#'):
+            yield f"{name}:{lineno}", query
+
+
+def resolve_batch(queries, chunk_size=BATCH_CHUNK_SIZE, workers=1, **kwargs):
+    """Resolve the given `queries`.
+
+    The `queries` must be an iterable of tuples ``(location, query)``, as
+    returned by :func:`read_queries`. Yield tuples ``(location, query, entry,
+    error)`` in the same order. If a query could not be resolved, `entry` is
+    None and `error` is the exception that was raised; otherwise, `error` is
+    None. All keyword arguments are passed to
+    :func:`~getbibtex.query.resolve_query`.
+
+    The `queries` are processed in chunks of `chunk_size`. Within each chunk,
+    all arXiv IDs and all DOIs are resolved together, see
+    :func:`~getbibtex.backends.arxiv.get_bibtex_from_arxiv_ids` and
+    :func:`~getbibtex.backends.crossref.get_bibtex_from_dois`. These bulk
+    lookups and the lookups for all other queries run concurrently in up to
+    `workers` threads, see :func:`~getbibtex.executor.map_ordered`.
+    """
+    queries = iter(queries)
+    while True:
+        chunk = list(itertools.islice(queries, chunk_size))
+        if not chunk:
+            break
+        yield from _resolve_chunk(chunk, workers, **kwargs)
+
+
+def _resolve_single(query, **kwargs):
+    try:
+        return resolve_query(query, **kwargs)
+    except Exception as exc_info:  # pylint: disable=broad-except
+        # A single bad line must not abort a run of thousands of queries
+        return exc_info
+
+
+def _get_bibtex_bulk(kind, identifiers, workers, use_journal_macros, **kwargs):
+    # Backends are imported on demand, so that only the backends for the
+    # kinds of identifiers in the batch are loaded
+    try:
+        if kind == 'arxiv':
+            with timed('import'):
+                from .backends.arxiv import get_bibtex_from_arxiv_ids
+
+            return get_bibtex_from_arxiv_ids(identifiers, **kwargs)
+        else:
+            with timed('import'):
+                from .backends.crossref import get_bibtex_from_dois
+
+            return get_bibtex_from_dois(
+                identifiers,
+                workers=workers,
+                use_journal_macros=use_journal_macros,
+                **kwargs,
+            )
+    except Exception as exc_info:  # pylint: disable=broad-except
+        # An error of the bulk lookup itself (not of a single identifier)
+        # fails the queries for all of its identifiers, but not the run
+        return {identifier: exc_info for identifier in identifiers}
+
+
+def _resolve_chunk(chunk, workers, use_journal_macros=True, **kwargs):
+    classified = [
+        (location, query, *classify_query(query)) for location, query in chunk
+    ]
+    identifiers = {'arxiv': [], 'doi': []}
+    for _, _, kind, identifier in classified:
+        if kind in identifiers:
+            identifiers[kind].append(identifier)
+    bulk_kinds = [kind for kind in identifiers if identifiers[kind]]
+    single_tasks = [
+        functools.partial(
+            _resolve_single,
+            query,
+            use_journal_macros=use_journal_macros,
+            **kwargs,
+        )
+        for _, query, kind, _ in classified
+        if kind not in identifiers
+    ]
+    # The bulk lookup of DOIs runs its own requests concurrently. Together
+    # with the other tasks that run at the same time (each making one request
+    # at a time), there must be at most `workers` requests in flight.
+    n_concurrent = min(len(bulk_kinds) - 1 + len(single_tasks), workers - 1)
+    bulk_workers = max(workers - max(n_concurrent, 0), 1)
+    tasks = [
+        functools.partial(
+            _get_bibtex_bulk,
+            kind,
+            identifiers[kind],
+            workers=bulk_workers,
+            use_journal_macros=use_journal_macros,
+            **kwargs,
+        )
+        for kind in bulk_kinds
+    ]
+    tasks.extend(single_tasks)
+    results = map_ordered(lambda task: task(), tasks, workers=workers)
+    # The results of the bulk lookups come first, then one result for each
+    # other query, in order
+    bulk_entries = dict(zip(bulk_kinds, results))
+    single_results = iter(results)
+    for location, query, kind, identifier in classified:
+        if kind in identifiers:
+            result = bulk_entries[kind][identifier]
+        else:
+            result = next(single_results, None)
+        if isinstance(result, Exception):
+            yield location, query, None, result
+        else:
+            yield location, query, result, None
+
+
+def write_batch(results, out_fh, err_fh=None, append=False, citekeys=None):
+    """Write the `results` of :func:`resolve_batch` as they become available.
+
+    Entries are written to `out_fh`, separated by blank lines. If `append` is
+    True, `out_fh` already contains entries, and the first entry is also
+    preceded by a blank line. If `citekeys` is given as a
+    :class:`~getbibtex.bibfile.CitekeyRegistry`, the citation key of each
+    entry is replaced by a unique variant, if it is already in use. Errors are
+    reported on `err_fh` (stderr by default). Return the number of failed
+    queries.
+    """
+    if err_fh is None:
+        err_fh = sys.stderr
+    n_failed = 0
+    n_written = 0
+    for location, query, entry, error in results:
+        if error is None:
+            if citekeys is not None:
+                entry = citekeys.register_entry(entry)
+            if n_written > 0 or append:
+                out_fh.write("\n")
+            out_fh.write(entry + "\n")
+            out_fh.flush()
+            n_written += 1
+        else:
+            n_failed += 1
+            print("ERROR: %s: %s: %s" % (location, query, error), file=err_fh)
+    return n_failed
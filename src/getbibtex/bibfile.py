@@ -0,0 +1,259 @@
+"""Index of the entries in an existing BibTeX file.
+
+For large bibliographies, only the information needed to identify an entry
+is kept: its citation key, DOI, and arXiv ID. The file is scanned line by line
+(see :func:`scan_bibfile`), instead of being parsed into a full database.
+"""
+
+import io
+import os
+import re
+
+from .query import classify_query
+
+__all__ = [
+    'BibIndex',
+    'CitekeyRegistry',
+    'filter_new_queries',
+    'scan_bibfile',
+]
+
+
+_RX_ENTRY_START = re.compile(r'^\s*@\s*(\w+)\s*[{(]\s*([^,\s]*)\s*,')
+
+# A field ``name = value`` anywhere in a line. Matching all fields (not just
+# the ones that are indexed) skips over their values, so that text like
+# "doi = ..." inside e.g. a title is not mistaken for a field.
+_RX_FIELD = re.compile(
+    r"""
+    ([a-z][\w-]*) \s* = \s*
+    (?:
+        \{ ((?:[^{}]|\{[^{}]*\})*) \}    # braced value (one level of nesting)
+      | " ([^"]*) "                     # quoted value
+      | \{ ([^{}]*) $                   # braced value continuing on next line
+      | ([^\s,{}"]+)                    # number or macro
+    )
+    """,
+    re.I | re.X,
+)
+
+# Fields used to identify an entry
+_INDEXED_FIELDS = {'doi', 'eprint', 'journal', 'url'}
+
+_RX_ARXIV_VERSION = re.compile(r'v\d+$')
+
+_RX_ENTRY_CITEKEY = re.compile(r'^(\s*@\s*\w+\s*[{(]\s*)([^,\s]*)')
+
+# Entry types that do not describe a reference
+_NON_ENTRY_TYPES = {'comment', 'preamble', 'string'}
+
+
+def scan_bibfile(in_fh):
+    """Iterate over the entries in a BibTeX file.
+
+    Yield tuples ``(citekey, fields)`` for every entry in the open file
+    `in_fh`, where `fields` is a dict with the (lowercase) names 'doi',
+    'eprint', 'journal', and 'url', if the entry has these fields. Fields may
+    be anywhere in a line, including the line that starts the entry (e.g.,
+    for entries on a single line). Only fields whose value starts on the
+    same line as the field name are found, which is the case for all of
+    these fields in practice.
+    """
+    citekey = None
+    fields = {}
+    for line in in_fh:
+        start = 0
+        match = _RX_ENTRY_START.match(line)
+        if match:
+            if citekey is not None:
+                yield citekey, fields
+            citekey = None
+            fields = {}
+            if match.group(1).lower() not in _NON_ENTRY_TYPES:
+                citekey = match.group(2)
+            start = match.end()
+        if citekey is not None:
+            for match in _RX_FIELD.finditer(line, start):
+                name = match.group(1).lower()
+                if name in _INDEXED_FIELDS:
+                    # Exactly one of the alternative value groups matched
+                    value = match.group(match.lastindex)
+                    fields[name] = value.strip()
+    if citekey is not None:
+        yield citekey, fields
+
+
+def _normalize_arxiv_id(arxiv_id):
+    return _RX_ARXIV_VERSION.sub('', arxiv_id)
+
+
+def _identifiers(fields):
+    """Iterate over tuples ``(kind, identifier)`` in the entry `fields`."""
+    candidates = [fields.get('doi'), fields.get('url'), fields.get('journal')]
+    eprint = fields.get('eprint')
+    if eprint:
+        candidates.append('arXiv:' + eprint)
+    for value in candidates:
+        if value:
+            kind, identifier = classify_query(value.replace(' ', ''))
+            if kind == 'doi':
+                yield kind, identifier.lower()
+            elif kind == 'arxiv':
+                yield kind, _normalize_arxiv_id(identifier)
+
+
+class BibIndex:
+    """Index of the DOIs, arXiv IDs and citation keys in a bibliography.
+
+    Args:
+        filename (str or None): If given, the BibTeX file whose entries
+            should be indexed, see :meth:`add_file`.
+
+    Attributes:
+        dois (set): The lowercase DOIs of all entries
+        arxiv_ids (set): The arXiv IDs (without version) of all entries
+        citekeys (set): The citation keys of all entries
+    """
+
+    def __init__(self, filename=None):
+        self.dois = set()
+        self.arxiv_ids = set()
+        self.citekeys = set()
+        if filename is not None:
+            self.add_file(filename)
+
+    def __len__(self):
+        return len(self.citekeys)
+
+    def add_file(self, filename):
+        """Add all entries in the BibTeX file `filename` to the index.
+
+        A file that does not exist is treated as empty.
+        """
+        if os.path.exists(filename):
+            with open(filename, encoding='utf-8') as in_fh:
+                for citekey, fields in scan_bibfile(in_fh):
+                    self.add(citekey, fields)
+
+    def add_entry(self, entry):
+        """Add the BibTeX `entry` (a string) to the index."""
+        for citekey, fields in scan_bibfile(io.StringIO(entry)):
+            self.add(citekey, fields)
+
+    def add(self, citekey, fields):
+        """Add an entry to the index, as yielded by :func:`scan_bibfile`."""
+        self.citekeys.add(citekey)
+        for kind, identifier in _identifiers(fields):
+            if kind == 'doi':
+                self.dois.add(identifier)
+            else:
+                self.arxiv_ids.add(identifier)
+
+    def add_query(self, query):
+        """Add the identifier in the `query` string to the index.
+
+        Free-form queries are ignored.
+        """
+        kind, identifier = classify_query(query)
+        if kind == 'doi':
+            self.dois.add(identifier.lower())
+        elif kind == 'arxiv':
+            self.arxiv_ids.add(_normalize_arxiv_id(identifier))
+
+    def contains_query(self, query):
+        """Check whether the DOI or arXiv ID in `query` is in the index.
+
+        Free-form queries are never in the index.
+        """
+        kind, identifier = classify_query(query)
+        if kind == 'doi':
+            return identifier.lower() in self.dois
+        elif kind == 'arxiv':
+            return _normalize_arxiv_id(identifier) in self.arxiv_ids
+        return False
+
+
+def filter_new_queries(queries, bib_index, skipped=None):
+    """Filter out the queries for entries that are already in `bib_index`.
+
+    The `queries` must be an iterable of tuples ``(location, query)``, as
+    returned by :func:`~getbibtex.batch.read_queries`. Yield only the tuples
+    for queries that are not in `bib_index`, see
+    :meth:`BibIndex.contains_query`. Each yielded query is added to
+    `bib_index`, so that duplicate queries are only resolved once. The tuples
+    for the skipped queries are appended to the list `skipped`, if given.
+    """
+    for location, query in queries:
+        if bib_index.contains_query(query):
+            if skipped is not None:
+                skipped.append((location, query))
+        else:
+            bib_index.add_query(query)
+            yield location, query
+
+
+def _suffix(n):
+    """The `n`'th disambiguating suffix for a citation key.
+
+    >>> [_suffix(n) for n in (0, 1, 25, 26, 27, 701, 702)]
+    ['a', 'b', 'z', 'aa', 'ab', 'zz', 'aaa']
+    """
+    suffix = ''
+    n += 1
+    while n > 0:
+        n, remainder = divmod(n - 1, 26)
+        suffix = chr(ord('a') + remainder) + suffix
+    return suffix
+
+
+class CitekeyRegistry:
+    """Registry of the citation keys used in a bibliography.
+
+    Args:
+        citekeys (iterable): Citation keys that are already in use, e.g. the
+            :attr:`BibIndex.citekeys` of an existing bibliography.
+
+    Every key obtained from :meth:`register` is unique: a key that is already
+    in use gets the first free suffix 'a', 'b', ..., 'z', 'aa', ... appended,
+    e.g. "GoerzPRA2019a" for the second "GoerzPRA2019". The result depends
+    only on the order in which keys are registered.
+    """
+
+    def __init__(self, citekeys=()):
+        self.citekeys = set(citekeys)
+        # For every key that had a collision, the number of the next suffix
+        # to try, so that we don't have to try all the taken suffixes again
+        self._next_suffix = {}
+
+    def __contains__(self, citekey):
+        return citekey in self.citekeys
+
+    def __len__(self):
+        return len(self.citekeys)
+
+    def register(self, citekey):
+        """Mark `citekey` as used, and return it, or a unique variant of it."""
+        unique_key = citekey
+        if citekey in self.citekeys:
+            n = self._next_suffix.get(citekey, 0)
+            unique_key = citekey + _suffix(n)
+            while unique_key in self.citekeys:
+                n += 1
+                unique_key = citekey + _suffix(n)
+            self._next_suffix[citekey] = n + 1
+        self.citekeys.add(unique_key)
+        return unique_key
+
+    def register_entry(self, entry):
+        """Register the citation key of the BibTeX `entry` (a string).
+
+        Return the `entry`, with its citation key replaced by a unique
+        variant, if necessary.
+        """
+        match = _RX_ENTRY_CITEKEY.match(entry)
+        if match is None:
+            return entry
+        citekey = self.register(match.group(2))
+        if citekey == match.group(2):
+            return entry
+        return match.group(1) + citekey + entry[match.end() :]
@@ -1,23 +1,158 @@
 import re
 
-from bibtexparser.customization import splitname
 from unidecode import unidecode
 
-from .journalnames import JOURNAL_INITIALS, JOURNAL_MACRO_TO_NAME
+from .timing import timed
 
 
 def _rx_word(word):
     """Regex for non-protected word that is not at beginning of string."""
-    return re.compile(r'(?<!^)(?<!\{)\b' + word + r'\b(?!\})')
+    return re.compile(r'(?<!^)(?<!\{)\b' + re.escape(word) + r'\b(?!\})')
+
+
+# Any non-protected word (a maximal run of word characters) that is not at
+# the beginning of the string. This matches exactly the same occurrences of a
+# word as `_rx_word(word)`, for any word consisting only of word characters.
+_RX_ANY_WORD = re.compile(r'(?<!^)(?<!\{)\b(\w+)\b(?!\})')
+
+_RX_ONLY_WORD_CHARS = re.compile(r'\w+')
 
 
 PROTECTED_WORDS = """
 Schrödinger Rydberg Krotov Bose Einstein Dirac NMR GRAPE CRAB
 """.split()
 
-_PROTECTED_WORDS = [
-    (_rx_word(word), '{' + word + '}') for word in PROTECTED_WORDS
-]
+
+class ProtectedWords:
+    """Matcher for words that must be protected (enclosed in braces) in titles.
+
+    Args:
+        words (list[str]): The words to protect, e.g. `PROTECTED_WORDS`.
+
+    The matcher makes a single pass over a title, looking up each word in a
+    set. Thus, its cost does not depend on the number of protected words.
+    Only "words" that contain non-word characters (e.g. "Bose-Einstein") are
+    matched with a separate regex each.
+    """
+
+    def __init__(self, words=()):
+        self.words = []
+        self._all = set()
+        self._simple = set()
+        self._complex = []
+        self.add(words)
+
+    def add(self, words):
+        """Add the given `words` to the matcher."""
+        for word in words:
+            if word in self._all:
+                continue
+            self.words.append(word)
+            self._all.add(word)
+            if _RX_ONLY_WORD_CHARS.fullmatch(word):
+                self._simple.add(word)
+            else:
+                self._complex.append((_rx_word(word), '{' + word + '}'))
+
+    def __contains__(self, word):
+        return word in self._all
+
+    def __len__(self):
+        return len(self.words)
+
+    def _protect_match(self, match):
+        word = match.group(1)
+        if word in self._simple:
+            return '{' + word + '}'
+        return word
+
+    def protect(self, s):
+        """Enclose all unprotected occurrences of the words in `s` in braces.
+
+        The first word in `s` is never protected.
+        """
+        if self._simple:
+            s = _RX_ANY_WORD.sub(self._protect_match, s)
+        for rx, repl in self._complex:
+            s = rx.sub(repl, s)
+        return s
+
+
+def load_protected_words(filename):
+    """Read a list of protected words from the given file.
+
+    The file must contain one word per line. Empty lines and lines starting
+    with '#' are ignored.
+    """
+    words = []
+    with open(filename, encoding='utf-8') as in_fh:
+        for line in in_fh:
+            word = line.strip()
+            if word and not word.startswith('#'):
+                words.append(word)
+    return words
+
+
+_PROTECTED_WORDS = ProtectedWords(PROTECTED_WORDS)
+
+
+def get_protected_words():
+    """Return the active :class:`ProtectedWords` matcher."""
+    return _PROTECTED_WORDS
+
+
+def set_protected_words(protected_words):
+    """Set the active :class:`ProtectedWords` matcher used for all titles.
+
+    Passing None resets to a matcher for `PROTECTED_WORDS`. Return the
+    previously active matcher.
+    """
+    global _PROTECTED_WORDS
+    previous = _PROTECTED_WORDS
+    if protected_words is None:
+        protected_words = ProtectedWords(PROTECTED_WORDS)
+    _PROTECTED_WORDS = protected_words
+    return previous
+
+
+_MAX_AUTHORS = None
+
+
+def get_max_authors():
+    """Return the maximum number of authors listed in an entry, or None."""
+    return _MAX_AUTHORS
+
+
+def set_max_authors(max_authors):
+    """Set the maximum number of authors listed in all entries.
+
+    For publications with more than `max_authors` authors (e.g., papers by
+    large collaborations), only the first `max_authors` are listed, followed
+    by "others" (which BibTeX renders as "et al."). The names of the remaining
+    authors are not processed at all. Passing None lists all authors (the
+    default). Return the previous maximum.
+    """
+    global _MAX_AUTHORS
+    previous = _MAX_AUTHORS
+    _MAX_AUTHORS = max_authors
+    return previous
+
+
+def cap_authors(names, normalize=None):
+    """Return the list of author `names`, capped to :func:`get_max_authors`.
+
+    If `normalize` is given, it is applied to each name that is kept. If any
+    names are dropped, "others" is appended to the list.
+    """
+    max_authors = _MAX_AUTHORS
+    authors = names[:max_authors]
+    if normalize is not None:
+        authors = [normalize(name) for name in authors]
+    else:
+        authors = list(authors)
+    if max_authors is not None and len(names) > max_authors:
+        authors.append('others')
+    return authors
 
 
 # We define some ascii versions of unicode author last names. These override
@@ -34,7 +169,8 @@ RX_PROPER_NOUNS = re.compile(
     (?<![:.?!]\s)           # Ignore at beginning of sentence
     (?<!\{)                 # Ignore words already protected
     \b                      # Word boundary (\w -> \W)
-    (\w*[A-Z]\w*)           # Word containing a capital letter
+    (?=\w*[A-Z])            # Word containing a capital letter ...
+    (\w+)                   # ... (checked first, for linear time)
     (\b|$)                  # Word boundary (\w -> \W)
     (?!\})                  # Ignore words already protected
     ''',
@@ -47,13 +183,75 @@ class _Raw(str):
 
 
 def get_journal_initials(journal):
+    from .journalnames import JOURNAL_INITIALS, JOURNAL_MACRO_TO_NAME
+
     if isinstance(journal, _Raw):
         journal = JOURNAL_MACRO_TO_NAME[journal]
     return JOURNAL_INITIALS.get(journal, ''.join(re.findall('[A-Z]', journal)))
 
 
+# Characters separating the words in a name, like in BibTeX
+_RX_NAME_SEPARATORS = re.compile(r'[ ~\r\n\t]+')
+
+
+def _capitalized_words(section):
+    """Return the words in `section`, or None if any word is not capitalized.
+
+    >>> _capitalized_words(' Michael  H.~Goerz')
+    ['Michael', 'H.', 'Goerz']
+    >>> _capitalized_words('Ludwig van Beethoven') is None
+    True
+    """
+    words = [word for word in _RX_NAME_SEPARATORS.split(section) if word]
+    for word in words:
+        if not (word[0].isalpha() and word[0].isupper()):
+            return None
+    return words
+
+
+def _normalize_simple_name(name):
+    """Normalize a `name` as `Last, Jr, First`, or return None.
+
+    This handles names without braces, escapes, or "von" parts, which covers
+    almost all names in records from the backends, without the overhead of
+    BibTeX's full name parsing. Return None for any other name.
+
+    >>> _normalize_simple_name('Michael H. Goerz')
+    'Goerz, Michael H.'
+    >>> _normalize_simple_name('Smith, Jr, John')
+    'Smith, Jr, John'
+    >>> _normalize_simple_name('Ludwig van Beethoven') is None
+    True
+    """
+    if '{' in name or '}' in name or '\\' in name:
+        return None
+    sections = name.split(',')
+    if len(sections) == 1:
+        words = _capitalized_words(name)
+        if not words:
+            return None
+        return words[-1] + ", " + " ".join(words[:-1])
+    if len(sections) > 3:
+        return None
+    last = _capitalized_words(sections[0])
+    if not last:
+        return None
+    parts = [" ".join(last)]
+    for section in sections[1:]:
+        words = [word for word in _RX_NAME_SEPARATORS.split(section) if word]
+        if not words:
+            return None
+        parts.append(" ".join(words))
+    return ", ".join(parts)
+
+
 def normalize_name(name):
     """Normalize the given `name` as `Last, Jr, First`."""
+    normalized_name = _normalize_simple_name(name)
+    if normalized_name is not None:
+        return normalized_name
+    from bibtexparser.customization import splitname  # slow import
+
     parts = splitname(name)
     normalized_name = " ".join(parts["von"]) + " ".join(parts["last"])
     if len(parts["jr"]) > 0:
@@ -118,15 +316,17 @@ TITLE_LC_WORDS = set(
 )
 
 
-def detect_title_case(title):
+def detect_title_case(title, protected_words=None):
     """Heuristically detect if the given `title` string uses title case."""
+    if protected_words is None:
+        protected_words = _PROTECTED_WORDS
     lc = 0
     tc = 0
     for word in title.split()[1:]:
         if (
             len(word) > 3
             and word.lower() not in TITLE_LC_WORDS
-            and word not in PROTECTED_WORDS
+            and word not in protected_words
         ):
             if word.capitalize() == word:
                 tc += 1
@@ -135,24 +335,23 @@ def detect_title_case(title):
     return tc > lc and tc > 2
 
 
-def protect_strings(s, auto_protect=None):
+def protect_strings(s, auto_protect=None, protected_words=None):
+    """Protect proper nouns in the title `s` by enclosing them in braces.
+
+    If `auto_protect` is True, protect all words containing a capital letter
+    (except at the beginning of a sentence). If None, do this only if `s` does
+    not seem to be in title case. In any case, protect all `protected_words`
+    (a :class:`ProtectedWords` matcher, defaulting to the active one, see
+    :func:`set_protected_words`).
+    """
     if s is not None:
-        if auto_protect is None:
-            auto_protect = not detect_title_case(s)
-        s = s.replace("\n", "\\\\")
-        if auto_protect:
-            rx_proper_nouns = re.compile(
-                r'''
-                (?<!^)                  # Do not match at beginning of string
-                (?<!\{)                 # Ignore words already protected
-                \b                      # Word boundary (\w -> \W)
-                (\w*[A-Z]\w{2,})        # Word containing a capital letter
-                (\b|$)                  # Word boundary (\w -> \W)
-                (?!\})                  # Ignore words already protected
-                ''',
-                re.X,
-            )
-            s = RX_PROPER_NOUNS.sub(r'{\1}', s)
-        for rx, repl in _PROTECTED_WORDS:
-            s = rx.sub(repl, s)
+        if protected_words is None:
+            protected_words = _PROTECTED_WORDS
+        with timed('title'):
+            if auto_protect is None:
+                auto_protect = not detect_title_case(s, protected_words)
+            s = s.replace("\n", "\\\\")
+            if auto_protect:
+                s = RX_PROPER_NOUNS.sub(r'{\1}', s)
+            s = protected_words.protect(s)
     return s
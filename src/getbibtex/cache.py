@@ -0,0 +1,298 @@
+"""Persistent on-disk cache of backend records.
+
+The cache stores the raw records returned by the backends (e.g. the
+``message`` of a Crossref response), not the rendered BibTeX. Changing any of
+the formatting options therefore re-renders an entry from the cache without a
+network request.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from .timing import timed
+
+__all__ = [
+    'RecordCache',
+    'default_cache_dir',
+    'get_cache',
+    'set_cache',
+    'arxiv_key',
+    'doi_key',
+    'query_key',
+]
+
+
+DEFAULT_TTL = 30 * 24 * 3600  # seconds
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024  # bytes
+
+_CACHE = None
+
+
+def default_cache_dir():
+    """Return the default cache directory.
+
+    This is ``$XDG_CACHE_HOME/getbibtex``, or ``~/.cache/getbibtex`` if
+    ``XDG_CACHE_HOME`` is not set.
+    """
+    xdg_cache_home = os.environ.get('XDG_CACHE_HOME', '')
+    if not xdg_cache_home:
+        xdg_cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg_cache_home, 'getbibtex')
+
+
+def get_cache():
+    """Return the active :class:`RecordCache`, or None if caching is off."""
+    return _CACHE
+
+
+def set_cache(cache):
+    """Set the active :class:`RecordCache` used by all backends.
+
+    Passing None disables caching (the default). Return the previously active
+    cache.
+    """
+    global _CACHE
+    previous = _CACHE
+    _CACHE = cache
+    return previous
+
+
+def doi_key(doi):
+    """Cache key for a Crossref record, given its DOI.
+
+    DOIs are case-insensitive.
+
+    >>> doi_key('10.1103/PhysRevA.89.032334')
+    'doi:10.1103/physreva.89.032334'
+    """
+    return 'doi:' + doi.strip().lower()
+
+
+def arxiv_key(arxiv_id):
+    """Cache key for an arXiv record.
+
+    >>> arxiv_key('2205.15044')
+    'arxiv:2205.15044'
+    """
+    return 'arxiv:' + arxiv_id.strip()
+
+
+def query_key(query):
+    """Cache key for the result of a free-form Crossref query.
+
+    >>> query_key('Goerz  Krotov\tSciPost')
+    'query:goerz krotov scipost'
+    """
+    return 'query:' + " ".join(query.split()).casefold()
+
+
+class RecordCache:
+    """SQLite cache of JSON-serializable records.
+
+    Args:
+        path (str): The SQLite database file. Parent directories are created
+            as necessary.
+        ttl (float): Time (in seconds) after which a record expires. If None,
+            records never expire.
+        max_size (int): Approximate limit (in bytes) for the total size of
+            all stored records. When exceeded, the least recently used records
+            are evicted. If None, the size is unbounded.
+
+    The cache can be used from multiple threads. As the cache is only an
+    optimization, a failure of the database in :meth:`get` or :meth:`set`
+    (e.g., "database is locked", if another process writes to the same file)
+    prints a warning to stderr, and is treated as a miss or is ignored.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        import sqlite3  # not needed when the cache is disabled
+
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        dirname = os.path.dirname(os.path.abspath(path))
+        os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db_error = sqlite3.Error
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                key TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS records_accessed
+                ON records (accessed);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """)
+        self._size = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM records"
+        ).fetchone()[0]
+
+    @classmethod
+    def default(cls, **kwargs):
+        """Open the cache in :func:`default_cache_dir`."""
+        return cls(
+            os.path.join(default_cache_dir(), 'records.sqlite'), **kwargs
+        )
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._db.close()
+
+    def _is_expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def _count(self, name):
+        self._db.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def _warn(self, exc_info):
+        print("WARNING: Cache %s: %s" % (self.path, exc_info), file=sys.stderr)
+
+    def get(self, key):
+        """Return the record stored for `key`, or None.
+
+        Expired records are removed and reported as missing.
+        """
+        now = time.time()
+        with timed('cache'), self._lock:
+            size = self._size
+            try:
+                with self._db:
+                    row = self._get(key, now)
+            except self._db_error as exc_info:
+                self._size = size
+                self._warn(exc_info)
+                return None
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def _get(self, key, now):
+        row = self._db.execute(
+            "SELECT record, created, size FROM records WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is not None and self._is_expired(row[1], now):
+            self._db.execute("DELETE FROM records WHERE key = ?", (key,))
+            self._size -= row[2]
+            row = None
+        if row is None:
+            self._count('misses')
+            return None
+        self._db.execute(
+            "UPDATE records SET accessed = ? WHERE key = ?", (now, key)
+        )
+        self._count('hits')
+        return row
+
+    def set(self, key, record):
+        """Store the JSON-serializable `record` for `key`."""
+        data = json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+        now = time.time()
+        with timed('cache'), self._lock:
+            size = self._size
+            try:
+                with self._db:
+                    self._set(key, data, now)
+            except self._db_error as exc_info:
+                self._size = size
+                self._warn(exc_info)
+
+    def _set(self, key, data, now):
+        size = len(data.encode('utf-8'))
+        row = self._db.execute(
+            "SELECT size FROM records WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            self._size -= row[0]
+        self._db.execute(
+            "INSERT OR REPLACE INTO records "
+            "(key, record, size, created, accessed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, data, size, now, now),
+        )
+        self._size += size
+        if self.max_size is not None and self._size > self.max_size:
+            self._evict(self.max_size)
+
+    def _evict(self, max_size):
+        # Evict down to 90% of `max_size`, so that we don't have to evict
+        # again on the very next `set`
+        target = 0.9 * max_size
+        n_removed = 0
+        rows = self._db.execute(
+            "SELECT key, size FROM records ORDER BY accessed"
+        ).fetchall()
+        for key, size in rows:
+            if self._size <= target:
+                break
+            self._db.execute("DELETE FROM records WHERE key = ?", (key,))
+            self._size -= size
+            n_removed += 1
+        return n_removed
+
+    def prune(self):
+        """Remove expired records, and evict records exceeding `max_size`.
+
+        Return the number of removed records.
+        """
+        with self._lock, self._db:
+            n_removed = 0
+            if self.ttl is not None:
+                cutoff = time.time() - self.ttl
+                n_removed += self._db.execute(
+                    "DELETE FROM records WHERE created < ?", (cutoff,)
+                ).rowcount
+                self._size = self._db.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM records"
+                ).fetchone()[0]
+            if self.max_size is not None and self._size > self.max_size:
+                n_removed += self._evict(self.max_size)
+        with self._lock:
+            self._db.execute("VACUUM")
+        return n_removed
+
+    def clear(self):
+        """Remove all records and reset the statistics."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM records")
+            self._db.execute("DELETE FROM counters")
+            self._size = 0
+        with self._lock:
+            self._db.execute("VACUUM")
+
+    def stats(self):
+        """Return a dict of statistics about the cache.
+
+        The dict contains the `path` of the database, the number of `entries`,
+        their total `size` (in bytes), and the number of `hits` and `misses`
+        since the cache was last cleared.
+        """
+        with self._lock:
+            entries = self._db.execute(
+                "SELECT COUNT(*) FROM records"
+            ).fetchone()[0]
+            counters = dict(
+                self._db.execute("SELECT name, value FROM counters")
+            )
+        return {
+            'path': self.path,
+            'entries': entries,
+            'size': self._size,
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+        }
@@ -0,0 +1,813 @@
+"""Command line interface.
+
+Only ``click`` is imported at module level, so that e.g. ``getbibtex --help``
+stays fast. Everything else is imported by the commands that need it.
+"""
+
+import os
+import sys
+
+import click
+
+from .cache import DEFAULT_MAX_SIZE, DEFAULT_TTL
+
+
+class _DefaultGroup(click.Group):
+    """Group that runs `default_command` if no known command is given.
+
+    This allows ``getbibtex ARGS`` as a shorthand for ``getbibtex lookup
+    ARGS``, next to commands like ``getbibtex cache stats``. If the first
+    argument is the name of a command, all arguments go to that command, so
+    that e.g. a typo in ``getbibtex cache stat`` is a usage error.
+    """
+
+    def __init__(self, *args, default_command, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands:
+            if args[0] not in self.get_help_option_names(ctx):
+                args = [self.default_command] + list(args)
+        return super().parse_args(ctx, args)
+
+
+@click.group(
+    cls=_DefaultGroup,
+    default_command='lookup',
+    context_settings={'help_option_names': ['--help', '-h']},
+)
+def main():
+    """Generate BibTeX entries from DOIs, arXiv IDs, or free-form queries.
+
+    If COMMAND is not one of the commands listed below, all arguments are
+    passed to the `lookup` command, e.g. `getbibtex 10.1103/PhysRevA.89.032334`
+    is equivalent to `getbibtex lookup 10.1103/PhysRevA.89.032334`. To look
+    up a query that starts with the name of a command, e.g. "cache effects in
+    qubits", use `getbibtex lookup QUERY` or `getbibtex -- QUERY`.
+    """
+
+
+def _cache_options(f):
+    """Decorator adding the options for configuring the record cache."""
+    f = click.option(
+        '--cache-size',
+        type=float,
+        default=DEFAULT_MAX_SIZE / 1024**2,
+        show_default=True,
+        help=(
+            "Maximum size of the record cache in MB. When exceeded, the least "
+            "recently used records are removed."
+        ),
+    )(f)
+    f = click.option(
+        '--cache-ttl',
+        type=float,
+        default=DEFAULT_TTL / (24 * 3600),
+        show_default=True,
+        help="Number of days after which a cached record expires.",
+    )(f)
+    f = click.option(
+        '--cache-dir',
+        type=click.Path(file_okay=False),
+        envvar='GETBIBTEX_CACHE_DIR',
+        help=(
+            "Directory for the record cache. Defaults to "
+            "$XDG_CACHE_HOME/getbibtex (or ~/.cache/getbibtex)."
+        ),
+    )(f)
+    return f
+
+
+def _service_options(f):
+    """Decorator adding the options for the services used by all lookups.
+
+    These are the HTTP session, the journal names, the protected words, the
+    maximum number of authors, the snapshot index, and the record cache, see
+    :func:`_setup_services`.
+    """
+    f = _cache_options(f)
+    f = click.option(
+        '--snapshot',
+        'snapshot_index',
+        envvar='GETBIBTEX_SNAPSHOT',
+        type=click.Path(exists=True, dir_okay=False),
+        help=(
+            "Index of a Crossref or arXiv metadata snapshot, as written by "
+            "`getbibtex snapshot crossref` or `getbibtex snapshot arxiv`. "
+            "DOIs and arXiv IDs found in the index are resolved without any "
+            "request to Crossref or arXiv."
+        ),
+    )(f)
+    f = click.option(
+        '--cache/--no-cache',
+        'use_cache',
+        default=True,
+        help=(
+            "With --cache (default), keep the records obtained from the "
+            "backends in a persistent on-disk cache, and use the cached "
+            "records instead of querying the backends again."
+        ),
+    )(f)
+    f = click.option(
+        '--mailto',
+        envvar='GETBIBTEX_MAILTO',
+        metavar='EMAIL',
+        help=(
+            "Contact email address to send with all requests to Crossref. "
+            "This uses Crossref's faster \"polite\" pool of API servers, "
+            "which is recommended for --batch."
+        ),
+    )(f)
+    f = click.option(
+        '--max-authors',
+        envvar='GETBIBTEX_MAX_AUTHORS',
+        type=click.IntRange(min=1),
+        metavar='N',
+        help=(
+            "List at most N authors in an entry, followed by \"and others\" "
+            "(e.g., for papers by large collaborations). By default, all "
+            "authors are listed."
+        ),
+    )(f)
+    f = click.option(
+        '--protected-words',
+        'protected_words_files',
+        multiple=True,
+        type=click.Path(exists=True, dir_okay=False),
+        help=(
+            "Protect (enclose in {}) all words listed in the given file, in "
+            "addition to the built-in list of known proper nouns. The file "
+            "must contain one word per line. May be given multiple times."
+        ),
+    )(f)
+    f = click.option(
+        '--journal-abbreviations',
+        envvar='GETBIBTEX_JOURNAL_ABBREVIATIONS',
+        type=click.Path(exists=True, dir_okay=False),
+        help=(
+            "File with a list of journal abbreviations (e.g. ISO4), as "
+            "written by `getbibtex journals build`. Full journal names are "
+            "looked up in this list to find a macro or an abbreviation for "
+            "the journal."
+        ),
+    )(f)
+    return f
+
+
+def _open_cache(cache_dir, cache_ttl, cache_size):
+    from .cache import RecordCache
+
+    kwargs = dict(ttl=cache_ttl * 24 * 3600, max_size=cache_size * 1024**2)
+    if cache_dir is None:
+        return RecordCache.default(**kwargs)
+    return RecordCache(os.path.join(cache_dir, 'records.sqlite'), **kwargs)
+
+
+@main.command()
+@click.option(
+    '--debug-record', is_flag=True, help="Print the crossref record to stderr"
+)
+@click.option(
+    '--timings',
+    is_flag=True,
+    help=(
+        "Print how long each phase of the lookup (imports, requests, JSON "
+        "decoding, formatting, ...) took to stderr. With --batch, show the "
+        "median and the 95th and 99th percentile of every phase."
+    ),
+)
+@click.option(
+    '--profile',
+    'profile_file',
+    type=click.Path(dir_okay=False, writable=True),
+    help=(
+        "Profile the lookup with cProfile, and write the statistics to the "
+        "given file, for analysis with the `pstats` module. Only the main "
+        "thread is profiled, so use --jobs=1 with --batch."
+    ),
+)
+@click.option(
+    '--fix-uppercase',
+    is_flag=True,
+    help=(
+        "Fix records that contain all-uppercase authors or titles. This "
+        "overrides --auto-protect."
+    ),
+)
+@click.option(
+    '--auto-protect/--no-auto-protect',
+    default=None,
+    help=(
+        "With --auto-protect, assume that titles returned by the backend "
+        "are in sentence case, so that any words with capitals "
+        "can be assumed to be proper nouns that need to be protected "
+        "(enclosed in {}). With --no-auto-protect, the titles are used as "
+        "they are returned by the backend, while ensuring that known proper "
+        "nouns are protected. "
+        "If neither option is given (default),  heuristics are applied "
+        "to determine which words need to be protected."
+    ),
+)
+@click.option(
+    '--capitalize-field-names/--no-capitalize-field-names',
+    default=True,
+    help=(
+        "With --capitalize-field-names (default), capitalize the first "
+        "letter of all BibTeX field names."
+    ),
+)
+@click.option(
+    '--use-journal-macros/--no-use-journal-macros',
+    default=True,
+    help=(
+        "With --use-journal-macros (default), use journal macros for known "
+        "journal names, e.g. `prl` for 'Phys. Rev. Lett.'"
+    ),
+)
+@click.option(
+    '--batch',
+    '-b',
+    'batch_files',
+    multiple=True,
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help=(
+        "Read queries from the given file, one query per line, instead of "
+        "from ARGS. Use '-' to read from stdin. May be given multiple times."
+    ),
+)
+@click.option(
+    '--extract',
+    '-x',
+    'extract_files',
+    multiple=True,
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help=(
+        "Find all DOIs and arXiv IDs in the given file (of any format, e.g. "
+        "LaTeX, Markdown, or text extracted from a PDF), and resolve each "
+        "of them once, like --batch. Use '-' to read from stdin. May be "
+        "given multiple times."
+    ),
+)
+@click.option(
+    '--output',
+    '-o',
+    type=click.File('w', encoding='utf-8', lazy=True),
+    default='-',
+    help=(
+        "Write the BibTeX entries to the given file instead of stdout. "
+        "Entries are written as soon as they are resolved."
+    ),
+)
+@click.option(
+    '--update',
+    '-u',
+    'update_file',
+    type=click.Path(dir_okay=False, writable=True),
+    help=(
+        "Append the entries to the given BibTeX file, skipping any DOI or "
+        "arXiv ID for which the file already has an entry. The file is "
+        "created if it does not exist."
+    ),
+)
+@click.option(
+    '--jobs',
+    '-j',
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help=(
+        "With --batch or --extract, the maximum number of lookups that run "
+        "concurrently. "
+        "The entries are written in the order of the input regardless."
+    ),
+)
+@_service_options
+@click.argument('args', nargs=-1)
+@click.pass_context
+def lookup(
+    ctx,
+    debug_record,
+    timings,
+    profile_file,
+    fix_uppercase,
+    auto_protect,
+    capitalize_field_names,
+    use_journal_macros,
+    journal_abbreviations,
+    protected_words_files,
+    max_authors,
+    batch_files,
+    extract_files,
+    output,
+    update_file,
+    jobs,
+    mailto,
+    use_cache,
+    snapshot_index,
+    cache_dir,
+    cache_ttl,
+    cache_size,
+    args,
+):
+    """Generate a BibTeX entry from the given query.
+
+    Print a single bibtex record to stdout, and any warnings/error messages to
+    stderr.
+
+    The ARGS are combined into a single query string. This must be a DOI, an
+    arXiv identifier, a string (e.g. URL) containing a DOI or arXiv identifier,
+    or a free-form query. Any space in the query string indicates a free-form
+    query.
+
+    With --batch, resolve every line of the given file(s) as a separate query,
+    and print all BibTeX entries. A query that cannot be resolved is reported
+    on stderr without aborting the run.
+
+    With --extract, resolve every DOI and arXiv ID found anywhere in the
+    given file(s), like --batch.
+
+    With --update, append the entries to an existing BibTeX file instead of
+    printing them, and skip all queries for DOIs or arXiv IDs that are already
+    in the file.
+    """
+    if profile_file is not None:
+        _start_profile(ctx, profile_file)
+    if timings:
+        _start_timings(ctx)
+    from .timing import timed
+
+    with timed('import'):
+        from .batch import read_queries, resolve_batch, write_batch
+        from .bibfile import CitekeyRegistry
+        from .query import resolve_query
+
+    # Check the usage before setting up the services, which e.g. creates the
+    # record cache
+    if batch_files and args:
+        raise click.UsageError("Cannot combine ARGS with --batch")
+    if extract_files and (args or batch_files):
+        raise click.UsageError("Cannot combine --extract with ARGS or --batch")
+    if not (args or batch_files or extract_files):
+        raise click.UsageError("Missing argument 'ARGS...'")
+    if update_file is not None and output.name != '-':
+        raise click.UsageError("Cannot combine --output with --update")
+    _setup_services(
+        ctx,
+        mailto,
+        journal_abbreviations,
+        protected_words_files,
+        max_authors,
+        use_cache,
+        snapshot_index,
+        cache_dir,
+        cache_ttl,
+        cache_size,
+    )
+    kwargs = dict(
+        debug_record=debug_record,
+        fix_uppercase=fix_uppercase,
+        auto_protect=auto_protect,
+        capitalize_field_names=capitalize_field_names,
+        use_journal_macros=use_journal_macros,
+    )
+    queries = None
+    if batch_files:
+        queries = read_queries(batch_files)
+    elif extract_files:
+        from .extract import extract_queries
+
+        queries = extract_queries(extract_files)
+    if update_file is not None:
+        if queries is None:
+            queries = [('<args>', " ".join(args))]
+        ctx.exit(_update_bibfile(update_file, queries, jobs, kwargs))
+    if queries is not None:
+        results = resolve_batch(queries, workers=jobs, **kwargs)
+        n_failed = write_batch(results, output, citekeys=CitekeyRegistry())
+        if n_failed > 0:
+            print("ERROR: %d queries failed" % n_failed, file=sys.stderr)
+            ctx.exit(1)
+        return
+    query = " ".join(args)
+    try:
+        print(resolve_query(query, **kwargs), file=output)
+    except (NotImplementedError, IOError) as exc_info:
+        print("ERROR: %s" % exc_info, file=sys.stderr)
+        ctx.exit(1)
+
+
+def _setup_services(
+    ctx,
+    mailto,
+    journal_abbreviations,
+    protected_words_files,
+    max_authors,
+    use_cache,
+    snapshot_index,
+    cache_dir,
+    cache_ttl,
+    cache_size,
+):
+    """Set up the services for all lookups until `ctx` closes.
+
+    The arguments are those of :func:`_service_options`.
+    """
+    from .timing import timed
+
+    with timed('import'):
+        from .cache import set_cache
+        from .http import Session, set_session
+
+    if mailto is not None:
+        session = Session(mailto=mailto)
+        set_session(session)
+        ctx.call_on_close(session.close)
+        ctx.call_on_close(lambda: set_session(None))
+    if journal_abbreviations is not None:
+        from .journals import JournalIndex, set_journal_index
+
+        set_journal_index(
+            JournalIndex(abbreviations_file=journal_abbreviations)
+        )
+        ctx.call_on_close(lambda: set_journal_index(None))
+    if protected_words_files:
+        from .bibtex import (
+            PROTECTED_WORDS,
+            ProtectedWords,
+            load_protected_words,
+            set_protected_words,
+        )
+
+        protected_words = ProtectedWords(PROTECTED_WORDS)
+        for filename in protected_words_files:
+            protected_words.add(load_protected_words(filename))
+        set_protected_words(protected_words)
+        ctx.call_on_close(lambda: set_protected_words(None))
+    if max_authors is not None:
+        from .bibtex import set_max_authors
+
+        set_max_authors(max_authors)
+        ctx.call_on_close(lambda: set_max_authors(None))
+    if snapshot_index is not None:
+        from .snapshot import SnapshotIndex, set_snapshot_index
+
+        index = SnapshotIndex(snapshot_index)
+        set_snapshot_index(index)
+        ctx.call_on_close(index.close)
+        ctx.call_on_close(lambda: set_snapshot_index(None))
+    if use_cache:
+        cache = _open_cache(cache_dir, cache_ttl, cache_size)
+        set_cache(cache)
+        ctx.call_on_close(cache.close)
+        ctx.call_on_close(lambda: set_cache(None))
+
+
+def _start_timings(ctx):
+    """Time all phases until `ctx` closes, then report the timings."""
+    import time
+
+    from .timing import Timings, set_timings
+
+    timings = Timings()
+    set_timings(timings)
+    start = time.perf_counter()
+
+    def report():
+        timings.add('total', time.perf_counter() - start)
+        set_timings(None)
+        timings.report(sys.stderr)
+
+    ctx.call_on_close(report)
+
+
+def _start_profile(ctx, filename):
+    """Profile until `ctx` closes, then write the statistics to `filename`."""
+    import cProfile
+
+    profiler = cProfile.Profile()
+
+    def dump():
+        profiler.disable()
+        profiler.dump_stats(filename)
+        print("Profile written to %s" % filename, file=sys.stderr)
+
+    ctx.call_on_close(dump)
+    profiler.enable()
+
+
+def _update_bibfile(filename, queries, jobs, kwargs):
+    """Append entries for the new `queries` to the BibTeX file `filename`.
+
+    Return the exit status: 1 if any query failed, 0 otherwise.
+    """
+    from .batch import resolve_batch, write_batch
+    from .bibfile import BibIndex, CitekeyRegistry, filter_new_queries
+
+    bib_index = BibIndex(filename)
+    citekeys = CitekeyRegistry(bib_index.citekeys)
+    skipped = []
+    queries = filter_new_queries(queries, bib_index, skipped=skipped)
+    results = resolve_batch(queries, workers=jobs, **kwargs)
+    with open(filename, 'a', encoding='utf-8') as out_fh:
+        n_failed = write_batch(
+            results, out_fh, append=out_fh.tell() > 0, citekeys=citekeys
+        )
+    if skipped:
+        print(
+            "INFO: Skipped %d queries already in %s"
+            % (len(skipped), filename),
+            file=sys.stderr,
+        )
+    if n_failed > 0:
+        print("ERROR: %d queries failed" % n_failed, file=sys.stderr)
+        return 1
+    return 0
+
+
+@main.command()
+@click.option(
+    '--address',
+    envvar='GETBIBTEX_SERVER',
+    help=(
+        "Path of the Unix socket to listen on, or HOST:PORT to listen on a "
+        "TCP port. Defaults to $XDG_RUNTIME_DIR/getbibtex.sock (or "
+        "/tmp/getbibtex-UID.sock)."
+    ),
+)
+@_service_options
+@click.pass_context
+def serve(
+    ctx,
+    address,
+    journal_abbreviations,
+    protected_words_files,
+    max_authors,
+    mailto,
+    use_cache,
+    snapshot_index,
+    cache_dir,
+    cache_ttl,
+    cache_size,
+):
+    """Answer lookup requests from `getbibtex-client`.
+
+    Run as a daemon that keeps the backends, the tables of protected words
+    and journal names, the connections to the backends, and the record cache
+    in memory, so that `getbibtex-client` (which accepts the same ARGS and
+    formatting options as `getbibtex lookup`) is much faster than a separate
+    `getbibtex` process for every lookup.
+
+    Since there is no authentication, a TCP address should only use
+    localhost.
+    """
+    import signal
+
+    from .client import default_address
+    from .server import make_server, warm_up
+
+    if address is None:
+        address = default_address()
+    _setup_services(
+        ctx,
+        mailto,
+        journal_abbreviations,
+        protected_words_files,
+        max_authors,
+        use_cache,
+        snapshot_index,
+        cache_dir,
+        cache_ttl,
+        cache_size,
+    )
+    warm_up()
+    try:
+        server = make_server(address)
+    except OSError as exc_info:
+        raise click.ClickException(str(exc_info))
+    click.echo("Listening at %s" % server.address, err=True)
+    # Make sure the socket is removed when the daemon is stopped
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@main.group(name='cache')
+@_cache_options
+@click.pass_context
+def cache_group(ctx, cache_dir, cache_ttl, cache_size):
+    """Inspect and manage the record cache."""
+    ctx.obj = _open_cache(cache_dir, cache_ttl, cache_size)
+    ctx.call_on_close(ctx.obj.close)
+
+
+@cache_group.command(name='stats')
+@click.pass_obj
+def cache_stats(record_cache):
+    """Show statistics about the record cache."""
+    stats_data = record_cache.stats()
+    lookups = stats_data['hits'] + stats_data['misses']
+    hit_ratio = stats_data['hits'] / lookups if lookups > 0 else 0.0
+    click.echo(f"Path:     {stats_data['path']}")
+    click.echo(f"Entries:  {stats_data['entries']}")
+    click.echo(f"Size:     {stats_data['size'] / 1024**2:.2f} MB")
+    click.echo(f"Hits:     {stats_data['hits']}")
+    click.echo(f"Misses:   {stats_data['misses']}")
+    click.echo(f"Hit rate: {100 * hit_ratio:.1f}%")
+
+
+@cache_group.command(name='prune')
+@click.pass_obj
+def cache_prune(record_cache):
+    """Remove expired records, and shrink the cache to its maximum size."""
+    n_removed = record_cache.prune()
+    click.echo(f"Removed {n_removed} records")
+
+
+@cache_group.command(name='clear')
+@click.pass_obj
+def cache_clear(record_cache):
+    """Remove all records from the cache."""
+    record_cache.clear()
+    click.echo("Cache cleared")
+
+
+@main.group(name='journals')
+def journals_group():
+    """Manage lists of journal abbreviations."""
+
+
+@journals_group.command(name='build')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.argument('dest', type=click.Path(dir_okay=False, writable=True))
+def journals_build(source, dest):
+    """Build a compact journal abbreviation file.
+
+    The SOURCE must contain one journal per line, with the full journal name
+    and its abbreviation separated by a tab or a semicolon, as in the
+    abbreviation lists of JabRef. The result is written to DEST, for use with
+    `getbibtex lookup --journal-abbreviations DEST`.
+    """
+    from .journals import read_abbreviations, write_abbreviations
+
+    try:
+        n_journals = write_abbreviations(read_abbreviations(source), dest)
+    except IOError as exc_info:
+        raise click.ClickException(str(exc_info))
+    click.echo(f"Wrote {n_journals} journals to {dest}")
+
+
+@main.group(name='snapshot')
+def snapshot_group():
+    """Build local indexes of bulk metadata snapshots."""
+
+
+@snapshot_group.command(name='crossref')
+@click.argument('source', type=click.Path(exists=True))
+@click.argument('dest', type=click.Path(dir_okay=False, writable=True))
+@click.option(
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    show_default=True,
+    help="Number of processes reading the files of the snapshot.",
+)
+def snapshot_crossref(source, dest, jobs):
+    """Index a Crossref metadata snapshot.
+
+    The SOURCE is a folder containing the files of a Crossref metadata
+    snapshot (like the annual "public data file"), i.e. gzipped JSON files
+    with a list of records under the key "items", or JSON-lines files with
+    one record per line. It may also be a single such file. The records are
+    added to the index DEST (created if it does not exist), for use with
+    `getbibtex lookup --snapshot DEST`.
+    """
+    from .snapshot import SnapshotIndex, ingest_crossref_snapshot
+
+    def on_error(exc_info):
+        click.echo("WARNING: %s" % exc_info, err=True)
+
+    with SnapshotIndex(dest, writable=True) as index:
+        n_records = ingest_crossref_snapshot(
+            source, index, workers=jobs, on_error=on_error
+        )
+    click.echo(f"Indexed {n_records} records in {dest}")
+
+
+@snapshot_group.command(name='arxiv')
+@click.argument('source', type=click.Path(exists=True))
+@click.argument('dest', type=click.Path(dir_okay=False, writable=True))
+@click.option(
+    '--jobs',
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    show_default=True,
+    help="Number of processes converting the records of the snapshot.",
+)
+def snapshot_arxiv(source, dest, jobs):
+    """Index the arXiv metadata snapshot.
+
+    The SOURCE is the JSON-lines file of the arXiv metadata snapshot (as
+    distributed e.g. on Kaggle), with one arXiv entry per line, optionally
+    gzipped, or a folder of such files. The records are added to the index
+    DEST (created if it does not exist, and which may also contain a Crossref
+    snapshot), for use with `getbibtex lookup --snapshot DEST`.
+    """
+    from .snapshot import SnapshotIndex, ingest_arxiv_snapshot
+
+    def on_error(exc_info):
+        click.echo("WARNING: %s" % exc_info, err=True)
+
+    with SnapshotIndex(dest, writable=True) as index:
+        n_records = ingest_arxiv_snapshot(
+            source, index, workers=jobs, on_error=on_error
+        )
+    click.echo(f"Indexed {n_records} records in {dest}")
+
+
+@main.command()
+@click.argument(
+    'fixtures', type=click.Path(exists=True, file_okay=False, dir_okay=True)
+)
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', type=int, default=8000, show_default=True)
+@click.option(
+    '--latency',
+    type=float,
+    default=0.0,
+    help="Delay (in seconds) before every response",
+)
+@click.option(
+    '--jitter',
+    type=float,
+    default=0.0,
+    help="Maximum additional random delay (in seconds) for every response",
+)
+@click.option(
+    '--error-rate',
+    type=click.FloatRange(0, 1),
+    default=0.0,
+    help="Fraction of requests that fail with a 503 error",
+)
+@click.option(
+    '--throttle-rate',
+    type=click.FloatRange(0, 1),
+    default=0.0,
+    help="Fraction of requests that fail with a 429 error",
+)
+@click.option(
+    '--rate-limit',
+    type=int,
+    default=None,
+    help="Rate limit (requests per second) to announce in every response",
+)
+@click.option('--seed', type=int, default=None)
+def standin(
+    fixtures,
+    host,
+    port,
+    latency,
+    jitter,
+    error_rate,
+    throttle_rate,
+    rate_limit,
+    seed,
+):
+    """Serve a local stand-in for the Crossref and arXiv APIs.
+
+    The records in the FIXTURES folder (files `crossref.jsonl` and
+    `arxiv.jsonl`) are served through the same endpoints as the real
+    APIs. Set the environment variables printed on startup to direct the
+    `getbibtex` command to the stand-in, e.g. for offline load-testing.
+    """
+    from .standin import StandinServer, load_fixtures
+
+    crossref_records, arxiv_records = load_fixtures(fixtures)
+    server = StandinServer(
+        crossref_records,
+        arxiv_records,
+        address=(host, port),
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        rate_limit=rate_limit,
+        seed=seed,
+    )
+    click.echo(
+        "Serving %d Crossref and %d arXiv records at %s"
+        % (len(crossref_records), len(arxiv_records), server.url),
+        err=True,
+    )
+    for key, val in server.environ().items():
+        click.echo("export %s=%s" % (key, val))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,44 @@
+"""Concurrent execution of network-bound lookups and CPU-bound ingestion."""
+
+import collections
+
+__all__ = ['map_ordered']
+
+
+def map_ordered(func, items, workers=1, processes=False):
+    """Apply `func` to all `items` concurrently, yielding results in order.
+
+    Up to `workers` calls to `func` run at the same time, in separate threads.
+    The results are yielded in the order of `items`, as soon as they (and all
+    results before them) are available. To keep memory bounded for long
+    iterables, at most ``2 * workers`` items are submitted ahead of the
+    result that is yielded next. With ``workers=1``, `func` is called in the
+    current thread, without any concurrency.
+
+    Any exception raised by `func` is re-raised when the corresponding result
+    is yielded, so `func` should catch errors for individual items itself.
+
+    With ``processes=True``, `func` runs in separate processes instead of
+    threads, for CPU-bound work. In this case, `func`, the `items`, and the
+    results must be picklable.
+
+    >>> list(map_ordered(lambda x: x**2, range(5), workers=3))
+    [0, 1, 4, 9, 16]
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    if processes:
+        from concurrent.futures import ProcessPoolExecutor as Executor
+    else:
+        from concurrent.futures import ThreadPoolExecutor as Executor
+
+    with Executor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
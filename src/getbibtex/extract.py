@@ -0,0 +1,166 @@
+"""Find all DOIs and arXiv IDs in a document."""
+
+import re
+import sys
+
+from .query import RX_ARXIV_OLD, RX_DOI, classify_query
+
+__all__ = ['extract_queries', 'scan_identifiers']
+
+
+# Number of characters that are read from a file at once
+EXTRACT_BLOCK_SIZE = 1024**2
+
+# Identifiers that are longer than this are truncated
+_MAX_IDENTIFIER_LENGTH = 1024
+
+# Matches that end within this many characters of the end of a block may be
+# incomplete, and are matched again after reading the next block
+_OVERLAP = 256
+
+# Unlike `RX_ARXIV_NEW` (which is meant for a single query), the ID must
+# closely follow "arXiv", so that a match cannot span a paragraph and swallow
+# other identifiers in it. This is matched against the lower-cased text, so
+# that the regex starts with a literal, which is much faster to search for
+# than a case-insensitive pattern.
+_RX_ARXIV_NEW_NEARBY = re.compile(r'arxiv.{0,20}?\d{4}\.\d{4,}(?:v\d+)?')
+
+# Every old-style arXiv ID contains a slash followed by seven digits. Searching
+# for these first is much faster than trying `RX_ARXIV_OLD` at every letter.
+_RX_ARXIV_OLD_NUMBER = re.compile(r'/\d{7}')
+
+# Maximum length of the archive in an old-style ID, e.g. "cond-mat.stat-mech"
+_ARXIV_OLD_ARCHIVE_LENGTH = 25
+
+_RX_ARXIV_VERSION = re.compile(r'v\d+$')
+
+
+def _strip_doi(doi):
+    """Remove trailing punctuation that is not part of a DOI in running text.
+
+    >>> _strip_doi('10.1000/xyz(1).')
+    '10.1000/xyz(1)'
+    >>> _strip_doi('10.1000/xyz);')
+    '10.1000/xyz'
+    """
+    doi = doi.rstrip('.,;:')
+    while doi.endswith(')') and doi.count(')') > doi.count('('):
+        doi = doi[:-1].rstrip('.,;:')
+    return doi
+
+
+def _find_identifiers(text):
+    """Return the spans of all DOIs and arXiv IDs in `text`.
+
+    Return a sorted list of non-overlapping tuples ``(start, end)``. Where
+    matches overlap, the one that starts first is used.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        spans = [m.span() for m in _RX_ARXIV_NEW_NEARBY.finditer(lowered)]
+    else:  # rare characters that change their length when lower-cased
+        rx = re.compile(_RX_ARXIV_NEW_NEARBY.pattern, re.I)
+        spans = [m.span() for m in rx.finditer(text)]
+    spans.extend(m.span() for m in RX_DOI.finditer(text))
+    for number in _RX_ARXIV_OLD_NUMBER.finditer(text):
+        slash = number.start()
+        for match in RX_ARXIV_OLD.finditer(
+            text, max(slash - _ARXIV_OLD_ARCHIVE_LENGTH, 0), number.end() + 12
+        ):
+            if match.start() < slash < match.end():
+                spans.append(match.span())
+                break
+    spans.sort()
+    result = []
+    last_end = 0
+    for start, end in spans:
+        if start >= last_end:
+            result.append((start, end))
+            last_end = end
+    return result
+
+
+def scan_identifiers(in_fh, name='<text>'):
+    """Iterate over all DOIs and arXiv IDs in the text stream `in_fh`.
+
+    The stream is read in blocks of `EXTRACT_BLOCK_SIZE` characters and
+    scanned in a single pass, so the memory usage does not depend on the size
+    of the text (or the length of its lines). Every match of
+    :data:`~getbibtex.query.RX_DOI`, :data:`~getbibtex.query.RX_ARXIV_OLD`,
+    or "arXiv" (in any case) closely followed by a new-style arXiv ID is
+    classified with
+    :func:`~getbibtex.query.classify_query`, so that e.g. the DOI
+    '10.48550/arXiv.2205.15044' is recognized as an arXiv ID.
+
+    Yield tuples ``(location, kind, identifier)``, where `location` is a
+    string ``"<name>:<lineno>"``, and `kind` is 'arxiv' or 'doi'. Every
+    occurrence of an identifier is yielded.
+    """
+    buffer = ''
+    lineno = 1
+    counted = 0  # position in `buffer` up to which lines have been counted
+    while True:
+        block = in_fh.read(EXTRACT_BLOCK_SIZE)
+        at_end = not block
+        buffer += block
+        limit = len(buffer) if at_end else max(len(buffer) - _OVERLAP, 0)
+        keep_from = limit
+        for start, end in _find_identifiers(buffer):
+            if end > limit:
+                # May continue in the next block
+                keep_from = max(start, len(buffer) - _MAX_IDENTIFIER_LENGTH)
+                break
+            lineno += buffer.count('\n', counted, start)
+            counted = start
+            kind, identifier = classify_query(buffer[start:end])
+            if kind == 'doi':
+                identifier = _strip_doi(identifier)
+            yield f"{name}:{lineno}", kind, identifier
+        if at_end:
+            return
+        keep_from = max(keep_from, counted)
+        lineno += buffer.count('\n', counted, keep_from)
+        buffer = buffer[keep_from:]
+        counted = 0
+
+
+def _identifier_key(kind, identifier):
+    if kind == 'doi':
+        return kind, identifier.lower()
+    return kind, _RX_ARXIV_VERSION.sub('', identifier)
+
+
+def extract_queries(files):
+    """Iterate over the unique DOIs and arXiv IDs in the given `files`.
+
+    Each element of `files` is a path, or '-' for stdin. The files may
+    contain arbitrary text (e.g. LaTeX, Markdown, or the text extracted from
+    a PDF), see :func:`scan_identifiers`. DOIs are considered equal
+    regardless of case, and arXiv IDs regardless of their version; only the
+    first occurrence of each identifier is used.
+
+    Yield tuples ``(location, query)`` for
+    :func:`~getbibtex.batch.resolve_batch`, like
+    :func:`~getbibtex.batch.read_queries`.
+    """
+    seen = set()
+    for filename in files:
+        if filename == '-':
+            identifiers = scan_identifiers(sys.stdin, '<stdin>')
+            yield from _unique_queries(identifiers, seen)
+        else:
+            with open(filename, encoding='utf-8', errors='replace') as in_fh:
+                identifiers = scan_identifiers(in_fh, filename)
+                yield from _unique_queries(identifiers, seen)
+
+
+def _unique_queries(identifiers, seen):
+    for location, kind, identifier in identifiers:
+        key = _identifier_key(kind, identifier)
+        if key in seen:
+            continue
+        seen.add(key)
+        if kind == 'arxiv' and '/' not in identifier:
+            yield location, "arXiv:" + identifier
+        else:
+            yield location, identifier
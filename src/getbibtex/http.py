@@ -0,0 +1,486 @@
+"""Long-lived HTTP session with keep-alive connection pooling.
+
+All requests to Crossref, doi.org, and arXiv go through a :class:`Session`.
+Connections to each host are kept open and re-used between requests, so that
+the TCP/TLS handshake is only paid once per connection instead of once per
+lookup.
+
+The session also schedules requests so that they stay within the rate limits
+announced by the server (through the ``X-Rate-Limit-Limit`` and
+``X-Rate-Limit-Interval`` headers that Crossref sends), and retries requests
+that were throttled (429) or failed with a server error (5xx).
+"""
+
+import collections
+import gzip
+import http.client
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from urllib.parse import urlencode, urljoin, urlsplit
+
+__all__ = [
+    'HTTPError',
+    'RateLimiter',
+    'Response',
+    'Session',
+    'get_session',
+    'set_session',
+]
+
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+# Status codes for which a request is retried
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+def get_session():
+    """Return the active :class:`Session`.
+
+    A default session is created on first use.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = Session()
+        return _SESSION
+
+
+def set_session(session):
+    """Set the active :class:`Session` used by all backends.
+
+    Passing None resets to a default session, created on next use. Return the
+    previously active session.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        previous = _SESSION
+        _SESSION = session
+    return previous
+
+
+class HTTPError(IOError):
+    """Error for a failed HTTP request.
+
+    The `status` attribute contains the HTTP status code, or None if the
+    request failed without a response (e.g., a connection error).
+    """
+
+    def __init__(self, message, status=None, response=None):
+        super().__init__(message)
+        self.status = status
+        self.response = response
+
+
+class Response:
+    """The response to an HTTP request.
+
+    Attributes:
+        url (str): The URL of the response, after following any redirects.
+        status (int): The HTTP status code.
+        headers (http.client.HTTPMessage): The response headers.
+        content (bytes): The (decompressed) response body.
+    """
+
+    def __init__(self, url, status, headers, content):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+
+    def __repr__(self):
+        return "<Response [%d] %s>" % (self.status, self.url)
+
+    @property
+    def ok(self):
+        """Whether the `status` indicates success."""
+        return 200 <= self.status < 300
+
+    @property
+    def text(self):
+        """The response body, as a string."""
+        charset = self.headers.get_content_charset() or 'utf-8'
+        return self.content.decode(charset, errors='replace')
+
+    def json(self):
+        """The response body, decoded as JSON."""
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """Raise an :exc:`HTTPError` if the `status` does not indicate success.
+
+        Return the response otherwise.
+        """
+        if not self.ok:
+            raise HTTPError(
+                "HTTP request to %s returned status %d"
+                % (self.url, self.status),
+                status=self.status,
+                response=self,
+            )
+        return self
+
+
+class RateLimiter:
+    """Thread-safe token bucket that limits the rate of requests.
+
+    Args:
+        rate (float): The sustained number of requests per second.
+        burst (float or None): The size of the bucket, that is, the number of
+            requests that may be sent at once after a period of inactivity.
+            Defaults to `rate` (but at least 1).
+        min_rate (float): The lowest rate that :meth:`throttle` reduces the
+            rate to.
+
+    The limiter adapts to throttling: :meth:`throttle` halves the rate (down
+    to `min_rate`), and :meth:`recover` increases it again step by step, up to
+    the `ceiling` set by :meth:`set_ceiling`.
+    """
+
+    def __init__(
+        self,
+        rate,
+        burst=None,
+        min_rate=0.1,
+        clock=time.monotonic,
+        sleep=None,
+    ):
+        self.ceiling = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self._clock = clock
+        self._sleep = time.sleep if sleep is None else sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        """The current size of the bucket."""
+        if self.burst is None:
+            return max(1.0, self.rate)
+        return self.burst
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent.
+
+        Return the time (in seconds) spent waiting.
+        """
+        with self._lock:
+            self._refill()
+            # Reserve a token, possibly going into debt. Concurrent callers
+            # then wait for successive slots instead of all at once.
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def set_ceiling(self, rate):
+        """Set the maximum rate, as announced by the server."""
+        with self._lock:
+            self._refill()
+            if self.rate >= self.ceiling or self.rate > rate:
+                self.rate = rate
+            self.ceiling = rate
+
+    def throttle(self):
+        """Halve the rate, after the server throttled a request.
+
+        The rate is not reduced below `min_rate` (but a lower rate set by
+        :meth:`set_ceiling` is kept).
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate / 2, min(self.min_rate, self.rate))
+            self._tokens = min(self._tokens, 0.0)
+
+    def recover(self):
+        """Increase the rate towards the `ceiling`, after a success."""
+        with self._lock:
+            if self.rate < self.ceiling:
+                self._refill()
+                self.rate = min(self.ceiling, self.rate + 0.05 * self.ceiling)
+
+
+def _parse_interval(interval):
+    """Convert an interval like '1s' or '1m' to seconds.
+
+    >>> _parse_interval('1s'), _parse_interval('2m'), _parse_interval('10')
+    (1.0, 120.0, 10.0)
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', interval)
+    if not match:
+        raise ValueError("Invalid interval %r" % interval)
+    factor = {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(2)]
+    return float(match.group(1)) * factor
+
+
+class Session:
+    """Thread-safe HTTP client with a pool of keep-alive connections.
+
+    Args:
+        user_agent (str): The User-Agent header for all requests. Defaults to
+            ``getbibtex/<version>``.
+        timeout (float): Timeout (in seconds) for connecting and for reading
+            a response.
+        pool_size (int): Maximum number of idle connections kept open per
+            host. Concurrent requests beyond this number use additional
+            connections, which are closed after use.
+        max_redirects (int): Maximum number of redirects to follow.
+        mailto (str or None): A contact email address. It is included in the
+            User-Agent, and sent to Crossref in order to use the faster
+            "polite" pool of API servers.
+        max_retries (int): Maximum number of times a request is retried if it
+            fails with one of the `RETRY_STATUSES`, or without a response.
+        backoff (float): The initial delay (in seconds) before retrying a
+            request. The delay doubles with each retry, and is randomized by
+            ±50% (jitter), unless the server sends a Retry-After header.
+
+    Requests to a host that announces a rate limit are scheduled through a
+    :class:`RateLimiter` for that host.
+
+    Attributes:
+        n_requests (int): The total number of HTTP requests sent so far,
+            including retries and redirects.
+        n_requests_by_host (collections.Counter): The number of HTTP
+            requests sent so far to each host.
+        n_connections (int): The total number of connections opened so far.
+    """
+
+    def __init__(
+        self,
+        user_agent=None,
+        timeout=30,
+        pool_size=10,
+        max_redirects=5,
+        mailto=None,
+        max_retries=5,
+        backoff=0.5,
+    ):
+        if user_agent is None:
+            from . import __version__
+
+            user_agent = f"getbibtex/{__version__}"
+            if mailto is not None:
+                user_agent += f" (mailto:{mailto})"
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_redirects = max_redirects
+        self.mailto = mailto
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.n_requests = 0
+        self.n_requests_by_host = collections.Counter()
+        self.n_connections = 0
+        self.n_retries = 0
+        self._idle = {}  # (scheme, host, port) => list of connections
+        self._limiters = {}  # host => RateLimiter
+        self._lock = threading.Lock()
+        self._clock = time.monotonic
+        self._sleep = time.sleep
+
+    def rate_limiter(self, host):
+        """Return the :class:`RateLimiter` for `host`, or None."""
+        with self._lock:
+            return self._limiters.get(host)
+
+    def _update_rate_limit(self, host, res):
+        limit = res.getheader('X-Rate-Limit-Limit')
+        interval = res.getheader('X-Rate-Limit-Interval')
+        rate = None
+        if limit is not None and interval is not None:
+            try:
+                rate = float(limit) / _parse_interval(interval)
+            except (ValueError, ZeroDivisionError):
+                rate = None
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None and (rate is not None or res.status == 429):
+                limiter = RateLimiter(
+                    rate or 1.0, clock=self._clock, sleep=self._sleep
+                )
+                self._limiters[host] = limiter
+        if limiter is None:
+            return
+        if rate is not None:
+            limiter.set_ceiling(rate)
+        if res.status == 429:
+            limiter.throttle()
+        elif res.status < 400:
+            limiter.recover()
+
+    def _retry_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass  # HTTP-date: use the regular backoff
+        delay = self.backoff * 2**attempt
+        return min(delay * random.uniform(0.5, 1.5), 60.0)
+
+    def _send_with_retries(self, method, url, headers, rate_limiter=None):
+        host = urlsplit(url).hostname
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            limiter = self.rate_limiter(host)
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                res, content = self._send(method, url, headers)
+            except HTTPError:
+                if attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.n_retries += 1
+                self._sleep(self._retry_delay(attempt))
+                continue
+            self._update_rate_limit(host, res)
+            if res.status in RETRY_STATUSES and attempt < self.max_retries:
+                with self._lock:
+                    self.n_retries += 1
+                retry_after = res.getheader('Retry-After')
+                self._sleep(self._retry_delay(attempt, retry_after))
+                continue
+            return res, content
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_connection(self, key):
+        with self._lock:
+            connections = self._idle.get(key)
+            if connections:
+                return connections.pop(), True
+            self.n_connections += 1
+        scheme, host, port = key
+        if scheme == 'https':
+            conn_cls = http.client.HTTPSConnection
+        else:
+            conn_cls = http.client.HTTPConnection
+        return conn_cls(host, port, timeout=self.timeout), False
+
+    def _release_connection(self, key, conn):
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.pool_size:
+                connections.append(conn)
+                return
+        conn.close()
+
+    def _send(self, method, url, headers):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError("Invalid URL %r" % url)
+        default_port = 443 if parts.scheme == 'https' else 80
+        key = (parts.scheme, parts.hostname, parts.port or default_port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        while True:
+            conn, reused = self._get_connection(key)
+            try:
+                with self._lock:
+                    self.n_requests += 1
+                    self.n_requests_by_host[parts.hostname] += 1
+                conn.request(method, target, headers=headers)
+                res = conn.getresponse()
+                content = res.read()
+            except (http.client.HTTPException, OSError) as exc_info:
+                conn.close()
+                if reused:
+                    # The server may have closed an idle connection: retry
+                    # once on a fresh connection
+                    continue
+                raise HTTPError(
+                    "HTTP request to %s failed: %s" % (url, exc_info)
+                ) from exc_info
+            if res.will_close:
+                conn.close()
+            else:
+                self._release_connection(key, conn)
+            return res, content
+
+    def request(
+        self, method, url, params=None, headers=None, rate_limiter=None
+    ):
+        """Send an HTTP request and return the :class:`Response`.
+
+        Args:
+            method (str): The HTTP method, e.g. 'GET'.
+            url (str): The URL for the request.
+            params (dict or None): Query parameters to add to the `url`.
+            headers (dict or None): Additional request headers.
+            rate_limiter (RateLimiter or None): A limiter that every HTTP
+                request is scheduled through, including retries and
+                redirects, in addition to any limiter for the host.
+
+        Redirects are followed automatically, and failed requests are retried
+        (see `max_retries`). The `status` of the returned response is not
+        checked, see :meth:`Response.raise_for_status`.
+
+        Raises:
+            HTTPError: If the request fails without a response.
+        """
+        if params:
+            sep = '&' if urlsplit(url).query else '?'
+            url += sep + urlencode(params)
+        request_headers = {
+            'User-Agent': self.user_agent,
+            'Accept-Encoding': 'gzip, deflate',
+        }
+        if headers is not None:
+            request_headers.update(headers)
+        for _ in range(self.max_redirects + 1):
+            res, content = self._send_with_retries(
+                method, url, request_headers, rate_limiter
+            )
+            location = res.getheader('Location')
+            if res.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                if res.status == 303:
+                    method = 'GET'
+                continue
+            encoding = res.getheader('Content-Encoding', '').lower()
+            if encoding == 'gzip':
+                content = gzip.decompress(content)
+            elif encoding == 'deflate':
+                content = zlib.decompress(content)
+            return Response(url, res.status, res.headers, content)
+        raise HTTPError("Too many redirects for %s" % url)
+
+    def get(self, url, params=None, headers=None, rate_limiter=None):
+        """Send a GET request, see :meth:`request`."""
+        return self.request(
+            'GET',
+            url,
+            params=params,
+            headers=headers,
+            rate_limiter=rate_limiter,
+        )
@@ -0,0 +1,225 @@
+"""Lookup of journal macros and abbreviations for journal names.
+
+Journal names as reported by Crossref come in many variants ("Phys. Rev.
+Lett.", "Phys Rev Lett", "The Journal of Chemical Physics", ...). The
+:class:`JournalIndex` normalizes names (see :func:`normalize_journal_name`)
+before looking them up, so that any variant of a name in
+:data:`getbibtex.journalnames.JOURNAL_NAME_TO_MACRO` maps to the same macro.
+
+In addition, the index can use an external list of journal abbreviations
+(e.g., the ISO4 abbreviations derived from the LTWA), which maps full journal
+names to their abbreviations. Such a list may contain tens of thousands of
+journals. It is read from a compact file written by
+:func:`write_abbreviations`, only when it is first needed.
+"""
+
+import gzip
+import re
+import unicodedata
+
+__all__ = [
+    'JournalIndex',
+    'get_journal_index',
+    'normalize_journal_name',
+    'read_abbreviations',
+    'set_journal_index',
+    'write_abbreviations',
+]
+
+
+_RX_NON_WORD = re.compile(r'[\W_]+')
+
+# The first line of a file written by `write_abbreviations`
+_ABBREVIATIONS_HEADER = '# getbibtex journal abbreviations v1'
+
+_JOURNAL_INDEX = None
+
+
+def normalize_journal_name(name):
+    """Normalize the journal `name` for lookups.
+
+    Fold the case and accents, replace "&" with "and", drop all punctuation
+    and a leading "The", and collapse whitespace.
+
+    >>> normalize_journal_name('Phys. Rev. Lett.')
+    'phys rev lett'
+    >>> normalize_journal_name('The Journal of Chemical  Physics')
+    'journal of chemical physics'
+    >>> normalize_journal_name('J. Phys.: Condens. Matter')
+    'j phys condens matter'
+    >>> normalize_journal_name('Science & Engineering')
+    'science and engineering'
+    >>> normalize_journal_name('Zeitschrift für Physik')
+    'zeitschrift fur physik'
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = name.casefold().replace('&', ' and ')
+    words = _RX_NON_WORD.sub(' ', name).split()
+    if len(words) > 1 and words[0] == 'the':
+        del words[0]
+    return ' '.join(words)
+
+
+def read_abbreviations(filename):
+    """Read a list of journal abbreviations from the given file.
+
+    Return a dict that maps normalized full journal names to abbreviations.
+
+    The file is either written by :func:`write_abbreviations`, or a text file
+    with one journal per line, containing the full name and the abbreviation
+    separated by a tab or a semicolon (like the abbreviation lists of JabRef).
+    Empty lines and lines starting with '#' are ignored. Files with a ".gz"
+    suffix are decompressed.
+    """
+    opener = gzip.open if str(filename).endswith('.gz') else open
+    abbreviations = {}
+    interned = {}  # many journals share the same abbreviation
+    with opener(filename, 'rt', encoding='utf-8') as in_fh:
+        first_line = in_fh.readline()
+        normalized = first_line.rstrip('\n') == _ABBREVIATIONS_HEADER
+        for line in _chain(first_line, in_fh):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            sep = '\t' if '\t' in line else ';'
+            try:
+                name, abbreviation = line.split(sep)[:2]
+            except ValueError:
+                raise IOError(
+                    "Invalid line in journal abbreviations %s: %r"
+                    % (filename, line)
+                )
+            abbreviation = abbreviation.strip().strip('"')
+            if not normalized:
+                name = normalize_journal_name(name.strip().strip('"'))
+            if name and abbreviation:
+                abbreviation = interned.setdefault(abbreviation, abbreviation)
+                abbreviations.setdefault(name, abbreviation)
+    return abbreviations
+
+
+def _chain(first_line, lines):
+    yield first_line
+    yield from lines
+
+
+def write_abbreviations(abbreviations, filename):
+    """Write a compact file of journal abbreviations.
+
+    The `abbreviations` are an iterable of tuples `(full_name,
+    abbreviation)`, or a dict. The full names are normalized, and the
+    resulting mapping is written as a sorted, gzip-compressed, tab-separated
+    file that :func:`read_abbreviations` can load without re-normalizing.
+    Return the number of journals written.
+    """
+    if isinstance(abbreviations, dict):
+        abbreviations = abbreviations.items()
+    normalized = {}
+    for name, abbreviation in abbreviations:
+        key = normalize_journal_name(name)
+        if key and abbreviation:
+            normalized.setdefault(key, abbreviation.strip())
+    with gzip.open(filename, 'wt', encoding='utf-8') as out_fh:
+        out_fh.write(_ABBREVIATIONS_HEADER + '\n')
+        for key in sorted(normalized):
+            out_fh.write('%s\t%s\n' % (key, normalized[key]))
+    return len(normalized)
+
+
+class JournalIndex:
+    """Index mapping journal names to macros and abbreviations.
+
+    Args:
+        name_to_macro (dict or None): Mapping of journal names to macros.
+            Defaults to
+            :data:`getbibtex.journalnames.JOURNAL_NAME_TO_MACRO`.
+        abbreviations_file (str or None): File with journal abbreviations,
+            see :func:`read_abbreviations`. The file is loaded on the first
+            lookup that needs it.
+
+    All lookups are dict lookups of the (normalized) name, and take constant
+    time per name.
+    """
+
+    def __init__(self, name_to_macro=None, abbreviations_file=None):
+        if name_to_macro is None:
+            from .journalnames import JOURNAL_NAME_TO_MACRO
+
+            name_to_macro = JOURNAL_NAME_TO_MACRO
+        self.name_to_macro = name_to_macro
+        self.abbreviations_file = abbreviations_file
+        self._normalized_to_macro = {}
+        for name, macro in name_to_macro.items():
+            key = normalize_journal_name(name)
+            self._normalized_to_macro.setdefault(key, macro)
+        self._abbreviations = None
+
+    @property
+    def abbreviations(self):
+        """Dict of normalized full journal names to abbreviations."""
+        if self._abbreviations is None:
+            if self.abbreviations_file is None:
+                self._abbreviations = {}
+            else:
+                self._abbreviations = read_abbreviations(
+                    self.abbreviations_file
+                )
+        return self._abbreviations
+
+    def _macro(self, name):
+        try:
+            return self.name_to_macro[name]
+        except KeyError:
+            return self._normalized_to_macro.get(normalize_journal_name(name))
+
+    def get_macro(self, names):
+        """Return the macro for the first journal in `names` that has one.
+
+        Try an exact match for all names first, then a match of the
+        normalized names, and lastly the macro for the abbreviation of each
+        name. Return None if no name has a macro.
+        """
+        names = [name for name in names if name is not None]
+        for name in names:
+            if name in self.name_to_macro:
+                return self.name_to_macro[name]
+        for name in names:
+            macro = self._normalized_to_macro.get(normalize_journal_name(name))
+            if macro is not None:
+                return macro
+        if self.abbreviations_file is not None:
+            for name in names:
+                abbreviation = self.get_abbreviation(name)
+                if abbreviation is not None:
+                    macro = self._macro(abbreviation)
+                    if macro is not None:
+                        return macro
+        return None
+
+    def get_abbreviation(self, name):
+        """Return the abbreviation for the full journal `name`, or None."""
+        return self.abbreviations.get(normalize_journal_name(name))
+
+
+def get_journal_index():
+    """Return the active :class:`JournalIndex`.
+
+    The default index is created on first use, without any abbreviations.
+    """
+    global _JOURNAL_INDEX
+    if _JOURNAL_INDEX is None:
+        _JOURNAL_INDEX = JournalIndex()
+    return _JOURNAL_INDEX
+
+
+def set_journal_index(journal_index):
+    """Set the active :class:`JournalIndex` used for all records.
+
+    Passing None resets to the default index. Return the previously active
+    index.
+    """
+    global _JOURNAL_INDEX
+    previous = _JOURNAL_INDEX
+    _JOURNAL_INDEX = journal_index
+    return previous
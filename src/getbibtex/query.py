@@ -0,0 +1,174 @@
+"""Classification and resolution of a single query string."""
+
+import re
+
+from .timing import timed
+
+__all__ = [
+    'RX_ARXIV_NEW',
+    'RX_ARXIV_OLD',
+    'RX_DOI',
+    'classify_query',
+    'resolve_query',
+]
+
+
+RX_DOI = re.compile(r'10.\d{4,9}/[-._;()/:A-Z0-9]+', re.I)
+
+RX_ARXIV_NEW = re.compile(r'arxiv.*?(\d{4}\.\d{4,}(v\d+)?)', re.I)
+RX_ARXIV_OLD = re.compile(
+    r"""
+    ((
+       math-ph
+      |hep-ph
+      |nucl-ex
+      |nucl-th
+      |gr-qc
+      |astro-ph
+      |hep-lat
+      |quant-ph
+      |hep-ex
+      |hep-th
+      |stat
+        (\.(AP|CO|ML|ME|TH))?
+      |q-bio
+        (\.(BM|CB|GN|MN|NC|OT|PE|QM|SC|TO))?
+      |cond-mat
+        (\.(dis-nn|mes-hall|mtrl-sci|other|soft|stat-mech|str-el|supr-con))?
+      |cs
+        (\.(AR|AI|CL|CC|CE|CG|GT|CV|CY|CR|DS|DB|DL|DM|DC|GL|GR|HC|IR|IT|LG|LO|
+          MS|MA|MM|NI|NE|NA|OS|OH|PF|PL|RO|SE|SD|SC))?
+      |nlin
+        (\.(AO|CG|CD|SI|PS))?
+      |physics
+        (\.(acc-ph|ao-ph|atom-ph|atm-clus|bio-ph|chem-ph|class-ph|comp-ph|
+          data-an|flu-dyn|gen-ph|geo-ph|hist-ph|ins-det|med-ph|optics|ed-ph|
+          soc-ph|plasm-ph|pop-ph|space-ph))?
+      |math
+          (\.(AG|AT|AP|CT|CA|CO|AC|CV|DG|DS|FA|GM|GN|GT|GR|HO|IT|KT|LO|MP|MG
+          |NT|NA|OA|OC|PR|QA|RT|RA|SP|ST|SG))?
+    )/\d{7}(v\d+)?)""",
+    re.X,
+)
+
+# `RX_ARXIV_NEW` is split into two searches that each take linear time. The
+# lazy ``.*?`` in `RX_ARXIV_NEW` makes a single search quadratic in the length
+# of inputs like URLs with many occurrences of "arxiv".
+_RX_ARXIV = re.compile('arxiv', re.I)
+_RX_ARXIV_NEW_ID = re.compile(r'\d{4}\.\d{4,}(v\d+)?', re.I)
+
+
+def _search_arxiv_new(query):
+    """Return the first new-style arXiv ID found by `RX_ARXIV_NEW`, or None.
+
+    As "." does not match a newline, the ID must follow "arxiv" on the same
+    line. Only the first "arxiv" on each line must be considered, as any ID
+    following a later "arxiv" also follows the first one. Thus, every line
+    is scanned at most twice.
+    """
+    pos = 0
+    while True:
+        match = _RX_ARXIV.search(query, pos)
+        if match is None:
+            return None
+        eol = query.find('\n', match.end())
+        if eol < 0:
+            eol = len(query)
+        match = _RX_ARXIV_NEW_ID.search(query, match.end(), eol)
+        if match is not None:
+            return match.group(0)
+        pos = eol + 1
+
+
+def classify_query(query):
+    """Determine what kind of identifier the given `query` string contains.
+
+    Return a tuple ``(kind, identifier)`` where `kind` is one of 'arxiv',
+    'doi', or 'query'. For 'arxiv' and 'doi', `identifier` is the arXiv ID or
+    DOI extracted from `query` (which may e.g. be a URL). For 'query',
+    `identifier` is the unchanged `query`, to be used as a free-form search.
+
+    The result is the same as for searching `query` with
+    :data:`RX_ARXIV_NEW`, :data:`RX_ARXIV_OLD`, and :data:`RX_DOI`, in that
+    order, but the time is guaranteed to be linear in the length of `query`
+    (see ``benchmarks/adversarial.py``).
+
+    >>> from getbibtex.query import classify_query
+    >>> classify_query('https://arxiv.org/abs/2205.15044')
+    ('arxiv', '2205.15044')
+    >>> classify_query('https://doi.org/10.22331/q-2022-01-24-629')
+    ('doi', '10.22331/q-2022-01-24-629')
+    >>> classify_query('Goerz Krotov SciPost 2019')
+    ('query', 'Goerz Krotov SciPost 2019')
+    """
+    arxiv_id = _search_arxiv_new(query)
+    if arxiv_id is not None:
+        return 'arxiv', arxiv_id
+    match = RX_ARXIV_OLD.search(query)
+    if match:
+        return 'arxiv', match.group(1)
+    if ' ' not in query:
+        if query.startswith('10.'):
+            return 'doi', query
+        # Handle e.g. URLs
+        match = RX_DOI.search(query)
+        if match:
+            return 'doi', match.group(0)
+    return 'query', query
+
+
+def resolve_query(
+    query,
+    debug_record=False,
+    fix_uppercase=False,
+    auto_protect=False,
+    capitalize_field_names=True,
+    use_journal_macros=True,
+):
+    """Generate a BibTeX entry for the given `query` string.
+
+    The `query` is classified with :func:`classify_query` and dispatched to
+    the matching backend. All other arguments are passed to the backend.
+
+    Raises:
+        NotImplementedError: if the backend cannot handle the record.
+        IOError: if the backend lookup fails.
+    """
+    # Backends are imported on demand, so that only the backend selected for
+    # the `query` is loaded
+    kind, identifier = classify_query(query)
+    if kind == 'arxiv':
+        with timed('import'):
+            from .backends.arxiv import get_bibtex_from_arxiv_id
+
+        return get_bibtex_from_arxiv_id(
+            identifier,
+            debug_record=debug_record,
+            fix_uppercase=fix_uppercase,
+            auto_protect=auto_protect,
+            capitalize_field_names=capitalize_field_names,
+        )
+    elif kind == 'doi':
+        with timed('import'):
+            from .backends.crossref import get_bibtex_from_doi
+
+        return get_bibtex_from_doi(
+            doi=identifier,
+            debug_record=debug_record,
+            fix_uppercase=fix_uppercase,
+            auto_protect=auto_protect,
+            capitalize_field_names=capitalize_field_names,
+            use_journal_macros=use_journal_macros,
+        )
+    else:
+        with timed('import'):
+            from .backends.crossref import get_bibtex_from_query
+
+        return get_bibtex_from_query(
+            query=identifier,
+            debug_record=debug_record,
+            fix_uppercase=fix_uppercase,
+            auto_protect=auto_protect,
+            capitalize_field_names=capitalize_field_names,
+            use_journal_macros=use_journal_macros,
+        )
@@ -0,0 +1,61 @@
+"""Compact model for the metadata of a publication.
+
+The backends decode the records they obtain (e.g. the ``message`` of a
+Crossref response) into a :class:`Record` once, and render the BibTeX entry
+from it. Unlike the raw JSON dicts, a :class:`Record` only holds the fields
+that are needed for an entry, in slots, which keeps the memory per record low
+when processing many records, and makes attribute access in hot loops fast.
+"""
+
+import dataclasses
+
+__all__ = ['Record']
+
+
+@dataclasses.dataclass(slots=True)
+class Record:
+    """Metadata of a publication, as needed for a BibTeX entry.
+
+    All fields are optional, and None if unknown.
+
+    Attributes:
+        type (str): The type of the publication as reported by the backend,
+            e.g. 'journal-article' for Crossref, or 'arxiv' for arXiv
+        doi (str): The DOI
+        eprint (str): The arXiv ID
+        title (str): The title
+        authors (tuple[str]): The author names, as "Last, First", followed
+            by "others" if the list was capped, see
+            :func:`~getbibtex.bibtex.set_max_authors`
+        first_author (str): The last name of the first author
+        editors (tuple[str]): The editor names, as "Last, First"
+        container_titles (tuple[str]): The full names of the journal,
+            proceedings, or book that contains the publication
+        short_container_titles (tuple[str]): Abbreviations of the
+            `container_titles`
+        year (int or str): The year of publication
+        volume (str): The volume
+        issue (str): The issue (number)
+        page (str): The page or page range
+        article_number (str): The article number, which takes precedence over
+            the `page`
+        publisher (str): The name of the publisher
+        location (str): The location of a conference
+    """
+
+    type: str | None = None
+    doi: str | None = None
+    eprint: str | None = None
+    title: str | None = None
+    authors: tuple | None = None
+    first_author: str | None = None
+    editors: tuple | None = None
+    container_titles: tuple = ()
+    short_container_titles: tuple = ()
+    year: int | str | None = None
+    volume: str | None = None
+    issue: str | None = None
+    page: str | None = None
+    article_number: str | None = None
+    publisher: str | None = None
+    location: str | None = None
@@ -0,0 +1,214 @@
+"""Daemon answering lookup requests from :mod:`getbibtex.client`.
+
+Started with ``getbibtex serve``, the daemon keeps everything that a single
+invocation of ``getbibtex`` would have to set up from scratch warm across
+lookups: the imported backends, the compiled regexes and tables (protected
+words, journal names), the HTTP session with its open connections, and the
+record cache. See :mod:`getbibtex.client` for the protocol.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+from .client import parse_address
+
+__all__ = ['handle_request', 'make_server', 'warm_up']
+
+
+# The options of a request, with the defaults of `getbibtex lookup`. The
+# client only sends the options given on its command line.
+_OPTIONS = {
+    'debug_record': False,
+    'fix_uppercase': False,
+    'auto_protect': None,
+    'capitalize_field_names': True,
+    'use_journal_macros': True,
+}
+
+# Lookups print their warnings to stderr, which is captured per request. As
+# requests are answered concurrently, `sys.stderr` is replaced by a
+# `_StderrProxy` while any request is active, which writes to the buffer of
+# the current thread.
+_CAPTURE = threading.local()
+_CAPTURE_LOCK = threading.Lock()
+_N_CAPTURES = 0
+_ORIGINAL_STDERR = None
+
+
+class _StderrProxy:
+    """Stand-in for `sys.stderr` that writes to a per-thread buffer, if any."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def _target(self):
+        messages = getattr(_CAPTURE, 'messages', None)
+        return self._stream if messages is None else messages
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextlib.contextmanager
+def _capture_stderr(messages):
+    """Redirect everything the current thread writes to stderr to `messages`.
+
+    Unlike :func:`contextlib.redirect_stderr`, this does not affect any other
+    thread.
+    """
+    global _N_CAPTURES, _ORIGINAL_STDERR
+    with _CAPTURE_LOCK:
+        if _N_CAPTURES == 0:
+            _ORIGINAL_STDERR = sys.stderr
+            sys.stderr = _StderrProxy(sys.stderr)
+        _N_CAPTURES += 1
+    _CAPTURE.messages = messages
+    try:
+        yield
+    finally:
+        _CAPTURE.messages = None
+        with _CAPTURE_LOCK:
+            _N_CAPTURES -= 1
+            if _N_CAPTURES == 0:
+                sys.stderr = _ORIGINAL_STDERR
+
+
+def warm_up():
+    """Import the backends and compile the tables used by every lookup."""
+    from .backends import arxiv, crossref  # noqa: F401
+    from .bibtex import get_protected_words
+    from .journals import get_journal_index
+
+    get_protected_words().protect("Warm Up")
+    get_journal_index().get_macro(["Phys. Rev. Lett."])
+
+
+def handle_request(request):
+    """Answer a single `request` dict.
+
+    Return the response dict, see :mod:`getbibtex.client`.
+    """
+    from .query import resolve_query
+
+    messages = io.StringIO()
+    try:
+        args = request['args']
+        options = request.get('options', {})
+        unknown = set(options) - set(_OPTIONS)
+        if unknown:
+            raise ValueError(
+                "Unknown options: %s" % ", ".join(sorted(unknown))
+            )
+        if not isinstance(args, list) or not all(
+            isinstance(arg, str) for arg in args
+        ):
+            raise TypeError("'args' must be a list of strings")
+        if not args:
+            raise ValueError("Missing argument 'ARGS...'")
+        options = {**_OPTIONS, **options}
+        with _capture_stderr(messages):
+            entry = resolve_query(" ".join(args), **options)
+    except (KeyError, TypeError, ValueError) as exc_info:
+        return {
+            'status': 'error',
+            'error': "Invalid request: %s" % exc_info,
+            'messages': messages.getvalue(),
+        }
+    except (NotImplementedError, IOError) as exc_info:
+        return {
+            'status': 'error',
+            'error': str(exc_info),
+            'messages': messages.getvalue(),
+        }
+    except Exception as exc_info:  # pylint: disable=broad-except
+        # An unexpected error in a lookup must not drop the connection
+        return {
+            'status': 'error',
+            'error': "%s: %s" % (type(exc_info).__name__, exc_info),
+            'messages': messages.getvalue(),
+        }
+    return {'status': 'ok', 'entry': entry, 'messages': messages.getvalue()}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Answer every line of JSON received on a connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as exc_info:
+                response = {
+                    'status': 'error',
+                    'error': "Invalid request: %s" % exc_info,
+                    'messages': '',
+                }
+            else:
+                response = handle_request(request)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    @property
+    def address(self):
+        return self.server_address
+
+    def server_bind(self):
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)  # only the user may connect
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.server_address)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    @property
+    def address(self):
+        return '%s:%d' % self.server_address[:2]
+
+
+def make_server(address):
+    """Return a server listening at `address`.
+
+    The `address` is either the path of a Unix socket, or ``HOST:PORT`` for a
+    TCP socket (which should be on localhost, as there is no authentication).
+    Call ``serve_forever()`` on the result to answer requests, and
+    ``server_close()`` to remove the socket.
+
+    Raises:
+        OSError: if another server is already listening at `address`.
+    """
+    family, sock_address = parse_address(address)
+    if family == socket.AF_INET:
+        return _TCPServer(sock_address, _Handler)
+    if os.path.exists(sock_address):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(sock_address)
+        except ConnectionRefusedError:
+            os.unlink(sock_address)  # stale socket from a crashed server
+        else:
+            raise OSError("A server is already listening at %s" % address)
+        finally:
+            probe.close()
+    return _UnixServer(sock_address, _Handler)
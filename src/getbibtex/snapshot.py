@@ -0,0 +1,348 @@
+"""Local index of records from bulk metadata snapshots.
+
+For machines without access to the Crossref or arXiv APIs, the records can be
+resolved from a local :class:`SnapshotIndex` instead. The index is an SQLite
+database that maps the cache keys of the records (see
+:func:`getbibtex.cache.doi_key` and :func:`arxiv_snapshot_key`) to the
+compressed JSON of the record, reduced to the fields that are needed for
+BibTeX entries. It is built from a Crossref metadata snapshot ("public data
+file") with :func:`ingest_crossref_snapshot`, or with ``getbibtex snapshot
+crossref SOURCE DEST``, and from the arXiv metadata snapshot (the JSON-lines
+file of all arXiv articles) with :func:`ingest_arxiv_snapshot`, or with
+``getbibtex snapshot arxiv SOURCE DEST``. Both snapshots may be added to the
+same index.
+
+When an index is active (see :func:`set_snapshot_index`), the backends look
+up every record in the index before making any request.
+"""
+
+import json
+import os
+import pathlib
+import re
+import threading
+import zlib
+
+from .executor import map_ordered
+from .timing import timed
+
+__all__ = [
+    'SnapshotIndex',
+    'arxiv_snapshot_key',
+    'get_snapshot_index',
+    'ingest_arxiv_snapshot',
+    'ingest_crossref_snapshot',
+    'read_snapshot_file',
+    'set_snapshot_index',
+    'snapshot_files',
+]
+
+
+# Number of lines of the arXiv snapshot that are processed at once
+ARXIV_CHUNK_SIZE = 10000
+
+_SNAPSHOT_INDEX = None
+
+_RX_ARXIV_VERSION = re.compile(r'v\d+$')
+
+
+def get_snapshot_index():
+    """Return the active :class:`SnapshotIndex`, or None."""
+    return _SNAPSHOT_INDEX
+
+
+def set_snapshot_index(index):
+    """Set the active :class:`SnapshotIndex` used by all backends.
+
+    Passing None deactivates the index (the default). Return the previously
+    active index.
+    """
+    global _SNAPSHOT_INDEX
+    previous = _SNAPSHOT_INDEX
+    _SNAPSHOT_INDEX = index
+    return previous
+
+
+def encode_record(record):
+    """Encode a JSON-serializable `record` for storage in the index."""
+    data = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(data.encode('utf-8'))
+
+
+def decode_record(data):
+    """Inverse of :func:`encode_record`."""
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+class SnapshotIndex:
+    """SQLite index of records from bulk metadata snapshots.
+
+    Args:
+        path (str): The SQLite database file.
+        writable (bool): If True, open the index for adding records, creating
+            the file if it does not exist. Otherwise, the file must exist.
+
+    The index can be used from multiple threads.
+    """
+
+    def __init__(self, path, writable=False):
+        import sqlite3  # not needed without an index
+
+        self.path = path
+        self._lock = threading.Lock()
+        if writable:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS records (
+                    key TEXT PRIMARY KEY,
+                    record BLOB NOT NULL
+                ) WITHOUT ROWID;
+                """)
+        else:
+            if not os.path.isfile(path):
+                raise IOError("Snapshot index %s does not exist" % path)
+            # as_uri() percent-encodes characters like '?', '#', or '%'
+            uri = pathlib.Path(path).resolve().as_uri() + '?mode=ro'
+            self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            row = self._db.execute("SELECT COUNT(*) FROM records").fetchone()
+        return row[0]
+
+    def get(self, key):
+        """Return the record for the given `key`, or None."""
+        with timed('snapshot'), self._lock:
+            row = self._db.execute(
+                "SELECT record FROM records WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return decode_record(row[0])
+
+    def add(self, items):
+        """Add records to the index.
+
+        The `items` are tuples ``(key, data)``, where `data` is a record
+        encoded with :func:`encode_record`. Existing records for the same key
+        are replaced.
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records (key, record) VALUES (?, ?)",
+                items,
+            )
+
+
+def arxiv_snapshot_key(arxiv_id):
+    """Index key for an arXiv record.
+
+    The arXiv snapshot contains only the latest version of each preprint, so
+    the key does not include the version. For old-style IDs, it also does not
+    include the subject class.
+
+    >>> arxiv_snapshot_key('2205.15044v2')
+    'arxiv:2205.15044'
+    >>> arxiv_snapshot_key('math.GT/0309136')
+    'arxiv:math/0309136'
+    """
+    from .cache import arxiv_key
+
+    arxiv_id = _RX_ARXIV_VERSION.sub('', arxiv_id.strip())
+    if '/' in arxiv_id:
+        archive, number = arxiv_id.split('/', 1)
+        arxiv_id = archive.split('.')[0] + '/' + number
+    return arxiv_key(arxiv_id)
+
+
+def snapshot_files(source, extensions=('.json', '.jsonl')):
+    """Return a sorted list of all snapshot files in `source`.
+
+    The `source` may be a single file, or a folder that is searched
+    recursively for files with the given `extensions` (optionally with an
+    additional ``.gz``).
+    """
+    if os.path.isfile(source):
+        return [source]
+    files = []
+    for dirpath, _, filenames in os.walk(source):
+        for filename in filenames:
+            name = filename
+            if name.endswith('.gz'):
+                name = name[:-3]
+            if name.endswith(tuple(extensions)):
+                files.append(os.path.join(dirpath, filename))
+    return sorted(files)
+
+
+def read_snapshot_file(filename):
+    """Iterate over the records in a snapshot file.
+
+    A file with the extension ``.jsonl`` (or ``.jsonl.gz``) must contain one
+    JSON record per line. Any other file must contain a JSON object with a
+    list of records under the key "items" (like the files of the Crossref
+    public data file), or a JSON list of records. Files ending in ``.gz``
+    are decompressed.
+    """
+    import gzip
+
+    opener = gzip.open if filename.endswith('.gz') else open
+    name = filename[:-3] if filename.endswith('.gz') else filename
+    with opener(filename, 'rt', encoding='utf-8') as in_fh:
+        if name.endswith('.jsonl'):
+            for line in in_fh:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(in_fh)
+            if isinstance(data, dict):
+                data = data.get('items', [])
+            yield from data
+
+
+def _crossref_items(filename):
+    """Return the encoded index items for all records in a Crossref file."""
+    from .backends.crossref import strip_record
+    from .cache import doi_key
+
+    try:
+        return [
+            (doi_key(record['DOI']), encode_record(strip_record(record)))
+            for record in read_snapshot_file(filename)
+            if 'DOI' in record
+        ]
+    except (OSError, ValueError) as exc_info:
+        return IOError("Cannot read %s: %s" % (filename, exc_info))
+
+
+def ingest_crossref_snapshot(source, index, workers=1, on_error=None):
+    """Add all records from a Crossref metadata snapshot to `index`.
+
+    The `source` is a folder with the files of the snapshot, or a single
+    file, see :func:`read_snapshot_file`. The files are read, and their
+    records reduced to the fields needed for BibTeX entries, in up to
+    `workers` processes. Only a few files are held in memory at any time, so
+    the memory usage does not depend on the size of the snapshot.
+
+    A file that cannot be read is skipped, after passing the `IOError` to
+    `on_error`, if given. Return the number of records that were added.
+    """
+    n_records = 0
+    files = snapshot_files(source)
+    for items in map_ordered(
+        _crossref_items, files, workers=workers, processes=(workers > 1)
+    ):
+        if isinstance(items, IOError):
+            if on_error is not None:
+                on_error(items)
+            continue
+        index.add(items)
+        n_records += len(items)
+    return n_records
+
+
+def _arxiv_record(data):
+    """Convert an entry of the arXiv snapshot into an arXiv record dict.
+
+    Return a dict with the `authors`, `title`, and `year`, like
+    :func:`getbibtex.backends.arxiv.fetch_arxiv_record`.
+    """
+    from bibtexparser.latexenc import latex_to_unicode  # slow import
+
+    authors = []
+    for parts in data['authors_parsed']:
+        last, first = parts[0], parts[1]
+        jr = parts[2] if len(parts) > 2 else ''
+        name = last
+        if first:
+            if jr:
+                name += ", " + jr
+            name += ", " + first
+        authors.append(latex_to_unicode(name))
+    return {
+        'authors': authors,
+        'title': " ".join(data['title'].split()),
+        'year': data['versions'][0]['created'].split()[3],
+    }
+
+
+def _arxiv_items(chunk):
+    """Return the encoded index items for a chunk of the arXiv snapshot.
+
+    The `chunk` is a tuple ``(filename, lineno, lines)``. Return a tuple of
+    the items and a list of `IOError` for all invalid lines.
+    """
+    filename, first_lineno, lines = chunk
+    items = []
+    errors = []
+    for lineno, line in enumerate(lines, start=first_lineno):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            arxiv_record = _arxiv_record(data)
+            key = arxiv_snapshot_key(data['id'])
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            errors.append(
+                IOError("Invalid record in %s:%d" % (filename, lineno))
+            )
+            continue
+        items.append((key, encode_record(arxiv_record)))
+    return items, errors
+
+
+def _line_chunks(files, size):
+    """Iterate over chunks of at most `size` lines in `files`."""
+    import gzip
+
+    for filename in files:
+        opener = gzip.open if filename.endswith('.gz') else open
+        with opener(filename, 'rt', encoding='utf-8') as in_fh:
+            lines = []
+            first_lineno = 1
+            for lineno, line in enumerate(in_fh, start=1):
+                lines.append(line)
+                if len(lines) >= size:
+                    yield filename, first_lineno, lines
+                    lines = []
+                    first_lineno = lineno + 1
+            if lines:
+                yield filename, first_lineno, lines
+
+
+def ingest_arxiv_snapshot(source, index, workers=1, on_error=None):
+    """Add all records from the arXiv metadata snapshot to `index`.
+
+    The `source` is the JSON-lines file of the arXiv metadata snapshot
+    (optionally gzipped), or a folder of such files. Each line must contain
+    an arXiv entry with (at least) the keys "id", "title", "authors_parsed",
+    and "versions". Entries for both new-style and old-style arXiv IDs are
+    stored under :func:`arxiv_snapshot_key`.
+
+    The file is streamed in chunks of `ARXIV_CHUNK_SIZE` lines, which are
+    processed in up to `workers` processes, so the memory usage does not
+    depend on the size of the snapshot. Invalid lines are skipped, after
+    passing an `IOError` to `on_error`, if given. Return the number of
+    records that were added.
+    """
+    n_records = 0
+    chunks = _line_chunks(snapshot_files(source), ARXIV_CHUNK_SIZE)
+    for items, errors in map_ordered(
+        _arxiv_items, chunks, workers=workers, processes=(workers > 1)
+    ):
+        if on_error is not None:
+            for error in errors:
+                on_error(error)
+        index.add(items)
+        n_records += len(items)
+    return n_records
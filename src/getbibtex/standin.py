@@ -0,0 +1,330 @@
+"""Local stand-in for the Crossref, doi.org, and arXiv APIs.
+
+The :class:`StandinServer` serves the records from fixture files through the
+same endpoints that the backends use:
+
+* ``/works/{doi}`` and ``/works?filter=doi:...`` or
+  ``/works?query.bibliographic=...``, optionally with ``select=...`` (the
+  Crossref REST API)
+* ``/doi/{doi}`` (content negotiation at doi.org)
+* ``/api/query?id_list=...`` (the arXiv export API)
+
+It can inject latency, server errors, and throttling (429) into its
+responses. Point the backends at the server through the environment
+variables returned by :meth:`StandinServer.environ`, e.g. to load-test the
+``getbibtex`` command offline::
+
+    getbibtex standin fixtures/ --port 8000 --latency 0.05
+
+The fixtures are a folder with a file ``crossref.jsonl`` with one Crossref
+record (the ``message`` of a ``/works/{doi}`` response) per line, and a file
+``arxiv.jsonl`` with one arXiv record per line (a dict with the `id`,
+`title`, `authors`, and `year` of the preprint). Either file may be missing.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+__all__ = ['StandinServer', 'load_fixtures', 'write_fixtures']
+
+
+def load_fixtures(folder):
+    """Load the fixtures in the given `folder`.
+
+    Return a tuple ``(crossref_records, arxiv_records)`` of lists of dicts.
+    """
+    fixtures = []
+    for name in ('crossref.jsonl', 'arxiv.jsonl'):
+        filename = os.path.join(folder, name)
+        records = []
+        if os.path.isfile(filename):
+            with open(filename, encoding='utf-8') as in_fh:
+                for line in in_fh:
+                    if line.strip():
+                        records.append(json.loads(line))
+        fixtures.append(records)
+    return tuple(fixtures)
+
+
+def write_fixtures(folder, crossref_records=(), arxiv_records=()):
+    """Write the given records as fixtures into `folder`.
+
+    See :func:`load_fixtures`.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for name, records in (
+        ('crossref.jsonl', crossref_records),
+        ('arxiv.jsonl', arxiv_records),
+    ):
+        with open(os.path.join(folder, name), 'w', encoding='utf-8') as fh:
+            for record in records:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class StandinServer(ThreadingHTTPServer):
+    """HTTP server standing in for Crossref, doi.org, and arXiv.
+
+    Args:
+        crossref_records (list[dict]): The Crossref records to serve. Each
+            record must have a 'DOI'.
+        arxiv_records (list[dict]): The arXiv records to serve, as dicts with
+            the `id`, `title`, `authors`, and `year` of the preprint.
+        address (tuple): The ``(host, port)`` to listen on. By default, a
+            random free port on localhost.
+        latency (float): Delay (in seconds) before every response
+        jitter (float): Maximum additional random delay (in seconds)
+        error_rate (float): Fraction of requests that fail with a 503 error
+        throttle_rate (float): Fraction of requests that fail with a 429
+            ("Too Many Requests") error
+        retry_after (float): The value of the ``Retry-After`` header for 429
+            and 503 errors.
+        rate_limit (int or None): If given, the number of requests per second
+            announced in the ``X-Rate-Limit-Limit`` header of every response
+        seed (int or None): Seed for the random latency and errors
+
+    Attributes:
+        n_requests (int): The number of requests received so far
+        n_errors (int): The number of injected errors (429 or 503)
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        crossref_records=(),
+        arxiv_records=(),
+        address=('127.0.0.1', 0),
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        retry_after=0,
+        rate_limit=None,
+        seed=None,
+    ):
+        self.crossref_records = {
+            record['DOI'].lower(): record for record in crossref_records
+        }
+        self.arxiv_records = {record['id']: record for record in arxiv_records}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.n_requests = 0
+        self.n_errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        super().__init__(address, _Handler)
+
+    @property
+    def url(self):
+        """The base URL of the server."""
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def environ(self):
+        """Environment variables that point the backends at the server."""
+        return {
+            'GETBIBTEX_CROSSREF_API_URL': self.url,
+            'GETBIBTEX_DOI_URL': self.url + '/doi',
+            'GETBIBTEX_ARXIV_API_URL': self.url + '/api/query',
+        }
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={'poll_interval': 0.05}
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop a server started with :meth:`start`."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _draw(self):
+        """Draw the delay and the injected error (if any) for a request."""
+        with self._lock:
+            self.n_requests += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            x = self._rng.random()
+            error = None
+            if x < self.throttle_rate:
+                error = 429
+            elif x < self.throttle_rate + self.error_rate:
+                error = 503
+            if error is not None:
+                self.n_errors += 1
+        return delay, error
+
+    def search(self, query, rows):
+        """Return the `rows` Crossref records best matching `query`."""
+        words = set(_words(query))
+        scored = []
+        for record in self.crossref_records.values():
+            text = " ".join(
+                record.get('title', [])
+                + [author.get('family', '') for author in record['author']]
+            )
+            score = len(words.intersection(_words(text)))
+            if score > 0:
+                scored.append((score, record))
+        scored.sort(key=lambda item: -item[0])  # stable
+        return [record for _, record in scored[:rows]]
+
+
+def _words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):  # silence
+        pass
+
+    def _send(self, status, body, content_type='application/json', **hdrs):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if self.server.rate_limit is not None:
+            self.send_header('X-Rate-Limit-Limit', str(self.server.rate_limit))
+            self.send_header('X-Rate-Limit-Interval', '1s')
+        for key, val in hdrs.items():
+            self.send_header(key.replace('_', '-'), val)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, message):
+        self._send(200, json.dumps({'status': 'ok', 'message': message}))
+
+    def do_GET(self):
+        delay, error = self.server._draw()
+        if delay > 0:
+            time.sleep(delay)
+        if error is not None:
+            self._send(
+                error,
+                'Injected error',
+                content_type='text/plain',
+                Retry_After=str(self.server.retry_after),
+            )
+            return
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        params = parse_qs(parts.query)
+        if path.startswith('/works/'):
+            self._works_doi(path[len('/works/') :])
+        elif path == '/works':
+            self._works(params)
+        elif path.startswith('/doi/'):
+            self._content_negotiation(path[len('/doi/') :])
+        elif path == '/api/query':
+            self._arxiv_query(params)
+        else:
+            self._send(404, 'Not found', content_type='text/plain')
+
+    def _works_doi(self, doi):
+        record = self.server.crossref_records.get(doi.lower())
+        if record is None:
+            self._send(404, 'Resource not found.', content_type='text/plain')
+        else:
+            self._send_json(record)
+
+    def _works(self, params):
+        rows = int(params.get('rows', ['20'])[0])
+        items = []
+        for filter_spec in params.get('filter', []):
+            for item in filter_spec.split(','):
+                name, _, value = item.partition(':')
+                record = self.server.crossref_records.get(value.lower())
+                if name == 'doi' and record is not None:
+                    items.append(record)
+        for query in params.get('query.bibliographic', []):
+            items.extend(self.server.search(query, rows))
+        items = items[:rows]
+        for select in params.get('select', []):
+            fields = select.split(',')
+            items = [
+                {key: item[key] for key in fields if key in item}
+                for item in items
+            ]
+        self._send_json({'total-results': len(items), 'items': items})
+
+    def _content_negotiation(self, doi):
+        record = self.server.crossref_records.get(doi.lower())
+        if record is None:
+            self._send(404, 'DOI Not Found', content_type='text/plain')
+            return
+        title = " ".join(record.get('title', []))
+        entry = "@misc{%s,\n    title = {%s},\n    doi = {%s},\n}" % (
+            re.sub(r'\W', '_', record['DOI']),
+            title,
+            record['DOI'],
+        )
+        self._send(200, entry, content_type='application/x-bibtex')
+
+    def _arxiv_query(self, params):
+        ids = []
+        for id_list in params.get('id_list', []):
+            ids.extend(id_list.split(','))
+        entries = []
+        for arxiv_id in ids:
+            bare_id = re.sub(r'v\d+$', '', arxiv_id)
+            record = self.server.arxiv_records.get(bare_id)
+            if record is not None:
+                entries.append(_atom_entry(record))
+        feed = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom" '
+            'xmlns:arxiv="http://arxiv.org/schemas/atom">\n'
+            '<title>arXiv Query</title>\n' + "".join(entries) + '</feed>\n'
+        )
+        self._send(200, feed, content_type='application/atom+xml')
+
+
+def _atom_entry(record):
+    authors = "".join(
+        '<author><name>%s</name></author>' % escape(name)
+        for name in record['authors']
+    )
+    return (
+        '<entry>\n'
+        '<id>http://arxiv.org/abs/%sv1</id>\n'
+        '<updated>%s-01-01T00:00:00Z</updated>\n'
+        '<published>%s-01-01T00:00:00Z</published>\n'
+        '<title>%s</title>\n'
+        '<summary>Abstract</summary>\n'
+        '%s\n'
+        '<arxiv:primary_category term="quant-ph"/>\n'
+        '</entry>\n'
+    ) % (
+        record['id'],
+        record['year'],
+        record['year'],
+        escape(record['title']),
+        authors,
+    )
@@ -0,0 +1,141 @@
+"""Timing of the phases of a lookup.
+
+The backends wrap each phase of a lookup (e.g. the request to Crossref, or
+decoding the JSON response) in :func:`timed`. This only records anything if a
+:class:`Timings` collector is active, see :func:`set_timings`; otherwise,
+:func:`timed` has negligible overhead.
+"""
+
+import contextlib
+import math
+import sys
+import threading
+import time
+
+__all__ = ['Timings', 'get_timings', 'set_timings', 'timed']
+
+
+_TIMINGS = None
+
+_NO_TIMING = contextlib.nullcontext()
+
+
+class Timings:
+    """Collector for the durations of the phases of one or more lookups.
+
+    Each phase (a string like 'crossref' or 'format') may be timed any number
+    of times, e.g. once for every query in a batch. Phases may be nested
+    ('format' includes 'title'), so the durations of all phases do not add up
+    to the total.
+    """
+
+    def __init__(self):
+        self._durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        """Record that `phase` took the given number of `seconds`."""
+        with self._lock:
+            self._durations.setdefault(phase, []).append(seconds)
+
+    @contextlib.contextmanager
+    def phase(self, phase):
+        """Context manager recording the duration of its body as `phase`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def summary(self):
+        """Return a dict with statistics for every phase.
+
+        Each value is a dict with the number of times the phase was timed
+        ('count'), the 'total' and 'max' duration, and the percentiles
+        'p50', 'p95', and 'p99', all in seconds.
+        """
+        with self._lock:
+            durations = {
+                phase: sorted(vals)
+                for (phase, vals) in self._durations.items()
+            }
+        return {
+            phase: {
+                'count': len(vals),
+                'total': sum(vals),
+                'p50': _percentile(vals, 50),
+                'p95': _percentile(vals, 95),
+                'p99': _percentile(vals, 99),
+                'max': vals[-1],
+            }
+            for (phase, vals) in durations.items()
+        }
+
+    def report(self, out_fh=None):
+        """Write a table of the :meth:`summary` to `out_fh` (stderr)."""
+        if out_fh is None:
+            out_fh = sys.stderr
+        print(
+            "%-20s %7s %10s %10s %10s %10s"
+            % (
+                'phase',
+                'count',
+                'total [s]',
+                'p50 [ms]',
+                'p95 [ms]',
+                'p99 [ms]',
+            ),
+            file=out_fh,
+        )
+        for phase, stats in self.summary().items():
+            print(
+                "%-20s %7d %10.3f %10.1f %10.1f %10.1f"
+                % (
+                    phase,
+                    stats['count'],
+                    stats['total'],
+                    1000 * stats['p50'],
+                    1000 * stats['p95'],
+                    1000 * stats['p99'],
+                ),
+                file=out_fh,
+            )
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of a non-empty sorted list.
+
+    >>> _percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 50)
+    5
+    >>> _percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 95)
+    10
+    """
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def get_timings():
+    """Return the active :class:`Timings`, or None if timing is off."""
+    return _TIMINGS
+
+
+def set_timings(timings):
+    """Set the active :class:`Timings` collector for all lookups.
+
+    Passing None disables timing (the default). Return the previously active
+    collector.
+    """
+    global _TIMINGS
+    previous = _TIMINGS
+    _TIMINGS = timings
+    return previous
+
+
+def timed(phase):
+    """Context manager for timing a `phase` with the active :class:`Timings`.
+
+    Does nothing if no collector is active.
+    """
+    if _TIMINGS is None:
+        return _NO_TIMING
+    return _TIMINGS.phase(phase)
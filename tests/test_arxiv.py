@@ -1,37 +1,67 @@
 """Tests for the arXiv backend.
 
-The arXiv backend reaches the network through ``arxiv2bib.arxiv2bib_dict``.
-These tests replace that single function with a stub so that the BibTeX
-generation logic can be exercised offline.
+The arXiv backend reaches the network through ``_arxiv_request``. These tests
+replace that single function with a stub returning a canned Atom feed, so
+that the parsing and BibTeX generation logic can be exercised offline.
 """
 
 import types
+from xml.sax.saxutils import escape
 
 import pytest
 
 from getbibtex.backends import arxiv as arxiv_backend
+from getbibtex.bibtex import set_max_authors
+from getbibtex.http import RateLimiter, Session
 
 
 def fake_record(authors, title, year):
-    """Build a stand-in for an ``arxiv2bib`` reference record.
+    """Build a stand-in for a record in the feed of the arXiv API."""
+    return types.SimpleNamespace(authors=authors, title=title, year=year)
+
+
+def atom_feed(records):
+    """Build the Atom feed returned by arXiv for the given `records`.
 
-    Only the attributes accessed by ``get_bibtex_from_arxiv_id`` are provided.
+    The `records` map arXiv IDs to a :func:`fake_record`, or to an error
+    message.
     """
-    return types.SimpleNamespace(authors=authors, title=title, year=year)
+    entries = []
+    for arxiv_id, record in records.items():
+        if isinstance(record, str):
+            entries.append(
+                "<entry><id>http://arxiv.org/api/errors</id>"
+                "<title>Error</title><summary>%s</summary></entry>" % record
+            )
+            continue
+        authors = "".join(
+            "<author><name>%s</name></author>" % escape(name)
+            for name in record.authors
+        )
+        entries.append(
+            "<entry><id>http://arxiv.org/abs/%sv1</id>"
+            "<published>%s-05-30T17:59:59Z</published>"
+            "<title>%s</title><summary>Abstract</summary>%s</entry>"
+            % (arxiv_id, record.year, escape(record.title), authors)
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">%s</feed>'
+        % "".join(entries)
+    ).encode('utf-8')
 
 
 @pytest.fixture
 def patch_arxiv(monkeypatch):
-    """Patch ``arxiv2bib_dict`` to return a canned record for one arXiv id."""
+    """Patch ``_arxiv_request`` to return a canned record for one arXiv id."""
 
     def _patch(arxiv_id, record):
-        def fake_arxiv2bib_dict(ids):
+        def fake_arxiv_request(ids):
             assert ids == [arxiv_id]
-            # An unknown id yields an empty dict, mirroring arxiv2bib.
-            return {arxiv_id: record} if record is not None else {}
+            return atom_feed({arxiv_id: record} if record is not None else {})
 
         monkeypatch.setattr(
-            arxiv_backend.arxiv2bib, "arxiv2bib_dict", fake_arxiv2bib_dict
+            arxiv_backend, "_arxiv_request", fake_arxiv_request
         )
 
     return _patch
@@ -104,3 +134,194 @@ def test_get_bibtex_from_arxiv_id_no_result(patch_arxiv):
 
     with pytest.raises(IOError, match="arXiv query returned no result"):
         arxiv_backend.get_bibtex_from_arxiv_id(arxiv_id)
+
+
+def test_decode_record():
+    """``get_bibtex`` renders a decoded record like the raw dict."""
+    arxiv_record = {
+        'authors': ["Jean-Luc de la Vallée", "Michael H. Goerz"],
+        'title': "A study of something",
+        'year': '2004',
+    }
+    record = arxiv_backend.decode_record(arxiv_record, "2205.15044")
+    assert record.type == 'arxiv'
+    assert record.eprint == "2205.15044"
+    assert record.first_author == "delaVallée"
+    assert record.authors[1] == "Goerz, Michael H."
+    assert arxiv_backend.get_bibtex(
+        record, "2205.15044"
+    ) == arxiv_backend.get_bibtex(arxiv_record, "2205.15044")
+
+
+def test_max_authors():
+    arxiv_record = {
+        'authors': ["Michael H. Goerz", "Daniel M. Reich"]
+        + ["{Invalid" for _ in range(5000)],
+        'title': "A study of something",
+        'year': '2004',
+    }
+    previous = set_max_authors(2)
+    try:
+        # The names that are dropped are not parsed (which would fail)
+        record = arxiv_backend.decode_record(arxiv_record, "2205.15044")
+    finally:
+        set_max_authors(previous)
+    assert record.authors == (
+        "Goerz, Michael H.",
+        "Reich, Daniel M.",
+        "others",
+    )
+
+
+def test_get_bibtex_from_arxiv_ids(monkeypatch):
+    """Multiple IDs are resolved in as few (rate-limited) requests as possible.
+
+    Unknown IDs and IDs for which arXiv reports an error are mapped to an
+    ``IOError`` instead of a BibTeX entry.
+    """
+    records = {
+        "2205.15044": fake_record(
+            authors=["Michael H. Goerz"], title="Paper A", year=2022
+        ),
+        "2104.07687": fake_record(
+            authors=["Matthias M. Müller"], title="Paper B", year=2021
+        ),
+        "9999.9999x": "incorrect id format for 9999.9999x",
+    }
+    calls = []
+
+    def fake_arxiv_request(ids):
+        calls.append(list(ids))
+        if "9999.9999x" in ids:  # arXiv aborts the query with an error
+            return atom_feed({"9999.9999x": records["9999.9999x"]})
+        bare_ids = [i.split("v")[0] for i in ids]
+        return atom_feed({i: records[i] for i in bare_ids if i in records})
+
+    monkeypatch.setattr(arxiv_backend, "_arxiv_request", fake_arxiv_request)
+    monkeypatch.setattr(arxiv_backend, "ARXIV_BATCH_SIZE", 2)
+
+    ids = ["2205.15044", "0000.00000", "2104.07687v1", "9999.9999x"]
+    entries = arxiv_backend.get_bibtex_from_arxiv_ids(ids + ["2205.15044"])
+
+    # Duplicates are only requested once, and the query is repeated without
+    # an ID rejected by arXiv
+    assert calls == [
+        ["2205.15044", "0000.00000"],
+        ["2104.07687v1", "9999.9999x"],
+        ["2104.07687v1"],
+    ]
+    assert list(entries) == ids
+    assert entries["2205.15044"].startswith("@article{Goerz2205.15044,")
+    assert entries["2104.07687v1"].startswith("@article{Mueller2104.07687v1,")
+    assert isinstance(entries["0000.00000"], IOError)
+    assert "incorrect id format" in str(entries["9999.9999x"])
+
+
+def test_get_bibtex_from_arxiv_ids_errors(monkeypatch):
+    """Any error for a single ID is returned instead of raised."""
+
+    class FakeCache:
+        def get(self, key):
+            if key.endswith('2205.00002'):
+                raise ValueError("corrupted record")
+            if key.endswith('2205.00001'):
+                return {'authors': None, 'title': "Malformed", 'year': 2022}
+            return {'authors': ["Michael H. Goerz"], 'title': "A", 'year': 1}
+
+    monkeypatch.setattr(arxiv_backend, "get_cache", FakeCache)
+    ids = ["2205.00001", "2205.00002", "2205.15044"]
+    entries = arxiv_backend.get_bibtex_from_arxiv_ids(ids)
+    assert isinstance(entries["2205.00001"], TypeError)
+    assert isinstance(entries["2205.00002"], ValueError)
+    assert entries["2205.15044"].startswith("@article{Goerz2205.15044,")
+    with pytest.raises(ValueError):
+        arxiv_backend.fetch_arxiv_record("2205.00002")
+
+
+def test_parse_arxiv_feed():
+    """Records are yielded for the versioned and the bare ID."""
+    feed = atom_feed(
+        {
+            "cond-mat/0411174": fake_record(
+                authors=["Jane  Doe", "John Smith"],
+                title="A study of\n  something",
+                year=2004,
+            ),
+        }
+    )
+    record = {
+        'authors': ["Jane Doe", "John Smith"],
+        'title': "A study of something",
+        'year': '2004',
+    }
+    assert list(arxiv_backend.parse_arxiv_feed(feed)) == [
+        ("cond-mat/0411174v1", record),
+        ("cond-mat/0411174", record),
+    ]
+    with pytest.raises(IOError, match="invalid XML"):
+        list(arxiv_backend.parse_arxiv_feed(b"<feed>"))
+
+
+def test_parse_arxiv_feed_discards_entries(monkeypatch):
+    """Parsed entries are removed from the tree."""
+    feed = atom_feed(
+        {
+            "2205.%05d" % i: fake_record(["Jane Doe"], "Title %d" % i, 2022)
+            for i in range(5)
+        }
+    )
+    parsers = []
+    iterparse = arxiv_backend.ElementTree.iterparse
+
+    def recording_iterparse(*args, **kwargs):
+        parsers.append(iterparse(*args, **kwargs))
+        return parsers[-1]
+
+    monkeypatch.setattr(
+        arxiv_backend.ElementTree, "iterparse", recording_iterparse
+    )
+    assert len(list(arxiv_backend.parse_arxiv_feed(feed))) == 10
+    root = parsers[0].root
+    assert root.tag == arxiv_backend._ATOM + 'feed'
+    assert root.findall(arxiv_backend._ATOM + 'entry') == []
+
+
+def test_request_delay(monkeypatch):
+    """All HTTP requests are at least ``ARXIV_REQUEST_DELAY`` apart.
+
+    This includes the retry of a request that failed with a 503 error.
+    """
+    clock = [1000.0]
+    sent = []
+    statuses = iter([200, 503, 200])
+
+    def fake_sleep(seconds):
+        clock[0] += seconds
+
+    def fake_send(method, url, headers):
+        sent.append(clock[0])
+        clock[0] += 0.5  # time to answer the request
+        res = types.SimpleNamespace(
+            status=next(statuses),
+            headers=None,
+            getheader=lambda name, default=None: default,
+        )
+        return res, b""
+
+    session = Session(backoff=0.0)
+    session._sleep = fake_sleep
+    monkeypatch.setattr(session, "_send", fake_send)
+    monkeypatch.setattr(arxiv_backend, "get_session", lambda: session)
+    limiter = RateLimiter(
+        1 / arxiv_backend.ARXIV_REQUEST_DELAY,
+        burst=1,
+        clock=lambda: clock[0],
+        sleep=fake_sleep,
+    )
+    monkeypatch.setattr(arxiv_backend, "_RATE_LIMITER", limiter)
+    arxiv_backend._arxiv_request(["2205.15044"])
+    clock[0] += 1.0
+    arxiv_backend._arxiv_request(["2104.07687", "2205.15044"])
+    assert len(sent) == 3
+    for previous, t in zip(sent, sent[1:]):
+        assert t - previous >= arxiv_backend.ARXIV_REQUEST_DELAY - 1e-9
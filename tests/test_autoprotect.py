@@ -1,6 +1,16 @@
 """Test auto-protection of titles"""
 
-from getbibtex.bibtex import detect_title_case, protect_strings
+import re
+
+from getbibtex.bibtex import (
+    PROTECTED_WORDS,
+    ProtectedWords,
+    detect_title_case,
+    get_protected_words,
+    load_protected_words,
+    protect_strings,
+    set_protected_words,
+)
 
 
 def test_protect_strings():
@@ -21,3 +31,56 @@ def test_protect_strings():
     assert protect_strings(title) == title_
     assert protect_strings(title, auto_protect=True) == title_
     assert protect_strings(title, auto_protect=False) == title_
+
+
+def _protect_reference(s, words):
+    """Reference implementation: one regex substitution per word."""
+    for word in words:
+        rx = re.compile(r'(?<!^)(?<!\{)\b' + re.escape(word) + r'\b(?!\})')
+        s = rx.sub('{' + word + '}', s)
+    return s
+
+
+def test_protected_words_matches_reference():
+    """Test that the single-pass matcher agrees with per-word regexes."""
+    words = PROTECTED_WORDS + ["Word%d" % i for i in range(2000)]
+    words += ["Hilbert", "Bose-Einstein", "Pöschl"]
+    protected_words = ProtectedWords(words)
+    assert len(protected_words) == len(words)
+    assert "Word1999" in protected_words
+    assert "Word2000" not in protected_words
+    titles = [
+        "Atomic Schrödinger cat states",
+        "Schrödinger cat states",
+        "Dirac-Bose Einstein condensates in Hilbert spaces",
+        "A {Rydberg} atom and a Rydberg_atom",
+        "Word1 Word12 Word123 Word2000 xWord5 Word7}",
+        "Bose-Einstein condensate in a Pöschl–Teller potential",
+        "Krotov's method for NMR and GRAPE, CRAB",
+        "",
+    ]
+    for title in titles:
+        assert protected_words.protect(title) == _protect_reference(
+            title, words
+        )
+
+
+def test_custom_protected_words(tmp_path):
+    """Test loading protected words from file and activating them."""
+    filename = tmp_path / "words.txt"
+    filename.write_text("# proper nouns\nLindblad\n\n  Hilbert \n")
+    words = load_protected_words(filename)
+    assert words == ["Lindblad", "Hilbert"]
+    title = "Lindblad master equations in Hilbert space"
+    assert protect_strings(title, auto_protect=False) == title
+    previous = set_protected_words(ProtectedWords(PROTECTED_WORDS + words))
+    try:
+        assert protect_strings(title, auto_protect=False) == (
+            "Lindblad master equations in {Hilbert} space"
+        )
+        assert protect_strings("Atomic Schrödinger cat states") == (
+            "Atomic {Schrödinger} cat states"
+        )
+    finally:
+        set_protected_words(previous)
+    assert get_protected_words() is previous
@@ -0,0 +1,329 @@
+"""Tests for resolving many queries in a single run (batch mode)."""
+
+import pytest
+from click.testing import CliRunner
+
+from getbibtex import batch, main
+from getbibtex.backends import arxiv as arxiv_backend
+from getbibtex.backends import crossref as crossref_backend
+from getbibtex.batch import read_queries, resolve_batch, write_batch
+from getbibtex.query import classify_query
+
+
+def fake_resolve_query(query, **kwargs):
+    """Stand-in for ``resolve_query`` that fails for queries with 'bad'."""
+    kind, identifier = classify_query(query)
+    if 'bad' in query:
+        raise IOError("no result for %s" % query)
+    return "@article{%s,\n    Id = {%s},\n}" % (kind, identifier)
+
+
+FAKE_BULK_CALLS = []
+
+
+def _fake_bulk(ids, prefix):
+    FAKE_BULK_CALLS.append(list(ids))
+    entries = {}
+    for identifier in ids:
+        try:
+            entries[identifier] = fake_resolve_query(prefix + identifier)
+        except IOError as exc_info:
+            entries[identifier] = exc_info
+    return entries
+
+
+def fake_get_bibtex_from_arxiv_ids(arxiv_ids, **kwargs):
+    """Stand-in for ``get_bibtex_from_arxiv_ids``."""
+    assert 'use_journal_macros' not in kwargs
+    return _fake_bulk(arxiv_ids, prefix="arXiv:")
+
+
+def fake_get_bibtex_from_dois(dois, **kwargs):
+    """Stand-in for ``get_bibtex_from_dois``."""
+    return _fake_bulk(dois, prefix="")
+
+
+@pytest.fixture
+def patch_resolve(monkeypatch):
+    monkeypatch.setattr(batch, "resolve_query", fake_resolve_query)
+    monkeypatch.setattr(
+        arxiv_backend,
+        "get_bibtex_from_arxiv_ids",
+        fake_get_bibtex_from_arxiv_ids,
+    )
+    monkeypatch.setattr(
+        crossref_backend, "get_bibtex_from_dois", fake_get_bibtex_from_dois
+    )
+    FAKE_BULK_CALLS.clear()
+
+
+def test_classify_query():
+    assert classify_query('10.1103/PhysRevA.89.032334') == (
+        'doi',
+        '10.1103/PhysRevA.89.032334',
+    )
+    assert classify_query('arXiv:cond-mat/0411174v1') == (
+        'arxiv',
+        'cond-mat/0411174v1',
+    )
+    # An arXiv DOI is resolved through the arXiv backend
+    assert classify_query('https://doi.org/10.48550/arXiv.2205.15044') == (
+        'arxiv',
+        '2205.15044',
+    )
+    assert classify_query('no-identifier-here') == (
+        'query',
+        'no-identifier-here',
+    )
+
+
+def test_read_queries(tmp_path):
+    infile = tmp_path / "ids.txt"
+    infile.write_text(
+        "# reading list\n10.1000/a\n\n  2205.15044 arxiv  \n10.1000/b\n"
+    )
+    assert list(read_queries([str(infile)])) == [
+        (f"{infile}:2", "10.1000/a"),
+        (f"{infile}:4", "2205.15044 arxiv"),
+        (f"{infile}:5", "10.1000/b"),
+    ]
+
+
+def test_resolve_batch_keeps_going(patch_resolve, capsys):
+    """A failing query is reported, but does not abort the batch."""
+    queries = [("f:1", "10.1000/a"), ("f:2", "10.1000/bad"), ("f:3", "x y")]
+    results = list(resolve_batch(queries))
+    assert [r[0] for r in results] == ["f:1", "f:2", "f:3"]
+    assert results[1][2] is None
+    assert isinstance(results[1][3], IOError)
+
+    class Out:
+        def __init__(self):
+            self.chunks = []
+
+        def write(self, s):
+            self.chunks.append(s)
+
+        def flush(self):
+            self.chunks.append("<flush>")
+
+    out = Out()
+    n_failed = write_batch(results, out)
+    assert n_failed == 1
+    # Each entry is flushed as soon as it is written
+    assert out.chunks.count("<flush>") == 2
+    err = capsys.readouterr().err
+    assert "ERROR: f:2: 10.1000/bad: no result for 10.1000/bad" in err
+
+
+def test_resolve_batch_bulk_error(patch_resolve, monkeypatch):
+    """An error in a bulk lookup fails only the queries of that kind."""
+
+    def get_bibtex_from_dois(dois, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(
+        crossref_backend, "get_bibtex_from_dois", get_bibtex_from_dois
+    )
+    queries = [
+        ("f:1", "10.1000/a"),
+        ("f:2", "arXiv:2205.15044"),
+        ("f:3", "x y"),
+        ("f:4", "10.1000/b"),
+    ]
+    results = list(resolve_batch(queries, workers=2))
+    assert [r[0] for r in results] == ["f:1", "f:2", "f:3", "f:4"]
+    assert [r[2] is None for r in results] == [True, False, False, True]
+    assert str(results[0][3]) == "database is locked"
+    assert results[3][3] is results[0][3]
+
+
+@pytest.mark.parametrize(
+    "n_dois, n_queries, workers, bulk_workers",
+    [(10, 0, 8, 8), (10, 2, 8, 6), (10, 20, 4, 1), (10, 0, 1, 1)],
+)
+def test_resolve_batch_workers(
+    patch_resolve, monkeypatch, n_dois, n_queries, workers, bulk_workers
+):
+    """The bulk lookup of DOIs and other lookups share the `workers`."""
+    calls = []
+
+    def get_bibtex_from_dois(dois, workers=1, **kwargs):
+        calls.append(workers)
+        return fake_get_bibtex_from_dois(dois, **kwargs)
+
+    monkeypatch.setattr(
+        crossref_backend, "get_bibtex_from_dois", get_bibtex_from_dois
+    )
+    queries = [("d:%d" % i, "10.1000/%d" % i) for i in range(n_dois)]
+    queries += [("q:%d" % i, "free form %d" % i) for i in range(n_queries)]
+    results = list(resolve_batch(queries, workers=workers))
+    assert len(results) == n_dois + n_queries
+    assert calls == [bulk_workers]
+
+
+def test_main_batch(patch_resolve, tmp_path):
+    """``--batch`` reads queries from a file and writes a .bib file."""
+    infile = tmp_path / "ids.txt"
+    infile.write_text("10.1000/a\n10.1000/bad\narXiv:2205.15044\n")
+    outfile = tmp_path / "refs.bib"
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['--batch', str(infile), '--output', str(outfile)]
+    )
+    assert result.exit_code == 1  # for 10.1000/bad
+    assert outfile.read_text() == (
+        "@article{doi,\n    Id = {10.1000/a},\n}\n"
+        "\n"
+        "@article{arxiv,\n    Id = {2205.15044},\n}\n"
+    )
+
+
+def test_resolve_batch_bulk(patch_resolve):
+    """arXiv IDs and DOIs are resolved in bulk, per chunk, in input order."""
+    queries = [
+        ("f:1", "arXiv:2205.15044"),
+        ("f:2", "10.1000/a"),
+        ("f:3", "arXiv:2104.07687"),
+        ("f:4", "some free-form query"),
+        ("f:5", "arXiv:cond-mat/0411174"),
+        ("f:6", "https://doi.org/10.1000/b"),
+    ]
+    results = list(resolve_batch(queries, chunk_size=4))
+    assert [r[0] for r in results] == [
+        "f:1",
+        "f:2",
+        "f:3",
+        "f:4",
+        "f:5",
+        "f:6",
+    ]
+    assert [r[2].split(",")[0] for r in results] == [
+        "@article{arxiv",
+        "@article{doi",
+        "@article{arxiv",
+        "@article{query",
+        "@article{arxiv",
+        "@article{doi",
+    ]
+    assert FAKE_BULK_CALLS == [
+        ["2205.15044", "2104.07687"],
+        ["10.1000/a"],
+        ["cond-mat/0411174"],
+        ["10.1000/b"],
+    ]
+
+
+def test_resolve_batch_concurrent(patch_resolve):
+    queries = [("f:%d" % i, "10.1000/%d" % i) for i in range(50)]
+    queries += [("g:%d" % i, "free form %d" % i) for i in range(50)]
+    serial = list(resolve_batch(queries, chunk_size=30))
+    concurrent = list(resolve_batch(queries, chunk_size=30, workers=8))
+    assert [r[0] for r in concurrent] == [q[0] for q in queries]
+    assert concurrent == serial
+
+
+def test_main_batch_stdin(patch_resolve):
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['--batch', '-', '--jobs', '2'], input="10.1000/a\n"
+    )
+    assert result.output == "@article{doi,\n    Id = {10.1000/a},\n}\n"
+    assert result.exit_code == 0
+
+
+def test_main_batch_failed(patch_resolve, tmp_path, monkeypatch):
+    """A batch with failed queries writes all other entries, and fails."""
+    monkeypatch.setattr("getbibtex.query.resolve_query", fake_resolve_query)
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['--batch', '-'], input="10.1000/a\n10.1000/bad\n"
+    )
+    assert result.stdout == "@article{doi,\n    Id = {10.1000/a},\n}\n"
+    assert "ERROR: 1 queries failed" in result.stderr
+    assert result.exit_code == 1
+    bibfile = tmp_path / "refs.bib"
+    result = runner.invoke(
+        main,
+        ['--batch', '-', '--update', str(bibfile)],
+        input="10.1000/bad\n",
+    )
+    assert result.exit_code == 1
+    result = runner.invoke(main, ['free form bad'])
+    assert "ERROR: no result for free form bad" in result.stderr
+    assert result.exit_code == 1
+
+
+def test_main_batch_with_args(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(main, ['--batch', '-', '10.1000/a'])
+    assert result.exit_code == 2
+    assert "Cannot combine ARGS with --batch" in result.output
+    # A usage error does not create the record cache
+    assert not (tmp_path / "cache").exists()
+
+
+def test_main_default_command(monkeypatch, tmp_path):
+    """Queries starting with a command name need `lookup` or ``--``."""
+    monkeypatch.setattr("getbibtex.query.resolve_query", fake_resolve_query)
+    runner = CliRunner()
+    for args in [
+        ['--', 'cache', 'effects', 'in', 'superconducting', 'qubits'],
+        ['lookup', 'cache', 'stats'],
+        ['cache effects in superconducting qubits'],
+    ]:
+        result = runner.invoke(main, args)
+        assert result.exit_code == 0, args
+        assert result.stdout.startswith("@article{query,")
+    result = runner.invoke(
+        main, ['cache', '--cache-dir', str(tmp_path), 'stats']
+    )
+    assert result.exit_code == 0
+    assert "Entries:  0" in result.stdout
+    # Typos and misplaced options are usage errors, not queries
+    result = runner.invoke(main, ['cache', 'stat'])
+    assert result.exit_code == 2
+    assert "No such command 'stat'" in result.stderr
+    result = runner.invoke(
+        main, ['cache', 'stats', '--cache-dir', str(tmp_path)]
+    )
+    assert result.exit_code == 2
+    assert "No such option '--cache-dir'" in result.stderr
+
+
+def test_main_update(patch_resolve, tmp_path):
+    """``--update`` appends entries only for identifiers not in the file."""
+    bibfile = tmp_path / "refs.bib"
+    bibfile.write_text("@article{doi,\n    Doi = {10.1000/A},\n}\n")
+    infile = tmp_path / "ids.txt"
+    infile.write_text(
+        "https://doi.org/10.1000/a\n10.1000/b\narXiv:2205.15044v2\n"
+        "10.1000/B\n10.1000/c\n"
+    )
+    runner = CliRunner()
+    result = runner.invoke(main, ['--batch', str(infile), '-u', str(bibfile)])
+    assert result.exception is None
+    assert bibfile.read_text() == (
+        "@article{doi,\n    Doi = {10.1000/A},\n}\n"
+        "\n"
+        "@article{doia,\n    Id = {10.1000/b},\n}\n"
+        "\n"
+        "@article{arxiv,\n    Id = {2205.15044v2},\n}\n"
+        "\n"
+        "@article{doib,\n    Id = {10.1000/c},\n}\n"
+    )
+    assert "Skipped 2 queries" in result.stderr
+    assert FAKE_BULK_CALLS == [
+        ['2205.15044v2'],
+        ['10.1000/b', '10.1000/c'],
+    ]
+    # Running again with a single query that is already known does nothing
+    result = runner.invoke(main, ['10.1000/a', '--update', str(bibfile)])
+    assert result.exception is None
+    assert bibfile.read_text().count("@article") == 4
+    result = runner.invoke(
+        main, ['10.1000/d', '--update', str(tmp_path / "new.bib")]
+    )
+    assert (tmp_path / "new.bib").read_text() == (
+        "@article{doi,\n    Id = {10.1000/d},\n}\n"
+    )
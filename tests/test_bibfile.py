@@ -0,0 +1,125 @@
+"""Tests for indexing existing BibTeX files."""
+
+import io
+
+from getbibtex.bibfile import (
+    BibIndex,
+    CitekeyRegistry,
+    filter_new_queries,
+    scan_bibfile,
+)
+
+BIBFILE = """\
+@string{pra = {Phys. Rev. A}}
+
+@article{GoerzSPP2019,
+    Author = {Goerz, Michael H. and Basilewitsch, Daniel},
+    Title = {Krotov: A {Python} implementation of {Krotov's} method for
+             quantum optimal control},
+    Journal = {SciPost Phys.},
+    Doi = {10.21468/SciPostPhys.7.6.080},
+}
+
+@article{GoerzarXiv2205.15044,
+    Journal = {arXiv:2205.15044},
+    Url = {https://doi.org/10.48550/arXiv.2205.15044},
+}
+
+@comment{@article{Ignored, doi = {10.1000/ignored}}}
+
+@misc{Old,
+  eprint = "quant-ph/0101001v2",
+  archivePrefix = {arXiv},
+}
+"""
+
+
+def test_scan_bibfile():
+    entries = list(scan_bibfile(io.StringIO(BIBFILE)))
+    assert [citekey for citekey, _ in entries] == [
+        'GoerzSPP2019',
+        'GoerzarXiv2205.15044',
+        'Old',
+    ]
+    assert entries[0][1] == {
+        'journal': 'SciPost Phys.',
+        'doi': '10.21468/SciPostPhys.7.6.080',
+    }
+    assert entries[2][1] == {'eprint': 'quant-ph/0101001v2'}
+
+
+def test_bib_index(tmp_path):
+    bibfile = tmp_path / "refs.bib"
+    bibfile.write_text(BIBFILE)
+    bib_index = BibIndex(str(bibfile))
+    assert len(bib_index) == 3
+    assert bib_index.dois == {'10.21468/scipostphys.7.6.080'}
+    assert bib_index.arxiv_ids == {'2205.15044', 'quant-ph/0101001'}
+    assert bib_index.contains_query('10.21468/scipostphys.7.6.080')
+    assert bib_index.contains_query('https://arxiv.org/abs/2205.15044v1')
+    assert bib_index.contains_query('quant-ph/0101001')
+    assert not bib_index.contains_query('10.1000/ignored')
+    assert not bib_index.contains_query('Goerz Krotov')
+    bib_index.add_entry("@article{New,\n    Doi = {10.1000/new},\n}\n")
+    assert 'New' in bib_index.citekeys
+    assert bib_index.contains_query('10.1000/NEW')
+    assert len(BibIndex(str(tmp_path / "missing.bib"))) == 0
+
+
+def test_filter_new_queries():
+    bib_index = BibIndex()
+    bib_index.add_query('10.1000/a')
+    queries = [
+        ('f:1', '10.1000/A'),
+        ('f:2', '10.1000/b'),
+        ('f:3', 'doi:10.1000/b'),
+        ('f:4', 'Goerz Krotov'),
+        ('f:5', 'Goerz Krotov'),
+    ]
+    skipped = []
+    new = list(filter_new_queries(queries, bib_index, skipped=skipped))
+    assert new == [
+        ('f:2', '10.1000/b'),
+        ('f:4', 'Goerz Krotov'),
+        ('f:5', 'Goerz Krotov'),
+    ]
+    assert skipped == [('f:1', '10.1000/A'), ('f:3', 'doi:10.1000/b')]
+
+
+def test_citekey_registry():
+    citekeys = CitekeyRegistry(['GoerzPRA2019', 'GoerzPRA2019b'])
+    assert citekeys.register('GoerzPRA2019') == 'GoerzPRA2019a'
+    assert citekeys.register('GoerzPRA2019') == 'GoerzPRA2019c'
+    assert citekeys.register('GoerzPRA2019') == 'GoerzPRA2019d'
+    assert citekeys.register('GoerzPRA2020') == 'GoerzPRA2020'
+    assert citekeys.register('GoerzPRA2019a') == 'GoerzPRA2019aa'
+    assert 'GoerzPRA2019d' in citekeys
+    assert len(citekeys) == 7
+    for _ in range(30):
+        key = citekeys.register('KochNJP2016')
+    assert key == 'KochNJP2016ac'
+    entry = "@article{GoerzPRA2019,\n    Doi = {10.1000/a},\n}"
+    assert citekeys.register_entry(entry) == (
+        "@article{GoerzPRA2019e,\n    Doi = {10.1000/a},\n}"
+    )
+    entry = "@article{GoerzPRA2021,\n    Doi = {10.1000/a},\n}"
+    assert citekeys.register_entry(entry) == entry
+
+
+def test_scan_bibfile_one_line():
+    bibfile = (
+        "@misc{OneLine, doi = {10.1000/One}, title = {A doi = {x} title}}\n"
+        "@article{TwoFields,\n"
+        '  title = "Some title", eprint = {2205.15044},\n'
+        "  journal = pra, url =\n"
+        "    {https://example.com},\n"
+        "}\n"
+    )
+    assert list(scan_bibfile(io.StringIO(bibfile))) == [
+        ('OneLine', {'doi': '10.1000/One'}),
+        ('TwoFields', {'eprint': '2205.15044', 'journal': 'pra'}),
+    ]
+    bib_index = BibIndex()
+    bib_index.add_entry(bibfile)
+    assert bib_index.contains_query('10.1000/one')
+    assert bib_index.contains_query('arXiv:2205.15044')
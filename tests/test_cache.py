@@ -0,0 +1,214 @@
+"""Tests for the persistent record cache."""
+
+import sqlite3
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from getbibtex import main
+from getbibtex.backends import arxiv as arxiv_backend
+from getbibtex.backends import crossref as crossref_backend
+from getbibtex.cache import RecordCache, doi_key, get_cache, set_cache
+
+
+@pytest.fixture
+def record_cache(tmp_path):
+    """Activate a fresh :class:`RecordCache` for the duration of a test."""
+    cache = RecordCache(str(tmp_path / "records.sqlite"))
+    previous = set_cache(cache)
+    yield cache
+    set_cache(previous)
+    cache.close()
+
+
+def test_get_set(tmp_path):
+    cache = RecordCache(str(tmp_path / "sub" / "records.sqlite"))
+    assert cache.get('doi:10.1000/a') is None
+    cache.set('doi:10.1000/a', {'title': ['Ünïcode'], 'volume': '1'})
+    assert cache.get('doi:10.1000/a') == {'title': ['Ünïcode'], 'volume': '1'}
+    stats = cache.stats()
+    assert stats['entries'] == 1
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] > 0
+    cache.close()
+    # The records and statistics persist across sessions
+    cache = RecordCache(str(tmp_path / "sub" / "records.sqlite"))
+    assert cache.stats() == stats
+    cache.clear()
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['hits'] == 0
+    cache.close()
+
+
+def test_database_errors(tmp_path, capsys):
+    """Failures of the database are treated as misses, with a warning."""
+    cache = RecordCache(str(tmp_path / "records.sqlite"))
+    cache.set('a', 1)
+    db = cache._db
+
+    class LockedDatabase:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def execute(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+    cache._db = LockedDatabase()
+    size = cache._size
+    assert cache.get('a') is None
+    cache.set('b', 2)
+    assert cache._size == size
+    err = capsys.readouterr().err
+    assert err.count("WARNING: Cache %s: database is locked" % cache.path) == 2
+    cache._db = db
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    cache.close()
+
+
+def test_ttl(tmp_path, monkeypatch):
+    cache = RecordCache(str(tmp_path / "records.sqlite"), ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    now = time.time()
+    monkeypatch.setattr('getbibtex.cache.time.time', lambda: now + 120)
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 1
+    assert cache.prune() == 1
+    assert cache.stats()['entries'] == 0
+    cache.close()
+
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr('getbibtex.cache.time.time', lambda: next(clock))
+    record = "x" * 98  # 100 bytes, as JSON
+    cache = RecordCache(str(tmp_path / "records.sqlite"), max_size=350)
+    cache.set('a', record)
+    cache.set('b', record)
+    cache.set('c', record)
+    assert cache.get('a') == record  # 'b' is now the least recently used
+    cache.set('d', record)
+    assert cache.get('b') is None
+    assert cache.get('a') == record
+    assert cache.get('c') == record
+    assert cache.get('d') == record
+    assert cache.stats()['size'] == 300
+    cache.close()
+
+
+def test_crossref_uses_cache(record_cache, monkeypatch):
+    calls = []
+
+    class FakeCrossref:
+        def works(self, **kwargs):
+            calls.append(kwargs)
+            return {
+                'status': 'ok',
+                'message': {
+                    'author': [{'family': 'GOERZ', 'given': 'MICHAEL'}],
+                    'title': ['ROBUST CONTROL'],
+                    'DOI': '10.1000/ABC',
+                    'type': 'journal-article',
+                    'container-title': ['Phys. Rev. Lett.'],
+                },
+            }
+
+    monkeypatch.setattr(crossref_backend, "Crossref", FakeCrossref)
+    first = crossref_backend.get_bibtex_from_doi('10.1000/ABC')
+    # A second lookup with different formatting options is rendered from the
+    # cache, and the DOI is case-insensitive
+    second = crossref_backend.get_bibtex_from_doi(
+        '10.1000/abc', fix_uppercase=True
+    )
+    assert len(calls) == 1
+    assert "Title = {ROBUST CONTROL}" in first
+    assert "Title = {Robust control}" in second
+    assert record_cache.get(doi_key('10.1000/Abc'))['DOI'] == '10.1000/ABC'
+
+
+def test_crossref_query_populates_doi_cache(record_cache, monkeypatch):
+    calls = []
+    record = {'DOI': '10.1000/xyz', 'type': 'journal-article'}
+
+    class FakeCrossref:
+        def works(self, **kwargs):
+            calls.append(kwargs)
+            return {'status': 'ok', 'message': {'items': [record]}}
+
+    monkeypatch.setattr(crossref_backend, "Crossref", FakeCrossref)
+    crossref_backend.get_bibtex_from_query('some  Query')
+    crossref_backend.get_bibtex_from_query('some query')
+    crossref_backend.get_bibtex_from_doi('10.1000/xyz')
+    assert len(calls) == 1
+
+
+def test_crossref_cache_strips_unused_fields(record_cache, monkeypatch):
+    record = {
+        'DOI': '10.1000/abc',
+        'type': 'journal-article',
+        'title': ['Robust control'],
+        'reference': [{'key': 'ref%d' % i} for i in range(100)],
+        'funder': [{'name': 'Agency'}],
+    }
+
+    class FakeCrossref:
+        def works(self, **kwargs):
+            return {'status': 'ok', 'message': record}
+
+    monkeypatch.setattr(crossref_backend, "Crossref", FakeCrossref)
+    crossref_backend.fetch_doi_record('10.1000/abc')
+    assert record_cache.get(doi_key('10.1000/abc')) == {
+        'DOI': '10.1000/abc',
+        'type': 'journal-article',
+        'title': ['Robust control'],
+    }
+
+
+def test_arxiv_uses_cache(record_cache, monkeypatch):
+    calls = []
+
+    def fake_arxiv_request(ids):
+        calls.append(ids)
+        return (
+            b'<feed xmlns="http://www.w3.org/2005/Atom"><entry>'
+            b'<id>http://arxiv.org/abs/2205.15044v1</id>'
+            b'<published>2022-05-30T17:59:59Z</published>'
+            b'<title>Some title</title>'
+            b'<author><name>Michael H. Goerz</name></author>'
+            b'</entry></feed>'
+        )
+
+    monkeypatch.setattr(arxiv_backend, "_arxiv_request", fake_arxiv_request)
+    first = arxiv_backend.get_bibtex_from_arxiv_id('2205.15044')
+    second = arxiv_backend.get_bibtex_from_arxiv_id('2205.15044')
+    assert first == second
+    assert calls == [['2205.15044']]
+
+
+def test_cli_cache_commands(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = RecordCache(str(cache_dir / "records.sqlite"))
+    cache.set('doi:10.1000/a', {'title': ['A']})
+    cache.get('doi:10.1000/a')
+    cache.close()
+
+    runner = CliRunner()
+    args = ['cache', '--cache-dir', str(cache_dir)]
+    result = runner.invoke(main, args + ['stats'])
+    assert result.exit_code == 0
+    assert "Entries:  1" in result.output
+    assert "Hits:     1" in result.output
+    result = runner.invoke(main, args + ['prune'])
+    assert "Removed 0 records" in result.output
+    result = runner.invoke(main, args + ['clear'])
+    assert "Cache cleared" in result.output
+    result = runner.invoke(main, args + ['stats'])
+    assert "Entries:  0" in result.output
+    # The CLI does not leave a cache active after it is done
+    assert get_cache() is None
@@ -3,18 +3,22 @@
 Most of the backend is pure logic that turns a Crossref ``message`` record into
 a BibTeX entry; those functions are tested directly. The thin wrappers
 ``get_bibtex_from_doi`` and ``get_bibtex_from_query`` are the only parts that
-hit the network (through ``habanero.Crossref``), and they are tested by
-stubbing out the ``Crossref`` client.
+hit the network (through the ``Crossref`` client), and they are tested by
+stubbing out the ``Crossref`` client. The client itself is tested against a
+local HTTP server.
 """
 
-import types
-
 import pytest
+from click.testing import CliRunner
 
+from getbibtex import main
 from getbibtex.backends import crossref as crossref_backend
 from getbibtex.backends.crossref import (
+    CROSSREF_FIELDS,
+    decode_record,
     get_bibtex,
     get_bibtex_from_doi,
+    get_bibtex_from_dois,
     get_bibtex_from_query,
     get_container_title,
     get_event_location,
@@ -22,7 +26,8 @@ from getbibtex.backends.crossref import (
     get_names,
     get_page,
 )
-from getbibtex.bibtex import _Raw
+from getbibtex.bibtex import _Raw, get_max_authors, set_max_authors
+from getbibtex.records import Record
 
 
 # --- record builders --------------------------------------------------------
@@ -236,11 +241,65 @@ def test_get_bibtex_missing_author_and_year():
     assert "Year" not in result
 
 
+@pytest.mark.parametrize(
+    "record", [article_record(), proceedings_record(), book_chapter_record()]
+)
+def test_decode_record(record):
+    """``get_bibtex`` renders a decoded record like the raw dict."""
+    decoded = decode_record(record)
+    assert isinstance(decoded, Record)
+    assert not hasattr(decoded, '__dict__')  # compact (slots)
+    assert decoded.doi == record['DOI']
+    assert decoded.first_author == record['author'][0]['family']
+    assert decode_record(decoded) is decoded
+    assert get_bibtex(decoded) == get_bibtex(record)
+
+
+def test_decode_record_fields():
+    record = proceedings_record()
+    record['reference'] = [{'key': 'ref1'}]
+    assert decode_record(record) == Record(
+        type='proceedings-article',
+        doi='10.1000/xyz123',
+        title='Some conference paper',
+        authors=('Goerz, Michael',),
+        first_author='Goerz',
+        editors=('Smith, John',),
+        container_titles=('Proceedings of the Big Conference',),
+        year=2019,
+        page='10-20',
+        location='Berlin, Germany',
+    )
+
+
+def test_max_authors():
+    record = article_record()
+    record['author'] = [
+        {'family': 'Name%d' % i, 'given': 'A.'} for i in range(5000)
+    ]
+    record['author'].append({'name': 'ATLAS Collaboration'})
+    previous = set_max_authors(3)
+    try:
+        assert decode_record(record).authors == (
+            'Name0, A.',
+            'Name1, A.',
+            'Name2, A.',
+            'others',
+        )
+        bibtex = get_bibtex(record, fix_uppercase=True)
+        assert "Name2, A. and others}," in bibtex
+    finally:
+        set_max_authors(previous)
+    assert decode_record(record).authors[-1] == '{ATLAS Collaboration}'
+    record['author'] = [{'family': 'Plato'}]
+    assert decode_record(record).authors == ('Plato',)
+
+
 # --- network wrappers (Crossref client stubbed out) -------------------------
 
 
 class FakeCrossref:
-    """Stand-in for ``habanero.Crossref`` that records ``works`` calls.
+    """Stand-in for the ``Crossref`` client that records ``works`` calls.
 
     ``response`` is either a fixed value returned for every ``works`` call, or
     a callable invoked with the call keyword arguments (so a test can return
@@ -263,6 +322,10 @@ class FakeCrossref:
             return self._response(**kwargs)
         return self._response
 
+    def content_negotiation(self, doi):
+        self.calls.append({'content_negotiation': doi})
+        return "RAW BIBTEX FOR %s" % doi
+
 
 @pytest.fixture
 def patch_crossref(monkeypatch):
@@ -316,19 +379,15 @@ def test_get_bibtex_from_doi_debug_record(patch_crossref, capsys):
     assert 'ref1' not in err
 
 
-def test_get_bibtex_from_doi_content_negotiation(patch_crossref, monkeypatch):
-    """Unsupported types fall back to habanero content negotiation."""
+def test_get_bibtex_from_doi_content_negotiation(patch_crossref):
+    """Unsupported types fall back to content negotiation."""
     record = article_record()
     record['type'] = 'dataset'
-    patch_crossref({'status': 'ok', 'message': record})
-
-    fake_cn = types.SimpleNamespace(
-        content_negotiation=lambda ids: "RAW BIBTEX FOR %s" % ids
-    )
-    monkeypatch.setattr(crossref_backend.habanero, "cn", fake_cn)
+    fake = patch_crossref({'status': 'ok', 'message': record})
 
     result = get_bibtex_from_doi('10.1000/dataset')
     assert result == "RAW BIBTEX FOR 10.1000/dataset"
+    assert fake.calls[-1] == {'content_negotiation': '10.1000/dataset'}
 
 
 def test_get_bibtex_from_query(patch_crossref):
@@ -340,7 +399,11 @@ def test_get_bibtex_from_query(patch_crossref):
 
     assert result == get_bibtex(article_record())
     assert fake.calls == [
-        {'query_bibliographic': 'robust optimal control qubit', 'limit': 1}
+        {
+            'query_bibliographic': 'robust optimal control qubit',
+            'limit': 1,
+            'select': CROSSREF_FIELDS,
+        }
     ]
 
 
@@ -367,28 +430,145 @@ def test_get_bibtex_from_query_unsupported_without_doi(patch_crossref):
 
 
 def test_get_bibtex_from_query_unsupported_with_doi(patch_crossref):
-    """An unsupported query hit with a DOI falls back to a DOI lookup.
+    """An unsupported query hit with a DOI falls back to content negotiation.
 
-    The query returns an unsupported record that nonetheless carries a DOI;
-    the backend then re-queries Crossref by that DOI, which here resolves to a
-    supported article.
+    The record found by the search is not fetched again by its DOI: the
+    fallback goes straight to content negotiation, so there are only two
+    calls in total.
     """
     unsupported = article_record()
     unsupported['type'] = 'dataset'
+    fake = patch_crossref(
+        {'status': 'ok', 'message': {'items': [unsupported]}}
+    )
+
+    result = get_bibtex_from_query('robust optimal control')
+
+    assert result == "RAW BIBTEX FOR 10.1103/PhysRevLett.128.230502"
+    assert fake.calls == [
+        {
+            'query_bibliographic': 'robust optimal control',
+            'limit': 1,
+            'select': CROSSREF_FIELDS,
+        },
+        {'content_negotiation': '10.1103/PhysRevLett.128.230502'},
+    ]
+
+
+def test_get_bibtex_from_dois(patch_crossref, monkeypatch):
+    """Multiple DOIs are resolved with filtered queries.
+
+    DOIs missing from the filtered response fall back to individual lookups.
+    """
+    record_a = article_record()
+    record_b = proceedings_record()
+    monkeypatch.setattr(crossref_backend, "CROSSREF_BATCH_SIZE", 2)
 
     def respond(**kwargs):
-        if 'query_bibliographic' in kwargs:
-            return {'status': 'ok', 'message': {'items': [unsupported]}}
-        # The follow-up ``ids=`` lookup resolves to a supported article.
-        return {'status': 'ok', 'message': article_record()}
+        if 'filter' in kwargs:
+            # Crossref normalizes DOIs to lowercase
+            items = [
+                dict(r, DOI=r['DOI'].lower())
+                for r in (record_a, record_b)
+                if r['DOI'] in kwargs['filter']['doi']
+            ]
+            return {'status': 'ok', 'message': {'items': items}}
+        if kwargs['ids'] == '10.1000/missing':
+            return {'status': 'error'}
+        return {'status': 'ok', 'message': book_chapter_record()}
 
     fake = patch_crossref(respond)
+    dois = [
+        record_a['DOI'],
+        '10.1000/book123',
+        record_b['DOI'],
+        '10.1000/missing',
+    ]
 
-    result = get_bibtex_from_query('robust optimal control')
+    entries = get_bibtex_from_dois(dois + [record_a['DOI']])
 
-    assert result == get_bibtex(article_record())
-    # Two calls: the search, then the DOI lookup it fell back to.
     assert fake.calls == [
-        {'query_bibliographic': 'robust optimal control', 'limit': 1},
-        {'ids': '10.1103/PhysRevLett.128.230502'},
+        {'filter': {'doi': dois[:2]}, 'limit': 2, 'select': CROSSREF_FIELDS},
+        {'filter': {'doi': dois[2:]}, 'limit': 2, 'select': CROSSREF_FIELDS},
+        {'ids': '10.1000/book123'},
+        {'ids': '10.1000/missing'},
     ]
+    assert list(entries) == dois
+    assert entries[dois[0]] == get_bibtex(dict(record_a, DOI=dois[0].lower()))
+    assert entries[dois[1]] == get_bibtex(book_chapter_record())
+    assert entries[dois[2]] == get_bibtex(record_b)
+    assert isinstance(entries[dois[3]], IOError)
+
+
+def test_get_bibtex_from_dois_content_negotiation(patch_crossref):
+    """Unsupported types in a bulk lookup fall back to content negotiation."""
+    record = article_record()
+    record['type'] = 'dataset'
+    patch_crossref({'status': 'ok', 'message': {'items': [record]}})
+
+    entries = get_bibtex_from_dois([record['DOI']])
+    assert entries == {record['DOI']: "RAW BIBTEX FOR %s" % record['DOI']}
+
+
+def test_get_bibtex_from_dois_errors(patch_crossref, monkeypatch):
+    """Any error for a single DOI is returned instead of raised."""
+    good = article_record()
+    malformed = article_record()
+    malformed['DOI'] = '10.1000/malformed'
+    malformed['title'] = None
+    patch_crossref({'status': 'ok', 'message': {'items': [good, malformed]}})
+
+    class BrokenCache:
+        def get(self, key):
+            if key == 'doi:10.1000/corrupted':
+                raise ValueError("corrupted record")
+            return None
+
+        def set(self, key, record):
+            pass
+
+    monkeypatch.setattr(crossref_backend, 'get_cache', BrokenCache)
+    entries = get_bibtex_from_dois(
+        [good['DOI'], malformed['DOI'], '10.1000/corrupted']
+    )
+    assert entries[good['DOI']] == get_bibtex(good)
+    assert isinstance(entries[malformed['DOI']], TypeError)
+    assert isinstance(entries['10.1000/corrupted'], ValueError)
+
+
+def test_get_bibtex_from_dois_concurrent(patch_crossref, monkeypatch):
+    """With multiple workers, the result is the same as for a serial run."""
+    monkeypatch.setattr(crossref_backend, "CROSSREF_BATCH_SIZE", 1)
+    records = {}
+    for i in range(20):
+        record = article_record()
+        record['DOI'] = '10.1000/%d' % i
+        records[record['DOI']] = record
+
+    def respond(**kwargs):
+        (doi,) = kwargs['filter']['doi']
+        return {'status': 'ok', 'message': {'items': [records[doi]]}}
+
+    patch_crossref(respond)
+    dois = list(reversed(records))
+    serial = get_bibtex_from_dois(dois)
+    concurrent = get_bibtex_from_dois(dois, workers=8)
+    assert list(concurrent.items()) == list(serial.items())
+    assert list(concurrent) == dois
+
+
+def test_main_max_authors(monkeypatch):
+    record = article_record()
+    record['author'] = [
+        {'family': 'Name%d' % i, 'given': 'A.'} for i in range(5000)
+    ]
+    monkeypatch.setattr(
+        crossref_backend, 'fetch_doi_record', lambda doi: record
+    )
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['--no-cache', '--max-authors', '2', record['DOI']]
+    )
+    assert result.exit_code == 0
+    assert "Author = {Name0, A. and Name1, A. and others}," in result.output
+    assert get_max_authors() is None
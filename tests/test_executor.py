@@ -0,0 +1,63 @@
+"""Tests for the concurrent executor."""
+
+import threading
+import time
+
+import pytest
+
+from getbibtex.executor import map_ordered
+
+
+def test_map_ordered_keeps_input_order():
+    """Results are yielded in input order, even if completed out of order."""
+
+    def slow_identity(x):
+        time.sleep(0.001 * (10 - x))
+        return x
+
+    assert list(map_ordered(slow_identity, range(10), workers=5)) == list(
+        range(10)
+    )
+
+
+def test_map_ordered_bounded_concurrency():
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def work(x):
+        with lock:
+            running.append(x)
+            max_running.append(len(running))
+        time.sleep(0.005)
+        with lock:
+            running.remove(x)
+        return x
+
+    assert list(map_ordered(work, range(20), workers=3)) == list(range(20))
+    assert max(max_running) <= 3
+    assert max(max_running) > 1
+
+
+def test_map_ordered_serial():
+    threads = set()
+
+    def work(x):
+        threads.add(threading.get_ident())
+        return x
+
+    assert list(map_ordered(work, range(5))) == list(range(5))
+    assert threads == {threading.get_ident()}
+
+
+def test_map_ordered_propagates_exceptions():
+    def work(x):
+        if x == 2:
+            raise ValueError(x)
+        return x
+
+    results = map_ordered(work, range(5), workers=2)
+    assert next(results) == 0
+    assert next(results) == 1
+    with pytest.raises(ValueError):
+        next(results)
@@ -0,0 +1,74 @@
+"""Tests for finding identifiers in documents."""
+
+import io
+
+import pytest
+from click.testing import CliRunner
+
+from getbibtex import extract, main
+from getbibtex.extract import extract_queries, scan_identifiers
+
+DOCUMENT = r"""\documentclass{article}
+% Krotov: \cite{GoerzSPP2019}, https://doi.org/10.21468/SciPostPhys.7.6.080
+\begin{document}
+See arXiv:2205.15044v2 and \href{https://arxiv.org/abs/2104.07687}{here}.
+Old-style preprints: hep-th/9901001 or math.GT/0309136 (doi:10.1000/xyz(1)).
+The DOI 10.48550/arXiv.2205.15044 is an arXiv ID, and so is hep-th/9901001v3.
+A duplicate: DOI:10.21468/scipostphys.7.6.080; and no identifier: 2019.12345.
+\end{document}
+"""
+
+EXPECTED = [
+    ('doc.tex:2', 'doi', '10.21468/SciPostPhys.7.6.080'),
+    ('doc.tex:4', 'arxiv', '2205.15044v2'),
+    ('doc.tex:4', 'arxiv', '2104.07687'),
+    ('doc.tex:5', 'arxiv', 'hep-th/9901001'),
+    ('doc.tex:5', 'arxiv', 'math.GT/0309136'),
+    ('doc.tex:5', 'doi', '10.1000/xyz(1)'),
+    ('doc.tex:6', 'arxiv', '2205.15044'),
+    ('doc.tex:6', 'arxiv', 'hep-th/9901001v3'),
+    ('doc.tex:7', 'doi', '10.21468/scipostphys.7.6.080'),
+]
+
+
+@pytest.mark.parametrize("block_size", [1024**2, 64, 7])
+def test_scan_identifiers(monkeypatch, block_size):
+    """The result does not depend on where the blocks are split."""
+    monkeypatch.setattr(extract, 'EXTRACT_BLOCK_SIZE', block_size)
+    identifiers = list(scan_identifiers(io.StringIO(DOCUMENT), 'doc.tex'))
+    assert identifiers == EXPECTED
+
+
+def test_extract_queries(tmp_path):
+    (tmp_path / "doc.tex").write_text(DOCUMENT)
+    (tmp_path / "notes.md").write_text(
+        "* [Krotov](https://doi.org/10.21468/SCIPOSTPHYS.7.6.080)\n"
+        "* https://arxiv.org/pdf/2306.00001v1.pdf\n"
+    )
+    files = [str(tmp_path / "doc.tex"), str(tmp_path / "notes.md")]
+    assert [query for _, query in extract_queries(files)] == [
+        '10.21468/SciPostPhys.7.6.080',
+        'arXiv:2205.15044v2',
+        'arXiv:2104.07687',
+        'hep-th/9901001',
+        'math.GT/0309136',
+        '10.1000/xyz(1)',
+        'arXiv:2306.00001v1',
+    ]
+
+
+def test_cli_extract(tmp_path, monkeypatch):
+    def fake_resolve_batch(queries, workers, **kwargs):
+        for location, query in queries:
+            entry = "@article{%s,\n}" % query
+            yield location, query, entry, None
+
+    monkeypatch.setattr('getbibtex.batch.resolve_batch', fake_resolve_batch)
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ['--extract', '-', '--no-cache'], input=DOCUMENT
+    )
+    assert result.exit_code == 0
+    assert result.output.count("@article{") == 6
+    result = runner.invoke(main, ['--extract', '-', 'arXiv:2205.15044'])
+    assert "Cannot combine --extract" in result.output
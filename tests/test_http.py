@@ -0,0 +1,263 @@
+"""Tests for the pooled HTTP session and the Crossref client.
+
+These run against a local HTTP server on a random port.
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from getbibtex.backends.crossref import Crossref
+from getbibtex.http import HTTPError, RateLimiter, Session
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Request handler that records requests and serves canned responses."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):  # silence
+        pass
+
+    def _send(self, status, body, content_type='application/json', **hdrs):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, val in hdrs.items():
+            self.send_header(key.replace('_', '-'), val)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        if parts.path == '/throttled':
+            self.server.n_throttled += 1
+            if self.server.n_throttled <= 2:
+                self._send(429, 'slow down', content_type='text/plain')
+            else:
+                self._send(
+                    200,
+                    '{}',
+                    X_Rate_Limit_Limit='50',
+                    X_Rate_Limit_Interval='1s',
+                )
+        elif parts.path == '/unavailable':
+            self._send(503, 'down', content_type='text/plain', Retry_After='7')
+        elif parts.path == '/redirect':
+            self._send(302, '', Location='/works/10.1000/a')
+        elif parts.path == '/gzip':
+            body = gzip.compress(b'{"compressed": true}')
+            self._send(200, body, Content_Encoding='gzip')
+        elif parts.path == '/works/10.1000/missing':
+            self._send(404, 'Resource not found.', content_type='text/plain')
+        elif parts.path.startswith('/works/'):
+            doi = parts.path[len('/works/') :]
+            message = {'DOI': doi, 'type': 'journal-article'}
+            self._send(200, json.dumps({'status': 'ok', 'message': message}))
+        elif parts.path == '/works':
+            message = {'items': [], 'params': params}
+            self._send(200, json.dumps({'status': 'ok', 'message': message}))
+        elif parts.path.startswith('/doi/'):
+            self._send(
+                200,
+                '@misc{raw, accept = {%s}}' % self.headers['Accept'],
+                content_type='application/x-bibtex; charset=utf-8',
+            )
+        else:
+            self._send(404, 'not found', content_type='text/plain')
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.requests = []
+    httpd.n_throttled = 0
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True
+    )
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return 'http://127.0.0.1:%d%s' % (server.server_address[1], path)
+
+
+def test_session_reuses_connection(server):
+    with Session(user_agent='test-agent') as session:
+        for _ in range(5):
+            response = session.get(url(server, '/works/10.1000/a'))
+            assert response.ok
+            assert response.json()['message']['DOI'] == '10.1000/a'
+        assert session.n_requests == 5
+        assert session.n_connections == 1
+    assert server.requests[0][1]['User-Agent'] == 'test-agent'
+
+
+def test_session_concurrent_requests(server):
+    session = Session(pool_size=2)
+    results = []
+
+    def work():
+        results.append(session.get(url(server, '/works/10.1000/a')).status)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [200] * 8
+    assert session.n_requests == 8
+    session.close()
+
+
+def test_session_redirect_and_gzip(server):
+    session = Session()
+    response = session.get(url(server, '/redirect'))
+    assert response.url == url(server, '/works/10.1000/a')
+    assert response.json()['message']['DOI'] == '10.1000/a'
+    assert session.get(url(server, '/gzip')).json() == {'compressed': True}
+    session.close()
+
+
+def test_session_errors(server):
+    session = Session()
+    response = session.get(url(server, '/nothing'))
+    assert response.status == 404
+    with pytest.raises(HTTPError) as exc_info:
+        response.raise_for_status()
+    assert exc_info.value.status == 404
+    # A connection error is an IOError without status
+    with pytest.raises(IOError):
+        Session(max_retries=0).get('http://127.0.0.1:1/')
+    session.close()
+
+
+def test_crossref_client(server):
+    session = Session()
+    cr = Crossref(
+        session=session, api_url=url(server, ''), doi_url=url(server, '/doi')
+    )
+    res = cr.works(ids='10.1000/a')
+    assert res['message']['DOI'] == '10.1000/a'
+    res = cr.works(filter={'doi': ['10.1000/a', '10.1000/b']}, limit=2)
+    assert res['message']['params'] == {
+        'filter': ['doi:10.1000/a,doi:10.1000/b'],
+        'rows': ['2'],
+    }
+    res = cr.works(query_bibliographic='Goerz Krotov', limit=1)
+    assert res['message']['params'] == {
+        'query.bibliographic': ['Goerz Krotov'],
+        'rows': ['1'],
+    }
+    with pytest.raises(IOError, match="404"):
+        cr.works(ids='10.1000/missing')
+    bibtex = cr.content_negotiation('10.1000/a')
+    assert bibtex == '@misc{raw, accept = {application/x-bibtex}}'
+    # All requests went through a single pooled connection
+    assert session.n_connections == 1
+    session.close()
+
+
+class FakeClock:
+    """Clock whose time only advances through ``sleep``."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter():
+    clock = FakeClock()
+    limiter = RateLimiter(10, clock=clock, sleep=clock.sleep)
+    # A full bucket allows a burst of 10 requests, then one per 0.1 s
+    for _ in range(10):
+        limiter.acquire()
+    assert clock.sleeps == []
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.sleeps == pytest.approx([0.1] * 5)
+    assert clock.now == pytest.approx(0.5)
+    # Throttling halves the rate; each success recovers 5% of the ceiling
+    limiter.throttle()
+    assert limiter.rate == 5
+    limiter.recover()
+    assert limiter.rate == pytest.approx(5.5)
+    # A lower ceiling announced by the server takes effect immediately
+    limiter.set_ceiling(2)
+    assert limiter.rate == 2
+    for _ in range(20):
+        limiter.recover()
+    assert limiter.rate == 2
+    # Repeated throttling does not reduce the rate below `min_rate`
+    for _ in range(100):
+        limiter.throttle()
+    assert limiter.rate == 0.1
+    limiter.acquire()
+    assert clock.sleeps[-1] <= 1 / 0.1
+    # ... but keeps a lower ceiling
+    limiter.set_ceiling(0.01)
+    limiter.throttle()
+    assert limiter.rate == 0.01
+
+
+def test_session_retries_throttled_requests(server, monkeypatch):
+    """429s are retried with backoff, and the rate adapts to the headers."""
+    clock = FakeClock()
+    session = Session(backoff=1.0)
+    session._clock = clock
+    session._sleep = clock.sleep
+    monkeypatch.setattr('getbibtex.http.random.uniform', lambda a, b: 1.0)
+
+    response = session.get(url(server, '/throttled'))
+
+    assert response.status == 200
+    assert session.n_requests == 3
+    assert session.n_retries == 2
+    # Exponential backoff (without jitter, due to the patched `uniform`),
+    # each followed by a wait of the limiter that was throttled by the 429
+    # (to 0.5 and then to 0.25 requests per second)
+    assert clock.sleeps == [1.0, 1.0, 2.0, 2.0]
+    # The limit announced by the server becomes the ceiling, and the rate
+    # starts to recover towards it
+    limiter = session.rate_limiter('127.0.0.1')
+    assert limiter.ceiling == 50
+    assert limiter.rate == 2.75
+    session.close()
+
+
+def test_session_retry_after(server):
+    clock = FakeClock()
+    session = Session(max_retries=2)
+    session._sleep = clock.sleep
+    response = session.get(url(server, '/unavailable'))
+    assert response.status == 503
+    assert session.n_requests == 3
+    assert clock.sleeps == [7.0, 7.0]
+    session.close()
+
+
+def test_session_mailto(server):
+    session = Session(mailto='me@example.com')
+    assert session.user_agent.endswith('(mailto:me@example.com)')
+    cr = Crossref(session=session, api_url=url(server, ''))
+    res = cr.works(query_bibliographic='Goerz', limit=1)
+    assert res['message']['params']['mailto'] == ['me@example.com']
+    session.close()
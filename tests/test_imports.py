@@ -0,0 +1,69 @@
+"""Test that heavy modules are only imported when they are needed.
+
+Each check runs in a fresh interpreter. The corresponding timings are
+measured by ``benchmarks/importtime.py``.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(statement):
+    """Return the set of modules imported after running `statement`."""
+    code = statement + "\nimport sys\nprint('\\n'.join(sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(proc.stdout.split())
+
+
+@pytest.mark.parametrize(
+    "statement, unwanted",
+    [
+        ("import getbibtex", ["click", "getbibtex.backends"]),
+        (
+            "from getbibtex import main",
+            ["getbibtex.backends", "http.client", "sqlite3", "bibtexparser"],
+        ),
+        (
+            "from getbibtex.query import classify_query",
+            ["getbibtex.backends"],
+        ),
+        (
+            "import getbibtex.backends.crossref",
+            ["bibtexparser", "getbibtex.backends.arxiv"],
+        ),
+        ("import getbibtex.backends.arxiv", ["getbibtex.backends.crossref"]),
+        (
+            "import getbibtex.client",
+            ["click", "getbibtex.cli", "getbibtex.backends", "sqlite3"],
+        ),
+    ],
+)
+def test_lazy_imports(statement, unwanted):
+    modules = imported_modules(statement)
+    assert [mod for mod in unwanted if mod in modules] == []
+
+
+def test_help_does_not_load_backends():
+    code = (
+        "import sys\n"
+        "from getbibtex import main\n"
+        "try:\n"
+        "    main(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print([m for m in sys.modules if m.startswith('getbibtex.back')])"
+    )
+    proc = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert proc.stdout.strip().endswith("[]")
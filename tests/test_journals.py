@@ -0,0 +1,102 @@
+"""Tests for the lookup of journal macros and abbreviations."""
+
+import pytest
+from click.testing import CliRunner
+
+from getbibtex import main
+from getbibtex.backends.crossref import get_journal
+from getbibtex.journals import (
+    JournalIndex,
+    normalize_journal_name,
+    read_abbreviations,
+    set_journal_index,
+    write_abbreviations,
+)
+
+JABREF_LIST = """\
+# Full name;Abbreviation
+Physical Review Letters;Phys. Rev. Lett.
+"The Journal of Chemical Physics";"J. Chem. Phys."
+Journal of Unknown Things;J. Unknown Things
+Science & Engineering Reviews;Sci. Eng. Rev.
+"""
+
+
+@pytest.fixture
+def abbreviations_file(tmp_path):
+    """A compact abbreviation file built from `JABREF_LIST`."""
+    source = tmp_path / "journals.csv"
+    source.write_text(JABREF_LIST)
+    filename = str(tmp_path / "journals.tsv.gz")
+    write_abbreviations(read_abbreviations(str(source)), filename)
+    return filename
+
+
+@pytest.fixture
+def journal_index(abbreviations_file):
+    """Activate a :class:`JournalIndex` with abbreviations for a test."""
+    index = JournalIndex(abbreviations_file=abbreviations_file)
+    previous = set_journal_index(index)
+    yield index
+    set_journal_index(previous)
+
+
+def test_normalized_macro_lookup():
+    index = JournalIndex()
+    assert index.get_macro(['Phys. Rev. Lett.']) == 'prl'
+    assert index.get_macro(['Phys Rev Lett']) == 'prl'
+    assert index.get_macro(['PHYS. REV. LETT.']) == 'prl'
+    assert index.get_macro(['Journal of Chemical Physics']) == 'jcp'
+    assert index.get_macro(['Physical Review Letters']) is None
+    assert index.get_macro([None, 'Journal of Unknown Things']) is None
+    # Exact matches of any candidate take precedence
+    assert index.get_macro(['Phys Rev A', 'Phys. Rev. Lett.']) == 'prl'
+
+
+def test_read_abbreviations(tmp_path, abbreviations_file):
+    source = tmp_path / "journals.csv"
+    abbreviations = read_abbreviations(str(source))
+    assert abbreviations == read_abbreviations(abbreviations_file)
+    assert abbreviations['physical review letters'] == 'Phys. Rev. Lett.'
+    assert abbreviations['journal of chemical physics'] == 'J. Chem. Phys.'
+    key = normalize_journal_name('Science and Engineering Reviews')
+    assert abbreviations[key] == 'Sci. Eng. Rev.'
+    invalid = tmp_path / "invalid.csv"
+    invalid.write_text("Journal without abbreviation\n")
+    with pytest.raises(IOError):
+        read_abbreviations(str(invalid))
+
+
+def test_abbreviations_are_loaded_lazily(abbreviations_file):
+    index = JournalIndex(abbreviations_file=abbreviations_file)
+    assert index.get_macro(['Phys. Rev. Lett.']) == 'prl'
+    assert index._abbreviations is None
+    assert index.get_macro(['Physical Review Letters']) == 'prl'
+    assert index._abbreviations is not None
+    assert index.get_abbreviation('Science & Engineering Reviews') == (
+        'Sci. Eng. Rev.'
+    )
+
+
+def test_get_journal_with_abbreviations(journal_index, capsys):
+    record = {'container-title': ['Physical Review Letters']}
+    assert get_journal(record) == 'prl'
+    record = {'container-title': ['Journal of Unknown Things']}
+    assert get_journal(record) == 'J. Unknown Things'
+    assert "WARNING" in capsys.readouterr().err
+    record = {
+        'container-title': ['Journal of Unknown Things'],
+        'short-container-title': ['JUT'],
+    }
+    assert get_journal(record, use_journal_macros=False) == 'JUT'
+
+
+def test_journals_build(tmp_path):
+    source = tmp_path / "journals.csv"
+    source.write_text(JABREF_LIST)
+    dest = tmp_path / "journals.tsv.gz"
+    runner = CliRunner()
+    result = runner.invoke(main, ['journals', 'build', str(source), str(dest)])
+    assert result.exit_code == 0
+    assert "Wrote 4 journals" in result.output
+    assert len(read_abbreviations(str(dest))) == 4
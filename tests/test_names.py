@@ -0,0 +1,62 @@
+"""Test normalizing author names."""
+
+import random
+
+from bibtexparser.customization import splitname
+
+from getbibtex.bibtex import _normalize_simple_name, normalize_name
+
+
+def normalize_name_reference(name):
+    """Normalize `name` with bibtexparser's ``splitname``."""
+    parts = splitname(name)
+    normalized_name = " ".join(parts["von"]) + " ".join(parts["last"])
+    if len(parts["jr"]) > 0:
+        normalized_name += ", " + " ".join(parts["jr"])
+    normalized_name += ", " + " ".join(parts["first"])
+    return normalized_name
+
+
+def test_normalize_name():
+    assert normalize_name("Michael H. Goerz") == "Goerz, Michael H."
+    assert normalize_name("Goerz, Michael H.") == "Goerz, Michael H."
+    assert normalize_name("Smith, Jr, John") == "Smith, Jr, John"
+    assert normalize_name("Plato") == "Plato, "
+    assert normalize_name("Ludwig van Beethoven") == "vanBeethoven, Ludwig"
+    assert normalize_name("{Koch Group}") == "{Koch Group}, "
+
+
+def test_normalize_simple_name_fuzz():
+    """Test that the fast path agrees with ``splitname`` on random names."""
+    tokens = [
+        'Michael',
+        'H.',
+        'Goerz',
+        'Müller',
+        'Élise',
+        'Vivie-Riedle',
+        'O\'Neil',
+        'van',
+        'de',
+        'Jr',
+        '3',
+        '_a',
+        ',',
+        ' ',
+        '  ',
+        '~',
+        '\t',
+        '\n',
+    ]
+    rng = random.Random(25)
+    n_simple = 0
+    for _ in range(20000):
+        name = ''.join(
+            rng.choice(tokens) + rng.choice(['', ' '])
+            for _ in range(rng.randrange(1, 7))
+        )
+        normalized_name = _normalize_simple_name(name)
+        if normalized_name is not None:
+            n_simple += 1
+            assert normalized_name == normalize_name_reference(name)
+    assert n_simple > 1000
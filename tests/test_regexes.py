@@ -1,6 +1,14 @@
 """Test regular expressions."""
 
+import random
+import re
+import time
+
+import pytest
+
 from getbibtex import RX_ARXIV_NEW, RX_ARXIV_OLD, RX_DOI
+from getbibtex.bibtex import RX_PROPER_NOUNS, protect_strings
+from getbibtex.query import classify_query
 
 
 def test_rx_doi():
@@ -36,3 +44,86 @@ def test_rx_arxiv_old():
     match = RX_ARXIV_OLD.search(query)
     assert bool(match) is True
     assert match.group(1) == "cond-mat/0411174"
+
+
+def classify_query_reference(query):
+    """Classify `query` by searching it with each regex in turn."""
+    for rx in (RX_ARXIV_NEW, RX_ARXIV_OLD):
+        match = rx.search(query)
+        if match:
+            return 'arxiv', match.group(1)
+    if ' ' not in query:
+        if query.startswith('10.'):
+            return 'doi', query
+        match = RX_DOI.search(query)
+        if match:
+            return 'doi', match.group(0)
+    return 'query', query
+
+
+def test_classify_query_fuzz():
+    """Test that `classify_query` agrees with the regexes on random input."""
+    tokens = [
+        'arxiv',
+        'arXiv:',
+        'ARXIV',
+        '2205.15044',
+        '1234',
+        'v2',
+        'V2',
+        '.',
+        '/',
+        '10.',
+        '10.1103/',
+        'PhysRevA',
+        'hep-th',
+        'cond-mat.str-el',
+        '0411174',
+        'x',
+        ' ',
+        '\n',
+        '?utm=',
+    ]
+    rng = random.Random(24)
+    for _ in range(20000):
+        query = ''.join(rng.choice(tokens) for _ in range(rng.randrange(10)))
+        assert classify_query(query) == classify_query_reference(query)
+
+
+def test_rx_proper_nouns_fuzz():
+    """Test `RX_PROPER_NOUNS` against the original (quadratic) regex."""
+    reference = re.compile(
+        r'(?<!^)(?<![:.?!]\s)(?<!\{)\b(\w*[A-Z]\w*)(\b|$)(?!\})'
+    )
+    tokens = ['a', 'B', 'Cd', 'ü', 'É', '1', '_', '{', '}', ' ', '. ', ':']
+    rng = random.Random(24)
+    for _ in range(20000):
+        s = ''.join(rng.choice(tokens) for _ in range(rng.randrange(12)))
+        assert RX_PROPER_NOUNS.sub(r'{\1}', s) == reference.sub(r'{\1}', s)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        'arxiv' * 40000,
+        'https://arxiv.org/abs/?q' + '&utm_source=arxiv1234' * 10000,
+        'x' + '10.1234' * 30000,
+        'cond-mat/123456' * 15000,
+    ],
+)
+def test_classify_query_linear(query):
+    """Test that long pathological queries are classified quickly.
+
+    With a quadratic regex, each of these takes at least a minute.
+    """
+    start = time.perf_counter()
+    assert classify_query(query) == ('query', query)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_protect_strings_linear():
+    """Test that long pathological titles are protected quickly."""
+    title = 'x ' + 'aB' * 100000 + '}'
+    start = time.perf_counter()
+    assert protect_strings(title, auto_protect=True) == title
+    assert time.perf_counter() - start < 1.0
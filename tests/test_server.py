@@ -0,0 +1,191 @@
+"""Tests for the `getbibtex serve` daemon and `getbibtex-client`."""
+
+import json
+import socket
+import sys
+import threading
+
+import pytest
+
+from getbibtex import client, main
+from getbibtex.server import handle_request, make_server
+from getbibtex.standin import StandinServer
+
+CROSSREF_RECORDS = [
+    {
+        'author': [{'family': 'Goerz', 'given': 'Michael H.'}],
+        'title': ['Robust optimal control of a qubit'],
+        'issued': {'date-parts': [[2022]]},
+        'DOI': '10.1103/PhysRevLett.128.230502',
+        'type': 'journal-article',
+        'container-title': ['Journal of Unknown Things'],
+        'page': '230502',
+        'volume': '128',
+        'issue': '23',
+    },
+    {
+        'author': [{'family': 'Goerz', 'given': 'Michael H.'}],
+        'title': ['Quantum control of Rydberg atoms in the NISQ era'],
+        'issued': {'date-parts': [[2023]]},
+        'DOI': '10.1000/nisq',
+        'type': 'journal-article',
+        'container-title': ['Journal of Unknown Things'],
+        'page': '1',
+        'volume': '1',
+    },
+]
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """A stand-in for Crossref that the backends are pointed at."""
+    with StandinServer(CROSSREF_RECORDS) as server:
+        for key, val in server.environ().items():
+            monkeypatch.setenv(key, val)
+        yield server
+
+
+@pytest.fixture
+def server(standin, tmp_path):
+    """A running daemon, listening on a Unix socket."""
+    lookup_server = make_server(str(tmp_path / "getbibtex.sock"))
+    thread = threading.Thread(target=lookup_server.serve_forever)
+    thread.start()
+    yield lookup_server
+    lookup_server.shutdown()
+    lookup_server.server_close()
+    thread.join()
+
+
+def test_handle_request(standin):
+    response = handle_request(
+        {'args': ['10.1103/PhysRevLett.128.230502'], 'options': {}}
+    )
+    assert response['status'] == 'ok'
+    assert response['entry'].startswith('@article{GoerzJUT2022,')
+    assert "No macro name" in response['messages']
+    response = handle_request({'args': ['10.1000/unknown']})
+    assert response['status'] == 'error'
+    response = handle_request({'args': ['10.1000/x'], 'options': {'x': 1}})
+    assert response == {
+        'status': 'error',
+        'error': "Invalid request: Unknown options: x",
+        'messages': '',
+    }
+    response = handle_request({})
+    assert response['error'] == "Invalid request: 'args'"
+    response = handle_request({'args': '10.1000/x'})
+    assert response['error'] == (
+        "Invalid request: 'args' must be a list of strings"
+    )
+
+
+def test_handle_request_defaults(standin, capsys):
+    """Without options, the daemon gives the same entry as the CLI."""
+    response = handle_request({'args': ['10.1000/nisq']})
+    assert response['status'] == 'ok'
+    assert "{NISQ}" in response['entry']
+    assert main.main(['10.1000/nisq'], standalone_mode=False) is None
+    assert capsys.readouterr().out.strip() == response['entry'].strip()
+
+
+def test_client_lookup(server):
+    response = client.lookup(
+        ['10.1103/PhysRevLett.128.230502'],
+        server.address,
+        capitalize_field_names=False,
+    )
+    assert response['status'] == 'ok'
+    assert "\n    title = {" in response['entry']
+
+
+def test_protocol(server):
+    """Test that the daemon answers every line sent on a connection."""
+    requests = [b"not json", b'{"args": ["10.1103/PhysRevLett.128.230502"]}']
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(server.address)
+        with sock.makefile('rwb') as stream:
+            for request in requests:
+                stream.write(request + b"\n")
+                stream.flush()
+                response = json.loads(stream.readline())
+                assert response['status'] == (
+                    'error' if request == b"not json" else 'ok'
+                )
+
+
+def test_client_main(server, capsys):
+    argv = ['--address', server.address, '10.1103/PhysRevLett.128.230502']
+    assert client.main(argv) == 0
+    captured = capsys.readouterr()
+    assert captured.out.startswith('@article{GoerzJUT2022,')
+    assert "No macro name" in captured.err
+    argv = ['--address', server.address, '10.1000/unknown']
+    assert client.main(argv) == 1
+    assert capsys.readouterr().err.startswith("ERROR:")
+    assert client.main(['--address', server.address]) == 2
+
+
+def test_client_fallback(standin, tmp_path, monkeypatch, capsys):
+    argv = [
+        '--address',
+        str(tmp_path / "missing.sock"),
+        '--no-capitalize-field-names',
+        '10.1103/PhysRevLett.128.230502',
+    ]
+    with pytest.raises(SystemExit):
+        client.main(argv)
+    assert capsys.readouterr().out.startswith('@article{GoerzJUT2022,')
+
+
+def test_server_already_running(server):
+    with pytest.raises(OSError):
+        make_server(server.address)
+
+
+def test_parse_address():
+    assert client.parse_address('127.0.0.1:8025') == (
+        socket.AF_INET,
+        ('127.0.0.1', 8025),
+    )
+    assert client.parse_address('./sock:1')[0] == socket.AF_UNIX
+
+
+def test_concurrent_requests(monkeypatch):
+    """A slow lookup does not block others, and keeps its own messages."""
+    fast_done = threading.Event()
+
+    def resolve_query(query, **kwargs):
+        print("message for %s" % query, file=sys.stderr)
+        if query == 'slow':
+            assert fast_done.wait(timeout=10)
+        elif query == 'broken':
+            raise IndexError("list index out of range")
+        return "@misc{%s}" % query
+
+    monkeypatch.setattr("getbibtex.query.resolve_query", resolve_query)
+    responses = {}
+
+    def run(query):
+        responses[query] = handle_request({'args': [query]})
+
+    slow = threading.Thread(target=run, args=('slow',))
+    slow.start()
+    run('fast')
+    fast_done.set()
+    slow.join()
+    assert responses['fast'] == {
+        'status': 'ok',
+        'entry': '@misc{fast}',
+        'messages': 'message for fast\n',
+    }
+    assert responses['slow'] == {
+        'status': 'ok',
+        'entry': '@misc{slow}',
+        'messages': 'message for slow\n',
+    }
+    assert handle_request({'args': ['broken']}) == {
+        'status': 'error',
+        'error': "IndexError: list index out of range",
+        'messages': 'message for broken\n',
+    }
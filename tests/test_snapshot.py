@@ -0,0 +1,233 @@
+"""Tests for the index of bulk metadata snapshots."""
+
+import gzip
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from getbibtex import main
+from getbibtex.backends import arxiv as arxiv_backend
+from getbibtex.backends import crossref as crossref_backend
+from getbibtex.cache import doi_key
+from getbibtex.snapshot import (
+    SnapshotIndex,
+    arxiv_snapshot_key,
+    ingest_arxiv_snapshot,
+    ingest_crossref_snapshot,
+    read_snapshot_file,
+    set_snapshot_index,
+    snapshot_files,
+)
+
+
+def make_record(i):
+    return {
+        'DOI': '10.1000/Snap.%d' % i,
+        'type': 'journal-article',
+        'title': ['Snapshot record %d' % i],
+        'author': [{'family': 'Goerz', 'given': 'Michael'}],
+        'issued': {'date-parts': [[2020]]},
+        'container-title': ['Physical Review A'],
+        'volume': str(i),
+        'page': '1',
+        'reference': [{'key': 'ref%d' % j} for j in range(20)],
+    }
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    """A folder with a Crossref snapshot of 25 records in four files."""
+    folder = tmp_path / "snapshot"
+    (folder / "sub").mkdir(parents=True)
+    for n in range(3):
+        items = [make_record(10 * n + i) for i in range(5)]
+        with gzip.open(folder / ("%d.json.gz" % n), 'wt') as out_fh:
+            json.dump({'items': items}, out_fh)
+    with open(folder / "sub" / "3.jsonl", 'w') as out_fh:
+        for i in range(10):
+            out_fh.write(json.dumps(make_record(100 + i)) + "\n")
+        out_fh.write(json.dumps({'title': ['no DOI']}) + "\n")
+    (folder / "README.txt").write_text("not a snapshot file")
+    return folder
+
+
+def test_read_snapshot_files(snapshot_dir):
+    files = snapshot_files(str(snapshot_dir))
+    assert [f.rsplit('/', 1)[-1] for f in files] == [
+        "0.json.gz",
+        "1.json.gz",
+        "2.json.gz",
+        "3.jsonl",
+    ]
+    assert len(list(read_snapshot_file(files[0]))) == 5
+    assert len(list(read_snapshot_file(files[3]))) == 11
+    assert snapshot_files(files[0]) == [files[0]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_ingest(snapshot_dir, tmp_path, workers):
+    (snapshot_dir / "broken.json").write_text("{")
+    errors = []
+    with SnapshotIndex(str(tmp_path / "index.db"), writable=True) as index:
+        n_records = ingest_crossref_snapshot(
+            str(snapshot_dir), index, workers=workers, on_error=errors.append
+        )
+    assert n_records == 25
+    assert len(errors) == 1
+    assert "broken.json" in str(errors[0])
+    with SnapshotIndex(str(tmp_path / "index.db")) as index:
+        assert len(index) == 25
+        record = index.get(doi_key('10.1000/snap.103'))
+        assert record['title'] == ['Snapshot record 103']
+        assert 'reference' not in record
+        assert index.get(doi_key('10.1000/unknown')) is None
+
+
+def test_index_special_path(snapshot_dir, tmp_path):
+    """The index can be opened read-only from a path with URI characters."""
+    folder = tmp_path / "a?b#c%20d"
+    folder.mkdir()
+    with SnapshotIndex(str(folder / "index.db"), writable=True) as index:
+        n_records = ingest_crossref_snapshot(snapshot_dir, index)
+    with SnapshotIndex(str(folder / "index.db")) as index:
+        assert len(index) == n_records
+    assert not (tmp_path / "a").exists()
+
+
+def test_missing_index(tmp_path):
+    with pytest.raises(IOError):
+        SnapshotIndex(str(tmp_path / "missing.db"))
+
+
+def test_fetch_from_snapshot(snapshot_dir, tmp_path, monkeypatch):
+    with SnapshotIndex(str(tmp_path / "index.db"), writable=True) as index:
+        ingest_crossref_snapshot(str(snapshot_dir), index)
+    index = SnapshotIndex(str(tmp_path / "index.db"))
+    previous = set_snapshot_index(index)
+    requested = []
+
+    def works(self, **kwargs):
+        requested.append(kwargs)
+        raise IOError("Network unavailable")
+
+    monkeypatch.setattr(crossref_backend.Crossref, 'works', works)
+    try:
+        record = crossref_backend.fetch_doi_record('10.1000/snap.1')
+        assert record['volume'] == '1'
+        records = crossref_backend.fetch_doi_records(
+            ['10.1000/Snap.2', '10.1000/snap.3', '10.1000/other']
+        )
+        assert records['10.1000/Snap.2']['volume'] == '2'
+        assert records['10.1000/snap.3']['volume'] == '3'
+        assert isinstance(records['10.1000/other'], IOError)
+        assert len(requested) == 2  # both only for '10.1000/other'
+    finally:
+        set_snapshot_index(previous)
+        index.close()
+
+
+def test_cli(snapshot_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        crossref_backend.Crossref,
+        'works',
+        lambda self, **kwargs: pytest.fail("Unexpected request"),
+    )
+    runner = CliRunner()
+    dest = str(tmp_path / "index.db")
+    result = runner.invoke(
+        main, ['snapshot', 'crossref', str(snapshot_dir), dest, '--jobs', '2']
+    )
+    assert result.exit_code == 0
+    assert f"Indexed 25 records in {dest}" in result.output
+    result = runner.invoke(
+        main,
+        ['lookup', '--no-cache', '--snapshot', dest, '10.1000/snap.21'],
+    )
+    assert result.output.startswith("@article{GoerzPRA2020,")
+    assert "Volume = {21}," in result.output
+
+
+ARXIV_ENTRIES = [
+    {
+        'id': '2205.15044',
+        'title': 'Quantum optimal control via\n  semi-automatic gradients',
+        'authors_parsed': [
+            ['Goerz', 'Michael H.', ''],
+            ['M\\"uller', 'Matthias M.', ''],
+            ['Smith', 'John', 'Jr'],
+        ],
+        'versions': [
+            {'version': 'v1', 'created': 'Mon, 30 May 2022 18:00:00 GMT'},
+            {'version': 'v2', 'created': 'Tue, 13 Dec 2022 18:00:00 GMT'},
+        ],
+    },
+    {
+        'id': 'quant-ph/0101001',
+        'title': 'An old-style preprint',
+        'authors_parsed': [['Plato', '', '']],
+        'versions': [{'version': 'v1', 'created': 'Mon, 1 Jan 2001 0:0 GMT'}],
+    },
+]
+
+
+@pytest.fixture
+def arxiv_snapshot(tmp_path):
+    """An arXiv snapshot file with two valid entries and an invalid one."""
+    filename = tmp_path / "arxiv-metadata-oai-snapshot.json.gz"
+    with gzip.open(filename, 'wt') as out_fh:
+        out_fh.write(json.dumps(ARXIV_ENTRIES[0]) + "\n\n")
+        out_fh.write(json.dumps({'id': '2205.00001'}) + "\n")
+        out_fh.write(json.dumps(ARXIV_ENTRIES[1]) + "\n")
+    return filename
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_ingest_arxiv(arxiv_snapshot, tmp_path, monkeypatch, workers):
+    monkeypatch.setattr('getbibtex.snapshot.ARXIV_CHUNK_SIZE', 2)
+    errors = []
+    with SnapshotIndex(str(tmp_path / "index.db"), writable=True) as index:
+        n_records = ingest_arxiv_snapshot(
+            str(arxiv_snapshot), index, workers=workers, on_error=errors.append
+        )
+        assert n_records == 2
+        assert [str(error) for error in errors] == [
+            "Invalid record in %s:3" % arxiv_snapshot
+        ]
+        assert index.get(arxiv_snapshot_key('2205.15044v1')) == {
+            'authors': [
+                'Goerz, Michael H.',
+                'Müller, Matthias M.',
+                'Smith, Jr, John',
+            ],
+            'title': 'Quantum optimal control via semi-automatic gradients',
+            'year': '2022',
+        }
+        record = index.get(arxiv_snapshot_key('quant-ph/0101001'))
+        assert record['authors'] == ['Plato']
+
+
+def test_lookup_arxiv_from_snapshot(arxiv_snapshot, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        arxiv_backend,
+        '_arxiv_request',
+        lambda ids: pytest.fail("Unexpected request"),
+    )
+    runner = CliRunner()
+    dest = str(tmp_path / "index.db")
+    result = runner.invoke(
+        main, ['snapshot', 'arxiv', str(arxiv_snapshot), dest]
+    )
+    assert "WARNING: Invalid record" in result.output
+    assert f"Indexed 2 records in {dest}" in result.output
+    result = runner.invoke(
+        main,
+        ['lookup', '--no-cache', '--snapshot', dest, 'arXiv:2205.15044v2'],
+    )
+    assert result.output.startswith("@article{Goerz2205.15044v2,")
+    assert "Year = {2022}," in result.output
+    result = runner.invoke(
+        main,
+        ['lookup', '--no-cache', '--snapshot', dest, 'quant-ph/0101001'],
+    )
+    assert result.output.startswith("@article{Platoquant-ph.0101001,")
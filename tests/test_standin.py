@@ -0,0 +1,149 @@
+"""End-to-end tests against the local Crossref/arXiv stand-in server."""
+
+import pytest
+from click.testing import CliRunner
+
+from getbibtex import main
+from getbibtex.backends.crossref import Crossref
+from getbibtex.http import Session, set_session
+from getbibtex.query import resolve_query
+from getbibtex.standin import StandinServer, load_fixtures, write_fixtures
+
+CROSSREF_RECORDS = [
+    {
+        'author': [{'family': 'Goerz', 'given': 'Michael H.'}],
+        'title': ['Robust optimal control of a qubit'],
+        'issued': {'date-parts': [[2022]]},
+        'DOI': '10.1103/PhysRevLett.128.230502',
+        'type': 'journal-article',
+        'container-title': ['Phys. Rev. Lett.'],
+        'page': '230502',
+        'volume': '128',
+        'issue': '23',
+    },
+    {
+        'author': [{'family': 'Doe', 'given': 'Jane'}],
+        'title': ['An unsupported dataset'],
+        'issued': {'date-parts': [[2020]]},
+        'DOI': '10.1000/dataset',
+        'type': 'dataset',
+    },
+]
+
+ARXIV_RECORDS = [
+    {
+        'id': '2205.15044',
+        'title': 'Quantum optimal control via semi-automatic differentiation',
+        'authors': ['Michael H. Goerz', 'Sebastián C. Carrasco'],
+        'year': '2022',
+    }
+]
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    folder = tmp_path / "fixtures"
+    write_fixtures(str(folder), CROSSREF_RECORDS, ARXIV_RECORDS)
+    return str(folder)
+
+
+@pytest.fixture
+def standin(fixtures, monkeypatch):
+    """A running stand-in server that the backends are pointed at."""
+    with StandinServer(*load_fixtures(fixtures)) as server:
+        for key, val in server.environ().items():
+            monkeypatch.setenv(key, val)
+        yield server
+
+
+def test_load_fixtures(fixtures):
+    assert load_fixtures(fixtures) == (CROSSREF_RECORDS, ARXIV_RECORDS)
+
+
+def test_crossref_client(standin):
+    with Session() as session:
+        cr = Crossref(session=session)
+        assert cr.api_url == standin.url
+        res = cr.works(ids='10.1103/physrevlett.128.230502')
+        assert res['message']['page'] == '230502'
+        res = cr.works(
+            filter={'doi': ['10.1000/dataset', '10.1000/unknown']}, limit=2
+        )
+        assert [item['DOI'] for item in res['message']['items']] == [
+            '10.1000/dataset'
+        ]
+        res = cr.works(query_bibliographic='goerz qubit control', limit=1)
+        assert res['message']['items'][0]['DOI'].startswith('10.1103')
+        res = cr.works(
+            query_bibliographic='goerz qubit control',
+            limit=1,
+            select=['DOI', 'page'],
+        )
+        assert res['message']['items'] == [
+            {'DOI': '10.1103/PhysRevLett.128.230502', 'page': '230502'}
+        ]
+        with pytest.raises(IOError):
+            cr.works(ids='10.1000/unknown')
+        assert '10.1000/dataset' in cr.content_negotiation('10.1000/dataset')
+        assert session.n_connections == 1
+
+
+def test_main_end_to_end(standin, tmp_path):
+    infile = tmp_path / "ids.txt"
+    infile.write_text(
+        "10.1103/PhysRevLett.128.230502\n"
+        "arXiv:2205.15044\n"
+        "10.1000/dataset\n"
+        "10.1000/unknown\n"
+    )
+    runner = CliRunner()
+    result = runner.invoke(main, ['--batch', str(infile)])
+    assert result.exit_code == 1
+    assert "@article{GoerzPRL2022," in result.stdout
+    assert "@article{Goerz2205.15044," in result.stdout
+    assert "@misc{10_1000_dataset," in result.stdout
+    assert "ERROR: 1 queries failed" in result.stderr
+
+
+def test_injected_errors(fixtures):
+    crossref_records, _ = load_fixtures(fixtures)
+    server = StandinServer(
+        crossref_records,
+        throttle_rate=0.2,
+        error_rate=0.1,
+        rate_limit=1000,
+        seed=1,
+    )
+    with server, Session(backoff=0, max_retries=10) as session:
+        cr = Crossref(session=session, api_url=server.url)
+        for _ in range(10):
+            res = cr.works(ids='10.1000/dataset')
+            assert res['message']['DOI'] == '10.1000/dataset'
+        assert server.n_errors > 0
+        assert session.n_retries == server.n_errors
+        assert server.n_requests == 10 + server.n_errors
+
+
+@pytest.mark.parametrize(
+    "query, n_requests",
+    [
+        ('10.1103/PhysRevLett.128.230502', 1),
+        ('goerz robust qubit', 1),
+        # Unsupported records fall back to content negotiation
+        ('10.1000/dataset', 2),
+        ('unsupported dataset', 2),
+    ],
+)
+def test_requests_per_lookup(standin, query, n_requests):
+    """Test that every lookup fetches each record only once."""
+    with Session() as session:
+        previous = set_session(session)
+        try:
+            entry = resolve_query(query, capitalize_field_names=False)
+        finally:
+            set_session(previous)
+    assert session.n_requests == n_requests
+    assert session.n_requests_by_host == {'127.0.0.1': n_requests}
+    assert standin.n_requests == n_requests
+    if n_requests == 1:  # the formatting options are applied
+        assert "\n    title = {" in entry
@@ -0,0 +1,79 @@
+"""Tests for timing the phases of a lookup."""
+
+import pstats
+
+from click.testing import CliRunner
+
+from getbibtex import main
+from getbibtex.backends import crossref as crossref_backend
+from getbibtex.timing import Timings, get_timings, set_timings, timed
+
+
+def article_record():
+    return {
+        'author': [{'family': 'Goerz', 'given': 'Michael H.'}],
+        'title': ['Robust optimal control of a qubit'],
+        'issued': {'date-parts': [[2022]]},
+        'DOI': '10.1000/a',
+        'type': 'journal-article',
+        'container-title': ['Phys. Rev. Lett.'],
+        'page': '062308',
+        'volume': '6',
+        'issue': '1',
+    }
+
+
+def test_timings():
+    timings = Timings()
+    for i in range(1, 101):
+        timings.add('request', i / 1000)
+    with timings.phase('format'):
+        pass
+    summary = timings.summary()
+    assert summary['request']['count'] == 100
+    assert summary['request']['p50'] == 0.050
+    assert summary['request']['p95'] == 0.095
+    assert summary['request']['p99'] == 0.099
+    assert summary['request']['max'] == 0.100
+    assert abs(summary['request']['total'] - 5.05) < 1e-10
+    assert summary['format']['count'] == 1
+
+
+def test_timed():
+    assert get_timings() is None
+    with timed('request'):  # no-op
+        pass
+    timings = Timings()
+    previous = set_timings(timings)
+    try:
+        with timed('request'):
+            pass
+    finally:
+        set_timings(previous)
+    assert list(timings.summary()) == ['request']
+
+
+def test_main_timings_and_profile(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        crossref_backend, "fetch_doi_record", lambda doi: article_record()
+    )
+    profile_file = tmp_path / "lookup.prof"
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [
+            '--no-cache',
+            '--timings',
+            '--profile',
+            str(profile_file),
+            '10.1000/a',
+        ],
+    )
+    assert result.exit_code == 0
+    assert "@article{GoerzPRL2022" in result.stdout
+    phases = [line.split()[0] for line in result.stderr.splitlines()]
+    for phase in ['import', 'format', 'title', 'total']:
+        assert phase in phases
+    assert get_timings() is None
+    stats = pstats.Stats(str(profile_file))
+    assert stats.total_calls > 0